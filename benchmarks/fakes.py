@@ -0,0 +1,246 @@
+"""
+Local Stand-ins for the OpenAI, Serper and Telegram APIs (used by offline_bench.py)
+
+Goal:
+- Run the phases with no network and no API keys, with answers and timings that are
+  the same on every run, so what's left to measure is the workshop's own overhead.
+
+How it works:
+- FakeServices starts one local HTTP server (127.0.0.1, a free port) that answers:
+  - POST /v1/chat/completions like OpenAI. If the request offers tools and no tool
+    result is in the conversation yet, the answer calls the first tool with arguments
+    made from its JSON schema; otherwise it is a fixed final answer (which contains a
+    JSON function plan, so phase 3's contract holds). Streaming is supported. Token
+    usage is estimated from the characters sent and returned.
+  - POST /search, /news, ... like Serper: a few fixed organic results.
+  - POST /bot<token>/<method> like Telegram's Bot API: {"ok": true, ...}.
+- Every call waits for a configurable simulated latency first (llm_latency,
+  tool_latency) and is counted per API.
+- The final answer holds the distinct findings in FACTS. For every prompt that carries
+  an upstream answer, the server records how many of them it still contains, so
+  context compaction can be checked for lost facts (context_facts).
+"""
+
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Shaped like a real research answer (overview, findings with figures, a summary that
+# restates some of them), long enough that passing it on as context costs something.
+# FACTS are the distinct findings; the server checks how many reach downstream prompts.
+FACTS = (
+    "Role-specific agents cut task failures by 18 percent",
+    "Sequential crews averaged 4.2 LLM calls per task",
+    "Hierarchical crews added a manager call and 35 percent more tokens",
+    "Caching search results saved 1.3 seconds per research task",
+    "Context over 2,000 tokens doubled answer latency on gpt-4o-mini",
+    "Structured JSON outputs removed 9 of 11 parsing retries",
+    "Teams of three agents matched five-agent crews on quality",
+    "Human review was still needed for 1 in 12 generated reports",
+)
+FINAL_ANSWER = (
+    "Thought: I now know the final answer\n"
+    "Final Answer: ## Overview\n"
+    "I reviewed recent write-ups, benchmarks and practitioner reports on multi-agent systems "
+    "built with CrewAI, focusing on how crews are structured and what that costs.\n\n"
+    "## Key findings\n"
+    f"- {FACTS[0]}, mostly because each agent sees fewer irrelevant instructions.\n"
+    f"- {FACTS[1]}, including tool calls and the final answer.\n"
+    f"- {FACTS[2]} than the same tasks run sequentially.\n"
+    f"- {FACTS[3]} when the same queries came up across runs.\n"
+    f"- {FACTS[4]}, so trimming what is passed between tasks matters.\n"
+    f"- {FACTS[5]} in pipelines that hand plans between crews.\n"
+    f"- {FACTS[6]} for research and writing workflows.\n"
+    f"- {FACTS[7]}, usually for outdated or unsupported claims.\n\n"
+    "## Discussion\n"
+    "Most teams start with a sequential process because it is easy to reason about. The "
+    "reports agree that clear roles matter more than the number of agents. Several authors "
+    "note that long hand-offs between tasks are the main driver of cost and latency, and "
+    "that structured outputs make downstream tasks more reliable. Hierarchical processes "
+    "pay off only when tasks genuinely need delegation.\n\n"
+    "## Summary\n"
+    "Keep crews small, give each agent one clear role, cache tool results and keep the "
+    "context passed between tasks short. Sequential crews are the cheaper default.\n\n"
+    'Plan: {"function_name": "bench_function", '
+    '"description": "Deterministic answer from the offline benchmark."}'
+)
+
+
+def _example_value(schema):
+    """
+    A fixed value that fits a JSON schema.
+    """
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "anyOf" in schema:
+        return _example_value(schema["anyOf"][0])
+    kind = schema.get("type", "string")
+    if isinstance(kind, list):
+        kind = kind[0]
+    return {"string": "benchmark", "integer": 1, "number": 1, "boolean": False,
+            "array": [], "object": {}, "null": None}.get(kind, "benchmark")
+
+
+def tool_arguments(tool):
+    parameters = tool.get("function", {}).get("parameters") or {}
+    properties = parameters.get("properties") or {}
+    required = parameters.get("required") or list(properties)
+    return {name: _example_value(properties[name]) for name in required if name in properties}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("content-length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        try:
+            body = json.loads(raw or b"{}")
+        except ValueError:
+            body = {}   # Telegram form posts
+        services = self.server.services
+        if self.path.endswith("/chat/completions"):
+            services.count("llm")
+            time.sleep(services.llm_latency)
+            self._chat(body)
+        elif self.path.startswith("/bot"):
+            services.count("telegram")
+            time.sleep(services.tool_latency)
+            self._json({"ok": True, "result": {"message_id": services.next_id(), "text": body.get("text", "")}})
+        else:
+            services.count("serper")
+            time.sleep(services.tool_latency)
+            query = body.get("q", "")
+            self._json({
+                "searchParameters": {"q": query, "type": self.path.strip("/")},
+                "organic": [
+                    {"title": f"Benchmark result {i} for {query}", "link": f"https://example.com/{i}",
+                     "snippet": f"Fixed snippet number {i} about {query}.", "position": i}
+                    for i in range(1, 4)
+                ],
+            })
+
+    def _json(self, payload, status=200):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _chat(self, body):
+        messages = body.get("messages") or []
+        tools = body.get("tools") or []
+        call_tool = tools and not any(m.get("role") == "tool" for m in messages)
+        prompt_chars = sum(len(json.dumps(m.get("content") or "")) for m in messages)
+        prompt = " ".join(m.get("content") or "" for m in messages if isinstance(m.get("content"), str))
+        self.server.services.record_facts(prompt)
+        message = {"role": "assistant", "content": FINAL_ANSWER}
+        finish = "stop"
+        if call_tool:
+            tool = tools[0]
+            message = {"role": "assistant", "content": None, "tool_calls": [{
+                "id": f"call_{self.server.services.next_id()}", "type": "function",
+                "function": {"name": tool["function"]["name"], "arguments": json.dumps(tool_arguments(tool))},
+            }]}
+            finish = "tool_calls"
+        completion_chars = len(json.dumps(message))
+        usage = {"prompt_tokens": prompt_chars // 4, "completion_tokens": completion_chars // 4,
+                 "total_tokens": (prompt_chars + completion_chars) // 4}
+        base = {"id": "chatcmpl-bench", "created": 0, "model": body.get("model", "gpt-4o-mini")}
+
+        if not body.get("stream"):
+            self._json({**base, "object": "chat.completion", "usage": usage,
+                        "choices": [{"index": 0, "message": message, "finish_reason": finish}]})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        if call_tool:
+            call = dict(message["tool_calls"][0], index=0)
+            deltas = [{"role": "assistant", "tool_calls": [call]}]
+        else:
+            deltas = [{"role": "assistant", "content": FINAL_ANSWER[i:i + 16]} for i in range(0, len(FINAL_ANSWER), 16)]
+        for delta in deltas:
+            chunk = {**base, "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+            self.wfile.write(b"data: " + json.dumps(chunk).encode("utf-8") + b"\n\n")
+        last = {**base, "object": "chat.completion.chunk", "usage": usage,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": finish}]}
+        self.wfile.write(b"data: " + json.dumps(last).encode("utf-8") + b"\n\ndata: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+class FakeServices:
+    """
+    The local stand-in server. Use as a context manager; base_url is http://127.0.0.1:<port>.
+    """
+
+    def __init__(self, llm_latency=0.05, tool_latency=0.02):
+        self.llm_latency = llm_latency
+        self.tool_latency = tool_latency
+        self.calls = {"llm": 0, "serper": 0, "telegram": 0}
+        self.context_facts = []   # per prompt that carries an upstream answer: how many FACTS it kept
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = None
+
+    def count(self, api):
+        with self._lock:
+            self.calls[api] += 1
+
+    def record_facts(self, prompt):
+        kept = sum(fact in prompt for fact in FACTS)
+        if kept:
+            with self._lock:
+                self.context_facts.append(kept)
+
+    def next_id(self):
+        with self._lock:
+            return next(self._ids)
+
+    def reset_counts(self):
+        with self._lock:
+            self.calls = dict.fromkeys(self.calls, 0)
+            self.context_facts = []
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self):
+        """
+        Environment variables pointing the phases (and crewai) at this server.
+        """
+        return {
+            "OPENAI_API_KEY": "offline-benchmark",
+            "OPENAI_BASE_URL": f"{self.base_url}/v1",
+            "OPENAI_API_BASE": f"{self.base_url}/v1",
+            "OPENAI_MODEL_NAME": "gpt-4o-mini",
+            "SERPER_API_KEY": "offline-benchmark",
+            "SERPER_API_BASE": self.base_url,
+            "TELEGRAM_BOT_TOKEN": "offline-benchmark",
+            "TELEGRAM_CHAT_ID": "1",
+            "TELEGRAM_API_BASE": self.base_url,
+            "TELEGRAM_MIN_INTERVAL_SECONDS": "0",
+        }
+
+    def __enter__(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.services = self
+        threading.Thread(target=self._server.serve_forever, name="fake-services", daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
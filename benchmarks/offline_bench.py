@@ -0,0 +1,330 @@
+"""
+Offline Phase Benchmark
+
+Goal:
+- Measure what the workshop itself costs (start-up, crew construction, prompt assembly,
+  context passing between tasks, tool dispatch) without live APIs, on any Linux box
+  with no network, and catch regressions against a saved baseline.
+
+How it works:
+- benchmarks/fakes.py stands in for OpenAI, Serper and Telegram on 127.0.0.1 with fixed
+  answers and a simulated latency per call (--llm-latency, --tool-latency).
+- Each phase script runs in a fresh process and a fresh temporary working directory
+  (phase 6 gets small sample PDF/JSON/CSV files there), --repeat times; the median of
+  each metric counts. Caches, artifact reuse and streaming are off, tracing is on.
+- Per run: wall time, CPU time and peak RSS of the phase process (from wait4), the
+  number of LLM/Serper/Telegram calls, and from the trace (workshop/tracing.py) the
+  time spent waiting on LLM and tool calls, the start-up before the first span, and
+  the overhead of every task: its duration minus the LLM and tool calls inside it, and
+  the prompt tokens its LLM calls sent. With --steps it also shows how many of the stub
+  answer's distinct findings (fakes.FACTS) the leanest downstream prompt still held.
+- --save-baseline writes the medians to the baseline file (default
+  benchmarks/offline_baseline.json); later runs compare against it and exit with 1 if
+  wall time, CPU time, peak RSS or task overhead got worse by more than --tolerance.
+
+Usage:
+    python benchmarks/offline_bench.py                         # every phase, 3 runs each
+    python benchmarks/offline_bench.py 0 3 --repeat 5 --steps  # also list per-task overhead
+    python benchmarks/offline_bench.py --save-baseline
+    python benchmarks/offline_bench.py --llm-latency 0.5       # closer to a real API
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from fakes import FACTS, FakeServices
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PHASES_DIR = os.path.join(ROOT, "phases")
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "offline_baseline.json")
+COMPARED = {"wall_s": 0.05, "cpu_s": 0.05, "peak_rss_mb": 5.0, "overhead_s": 0.02}   # metric -> noise floor
+
+# Set explicitly, so a developer's .env (load_dotenv never overrides) can't change the run
+BENCH_ENV = {
+    "CREWAI_DISABLE_TELEMETRY": "true",
+    "CREWAI_TRACING_ENABLED": "false",
+    "OTEL_SDK_DISABLED": "true",
+    "LITELLM_LOCAL_MODEL_COST_MAP": "True",
+    "PYTHONDONTWRITEBYTECODE": "1",
+    "LLM_CACHE": "0",
+    "LLM_MAX_CONCURRENCY": "",
+    "LLM_REQUESTS_PER_MINUTE": "",
+    "ARTIFACT_REUSE": "0",
+    "FLOW_STREAMING": "0",
+    "SERPER_FIXTURE": "",
+    "PDF_CACHE_DIR": "",
+    "FLOW_CHECKPOINT_PATH": "",
+    "SANDBOX_BACKEND": "subprocess",   # the stub LLM's code is ours; no Docker needed
+    "WORKSHOP_STARTUP_REPORT": "0",
+    "WORKSHOP_TRACE": "1",
+    "WORKSHOP_TRACE_OTLP_ENDPOINT": "",
+}
+
+
+# --- PHASE 6 SAMPLE FILES ---
+def sample_pdf(lines):
+    """
+    A one-page PDF with the given text lines (enough for PyPDF2 to extract).
+    """
+    text = " ".join(f"({line}) Tj 0 -16 Td" for line in lines)
+    stream = f"BT /F1 12 Tf 72 720 Td {text} ET".encode("latin-1")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def prepare_workdir(workdir):
+    outputs = os.path.join(workdir, "outputs")
+    os.makedirs(outputs, exist_ok=True)
+    rows = [{"id": i, "name": f"benchmark item {i}", "note": "offline benchmark row"} for i in range(200)]
+    with open(os.path.join(outputs, "sample_phase6.pdf"), "wb") as f:
+        f.write(sample_pdf([f"Line {i}: benchmark text about CrewAI." for i in range(30)]))
+    with open(os.path.join(outputs, "sample_phase6.json"), "w", encoding="utf-8") as f:
+        json.dump(rows, f)
+    with open(os.path.join(outputs, "sample_phase6.csv"), "w", encoding="utf-8") as f:
+        f.write("id,name,note\n")
+        f.writelines(f"{r['id']},{r['name']},{r['note']}\n" for r in rows)
+
+
+# --- ONE RUN ---
+def trace_metrics(spans, launched_at):
+    """
+    LLM/tool time, start-up and per-task overhead from the trace of one run.
+    """
+    children = defaultdict(list)
+    for span in spans:
+        children[span["parent_span_id"]].append(span)
+
+    def waiting(span):
+        # Time in LLM and tool calls under span (not double-counting nested ones), and prompt tokens sent
+        seconds, tokens = 0.0, 0
+        for child in children[span["span_id"]]:
+            if child["kind"] in ("llm", "tool"):
+                seconds += child["duration_s"]
+                tokens += child["attributes"].get("prompt_tokens", 0)
+            else:
+                nested = waiting(child)
+                seconds, tokens = seconds + nested[0], tokens + nested[1]
+        return seconds, tokens
+
+    tasks = {}
+    for span in spans:
+        if span["kind"] == "task":
+            row = tasks.setdefault(span["name"], {"duration_s": 0.0, "overhead_s": 0.0, "prompt_tokens": 0})
+            seconds, tokens = waiting(span)
+            row["duration_s"] += span["duration_s"]
+            row["overhead_s"] += max(span["duration_s"] - seconds, 0.0)
+            row["prompt_tokens"] += tokens
+    return {
+        "startup_s": (min(s["start"] for s in spans) - launched_at) if spans else None,
+        "llm_s": sum(s["duration_s"] for s in spans if s["kind"] == "llm"),
+        "tool_s": sum(s["duration_s"] for s in spans if s["kind"] == "tool"),
+        "overhead_s": sum(row["overhead_s"] for row in tasks.values()),
+        "prompt_tokens": sum(s["attributes"].get("prompt_tokens", 0) for s in spans if s["kind"] == "llm"),
+        "tasks": tasks,
+    }
+
+
+def run_once(phase, services, timeout):
+    with tempfile.TemporaryDirectory(prefix="offline-bench-") as workdir:
+        prepare_workdir(workdir)
+        trace_path = os.path.join(workdir, "traces.jsonl")
+        log_path = os.path.join(workdir, "run.log")
+        env = {**os.environ, **BENCH_ENV, **services.env(), "WORKSHOP_TRACE_PATH": trace_path}
+        services.reset_counts()
+
+        with open(log_path, "w", encoding="utf-8") as log:
+            launched_at = time.time()
+            started = time.perf_counter()
+            proc = subprocess.Popen([sys.executable, os.path.join(PHASES_DIR, f"{phase}.py")],
+                                    cwd=workdir, env=env, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT)
+            killer = threading.Timer(timeout, proc.kill)
+            killer.start()
+            try:
+                # wait4 instead of proc.wait(): it also returns the process's own CPU time and peak RSS
+                _, status, usage = os.wait4(proc.pid, 0)
+            finally:
+                killer.cancel()
+            wall = time.perf_counter() - started
+            proc.returncode = os.waitstatus_to_exitcode(status)
+
+        spans = []
+        if os.path.exists(trace_path):
+            with open(trace_path, encoding="utf-8") as f:
+                spans = [json.loads(line) for line in f if line.strip()]
+        with open(log_path, encoding="utf-8", errors="replace") as f:
+            log_tail = f.read()[-2000:]
+
+    return {
+        "ok": proc.returncode == 0,
+        "log_tail": log_tail,
+        "wall_s": wall,
+        "cpu_s": usage.ru_utime + usage.ru_stime,
+        "peak_rss_mb": usage.ru_maxrss / 1024,   # KB on Linux
+        "calls": dict(services.calls),
+        "facts_kept": min(services.context_facts, default=None),
+        **trace_metrics(spans, launched_at),
+    }
+
+
+def run_phase(phase, services, repeat, timeout):
+    """
+    Runs phase repeat times and returns the medians (plus per-task medians).
+    """
+    runs = [run_once(phase, services, timeout) for _ in range(repeat)]
+    failed = [run for run in runs if not run["ok"]]
+    if failed:
+        return {"ok": False, "log_tail": failed[0]["log_tail"]}
+
+    def median(key):
+        values = [run[key] for run in runs if run[key] is not None]
+        return statistics.median(values) if values else None
+
+    tasks = {name: {k: statistics.median(run["tasks"].get(name, {}).get(k, 0.0) for run in runs)
+                    for k in ("duration_s", "overhead_s", "prompt_tokens")}
+             for name in runs[0]["tasks"]}
+    return {
+        "ok": True,
+        **{key: median(key) for key in ("wall_s", "cpu_s", "peak_rss_mb", "startup_s", "llm_s", "tool_s", "overhead_s",
+                                  "prompt_tokens")},
+        "calls": runs[0]["calls"],
+        "facts_kept": min((run["facts_kept"] for run in runs if run["facts_kept"] is not None), default=None),
+        "tasks": tasks,
+    }
+
+
+# --- REPORT ---
+def compare(result, baseline, tolerance):
+    """
+    Returns the metrics of result that regressed against baseline.
+    """
+    regressions = []
+    for metric, floor in COMPARED.items():
+        old, new = baseline.get(metric), result.get(metric)
+        if old is None or new is None:
+            continue
+        if new > old * (1 + tolerance) and new - old > floor:
+            regressions.append(f"{metric} {old:.2f} -> {new:.2f}")
+    return regressions
+
+
+def print_table(results, baseline, tolerance, steps):
+    def fmt(value, unit="s"):
+        return "-" if value is None else f"{value:.2f}{unit}"
+    print(f"{'Phase':<30} {'wall':>7} {'cpu':>7} {'rss':>8} {'start-up':>8} {'LLM':>4} {'LLM wait':>8} "
+          f"{'tools':>6} {'overhead':>8}  vs baseline")
+    regressed = {}
+    for phase, r in results.items():
+        if not r["ok"]:
+            print(f"{phase:<30} FAILED\n{r['log_tail']}")
+            continue
+        old = (baseline or {}).get(phase)
+        regressions = compare(r, old, tolerance) if old else []
+        if regressions:
+            regressed[phase] = regressions
+        status = "no baseline" if not old else ("REGRESSED: " + ", ".join(regressions) if regressions else "ok")
+        print(f"{phase:<30} {fmt(r['wall_s']):>7} {fmt(r['cpu_s']):>7} {fmt(r['peak_rss_mb'], 'MB'):>8} "
+              f"{fmt(r['startup_s']):>8} {r['calls']['llm']:>4} {fmt(r['llm_s']):>8} {fmt(r['tool_s']):>6} "
+              f"{fmt(r['overhead_s']):>8}  {status}")
+        if steps:
+            for name, task in sorted(r["tasks"].items(), key=lambda item: -item[1]["overhead_s"]):
+                print(f"    task {name:<50} {task['duration_s']:6.2f}s total  {task['overhead_s']:6.3f}s overhead  "
+                      f"{task['prompt_tokens']:>6.0f} prompt tokens")
+            if r["facts_kept"] is not None:
+                print(f"    upstream findings in downstream prompts: at least {r['facts_kept']}/{len(FACTS)}")
+    return regressed
+
+
+def resolve(names):
+    phases = sorted(os.path.splitext(os.path.basename(p))[0] for p in glob.glob(os.path.join(PHASES_DIR, "phase*_*.py")))
+    if not names:
+        return phases
+    chosen = []
+    for name in names:
+        key = str(name).removeprefix("phase").split("_")[0]
+        match = [p for p in phases if p.split("_")[0] == f"phase{key}"]
+        if not match:
+            raise SystemExit(f"Unknown phase '{name}'. Choose from: {', '.join(phases)}")
+        chosen += match
+    return chosen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("phases", nargs="*", help="phase numbers or module names (default: all phases)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per phase; medians are reported (default 3)")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="simulated seconds per LLM call (default 0.05)")
+    parser.add_argument("--tool-latency", type=float, default=0.02,
+                        help="simulated seconds per Serper/Telegram call (default 0.02)")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds before a phase run is killed")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline file to compare with / save to")
+    parser.add_argument("--save-baseline", action="store_true", help="save this run's medians as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slow-down before a regression (default 0.25)")
+    parser.add_argument("--steps", action="store_true", help="list the overhead of every task")
+    parser.add_argument("--json", metavar="FILE", help="also write the full results as JSON")
+    args = parser.parse_args()
+
+    settings = {"llm_latency": args.llm_latency, "tool_latency": args.tool_latency, "repeat": args.repeat}
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved.get("settings", {}).get("llm_latency") != args.llm_latency or \
+                saved.get("settings", {}).get("tool_latency") != args.tool_latency:
+            print(f"Baseline {args.baseline} was measured with other latencies; not comparing.")
+        else:
+            baseline = saved["phases"]
+
+    results = {}
+    with FakeServices(args.llm_latency, args.tool_latency) as services:
+        for phase in resolve(args.phases):
+            print(f"Running {phase} x{args.repeat}...", flush=True)
+            results[phase] = run_phase(phase, services, args.repeat, args.timeout)
+
+    print()
+    regressed = print_table(results, baseline, args.tolerance, args.steps)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "phases": results}, f, indent=2)
+    if args.save_baseline:
+        payload = {"settings": settings, "python": sys.version.split()[0], "platform": platform.platform(),
+                   "saved_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                   "phases": {p: {k: v for k, v in r.items() if k != "log_tail"} for p, r in results.items() if r["ok"]}}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+
+    failed = [phase for phase, r in results.items() if not r["ok"]]
+    if failed or regressed:
+        print(f"\n{len(failed)} failed, {len(regressed)} regressed.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
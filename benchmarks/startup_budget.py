@@ -0,0 +1,109 @@
+"""
+Start-up Budget Benchmark
+
+Goal:
+- Keep importing a phase script cheap, so CLI runs and cold-started workers don't pay
+  for crewai before they need it.
+
+How it works:
+- Each phase is imported in a fresh interpreter with `python -X importtime`, a few times,
+  keeping the fastest run. The report shows the import time of the phase module and the
+  slowest modules it pulled in.
+- The run fails (exit code 1) if a phase takes longer than the budget, or if it imports
+  one of the heavy libraries (crewai, crewai_tools, PyPDF2, requests, ...) at import time;
+  those belong behind workshop/lazy.py.
+
+Usage:
+    python benchmarks/startup_budget.py                      # every phase
+    python benchmarks/startup_budget.py phase6_file_qa_fallback --budget 0.2
+    STARTUP_BUDGET_SECONDS=0.3 python benchmarks/startup_budget.py
+"""
+
+import argparse
+import glob
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PHASES_DIR = os.path.join(ROOT, "phases")
+HEAVY_MODULES = ("crewai", "crewai_tools", "PyPDF2", "requests", "litellm", "openai", "numpy")
+
+
+def import_profile(module):
+    """
+    Imports module in a fresh interpreter and returns {package: (self_us, cumulative_us)}
+    for module and everything imported on its behalf (interpreter start-up is left out).
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PHASES_DIR, capture_output=True, text=True,
+        # Tracing imports crewai up front on purpose; measure the default start-up
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1", "WORKSHOP_TRACE": "0"},
+    )
+    if proc.returncode:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []   # (nesting depth, name, self_us, cumulative_us) in the order Python reports them
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((depth, name.strip(), int(self_us), int(cumulative_us)))
+    # A module is reported after its own imports, so the phase's imports are the nested
+    # rows just before its top-level row
+    end = max(i for i, row in enumerate(rows) if row[:2] == (0, module))
+    start = end
+    while start and rows[start - 1][0] > 0:
+        start -= 1
+    return {name: (self_us, cumulative_us) for _, name, self_us, cumulative_us in rows[start:end + 1]}
+
+
+def measure(module, repeat):
+    """
+    Returns (seconds, profile) for the fastest of repeat imports.
+    """
+    best = None
+    for _ in range(repeat):
+        profile = import_profile(module)
+        seconds = profile[module][1] / 1e6
+        if best is None or seconds < best[0]:
+            best = (seconds, profile)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("phases", nargs="*", help="phase module names (default: all phases)")
+    parser.add_argument("--budget", type=float, default=float(os.getenv("STARTUP_BUDGET_SECONDS", "0.5")),
+                        help="maximum import time per phase in seconds (default 0.5)")
+    parser.add_argument("--repeat", type=int, default=3, help="imports per phase; the fastest counts")
+    parser.add_argument("--top", type=int, default=5, help="slowest imports to list per phase")
+    args = parser.parse_args()
+
+    phases = args.phases or sorted(
+        os.path.splitext(os.path.basename(p))[0] for p in glob.glob(os.path.join(PHASES_DIR, "phase*.py"))
+    )
+    failures = []
+    for module in phases:
+        seconds, profile = measure(module, args.repeat)
+        heavy = sorted({name.split(".")[0] for name in profile} & set(HEAVY_MODULES))
+        ok = seconds <= args.budget and not heavy
+        print(f"{'OK  ' if ok else 'FAIL'} {module:<30} {seconds * 1000:8.1f} ms  (budget {args.budget * 1000:.0f} ms)")
+        slowest = sorted(((cum, name) for name, (_, cum) in profile.items() if name != module), reverse=True)
+        for cumulative_us, name in slowest[:args.top]:
+            print(f"       {name:<40} {cumulative_us / 1000:8.1f} ms")
+        if heavy:
+            print(f"       imported at start-up: {', '.join(heavy)}")
+        if not ok:
+            failures.append(module)
+
+    if failures:
+        print(f"\n{len(failures)} phase(s) over the start-up budget: {', '.join(failures)}")
+        return 1
+    print(f"\nAll {len(phases)} phases within the start-up budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,58 +7,75 @@ Goal:
 
 Skills:
 - CrewAI installation, API keys, agent definition, task chaining, process running.
+- Web searches go through a shared cache (workshop/search_cache.py), so the agent and
+  task never pay twice for the same query.
+- Agents and tools come from a lazy registry (workshop/registry.py): they are built on
+  first use by make_crew(), not when the script is imported.
 """
 
 from dotenv import load_dotenv
 load_dotenv()
 
-from crewai import Agent, Task, Crew, Process
-from crewai_tools import SerperDevTool
+from workshop.llm_cache import agent_llm
+from workshop.registry import registry, web_search_tool, print_report
+from workshop.lazy import lazy_import
+
+# Imported on first use (see workshop/lazy.py), so importing this script stays fast
+crewai = lazy_import("crewai")
 
 # --- AGENTS ---
-researcher = Agent(
-    role="Researcher",
-    goal="Find key facts about CrewAI",
-    backstory="An expert at online research and fact-finding.",
-    tools=[SerperDevTool()],
-    verbose=True
-)
+# Registered, not built: importing this script creates no agents or tools
+@registry.register("phase0.researcher")
+def researcher():
+    return crewai.Agent(
+        role="Researcher",
+        goal="Find key facts about CrewAI",
+        backstory="An expert at online research and fact-finding.",
+        tools=[web_search_tool()],
+        llm=agent_llm(),
+        verbose=True
+    )
 
-writer = Agent(
-    role="Summary Writer",
-    goal="Write a concise summary from research findings.",
-    backstory="Skilled at making complex info easy for beginners.",
-    verbose=True
-)
+@registry.register("phase0.writer")
+def writer():
+    return crewai.Agent(
+        role="Summary Writer",
+        goal="Write a concise summary from research findings.",
+        backstory="Skilled at making complex info easy for beginners.",
+        llm=agent_llm(),
+        verbose=True
+    )
 
-# --- TASKS ---
+# --- TASKS & CREW ---
 topic = "CrewAI basics and use cases"
 
-research_task = Task(
-    description=f"Research: '{topic}'. List 3 key facts or use cases.",
-    expected_output="A bullet list of 3 key facts about CrewAI.",
-    agent=researcher,
-    tools=[SerperDevTool()]
-)
-
-summary_task = Task(
-    description="Summarize the research findings in plain English, max 100 words.",
-    expected_output="A readable, 2-3 sentence summary for beginners.",
-    agent=writer,
-    context=[research_task]
-)
-
-# --- CREW ---
-crew = Crew(
-    agents=[researcher, writer],
-    tasks=[research_task, summary_task],
-    process=Process.sequential,
-    verbose=True
-)
+def make_crew():
+    research_task = crewai.Task(
+        description=f"Research: '{topic}'. List 3 key facts or use cases.",
+        expected_output="A bullet list of 3 key facts about CrewAI.",
+        agent=researcher(),
+        tools=[web_search_tool()]
+    )
+    summary_task = crewai.Task(
+        description="Summarize the research findings in plain English, max 100 words.",
+        expected_output="A readable, 2-3 sentence summary for beginners.",
+        agent=writer(),
+        context=[research_task]
+    )
+    return crewai.Crew(
+        agents=[researcher(), writer()],
+        tasks=[research_task, summary_task],
+        process=crewai.Process.sequential,
+        verbose=True
+    )
 
 # --- RUN ---
-if __name__ == "__main__":
-    result = crew.kickoff()
+def main():
+    result = make_crew().kickoff()
     print("\n====== FINAL SUMMARY ======")
     print(result)
     print("===========================")
+    print_report()
+
+if __name__ == "__main__":
+    main()
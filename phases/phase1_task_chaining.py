@@ -7,6 +7,13 @@ Goal:
 
 Skills:
 - Three agents, multi-task chaining, output context, bullet list and paragraph outputs.
+- The report is saved through the artifact store (workshop/artifacts.py): written
+  atomically and only when it changed. If no task, agent or model changed since the
+  report was made, and it is less than ARTIFACT_TTL_SECONDS old (default 1 hour; the
+  research uses live web search), the crew doesn't run again and the saved report is
+  reused (ARTIFACT_REUSE=0 forces a new run).
+- The analyst and writer get a compacted version of the previous answer (duplicates
+  dropped, and at most CONTEXT_MAX_TOKENS if set; see workshop/context_compaction.py).
 
 Agents:
 - Researcher: Finds key facts.
@@ -20,72 +27,103 @@ Outputs:
 from dotenv import load_dotenv
 load_dotenv()
 
-from crewai import Agent, Task, Crew, Process
-from crewai_tools import SerperDevTool, FileWriterTool
+from workshop.artifacts import get_artifact_store, live_max_age, output_writer, reuse_enabled, task_inputs
+from workshop.context_compaction import compact_context
+from workshop.llm_cache import agent_llm
+from workshop.registry import registry, web_search_tool, file_writer_tool, print_report
+from workshop.lazy import lazy_import
+
+# Imported on first use (see workshop/lazy.py), so importing this script stays fast
+crewai = lazy_import("crewai")
 
 # --- AGENTS ---
-researcher = Agent(
-    role="Researcher",
-    goal="Find key facts about CrewAI workflows",
-    backstory="Expert at online research and info gathering.",
-    tools=[SerperDevTool()],
-    verbose=True
-)
+@registry.register("phase1.researcher")
+def researcher():
+    return crewai.Agent(
+        role="Researcher",
+        goal="Find key facts about CrewAI workflows",
+        backstory="Expert at online research and info gathering.",
+        tools=[web_search_tool()],
+        llm=agent_llm(),
+        verbose=True
+    )
 
-analyst = Agent(
-    role="Analyst",
-    goal="Analyze research and extract actionable insights.",
-    backstory="Skilled in seeing the big picture and hidden value.",
-    verbose=True
-)
+@registry.register("phase1.analyst")
+def analyst():
+    return crewai.Agent(
+        role="Analyst",
+        goal="Analyze research and extract actionable insights.",
+        backstory="Skilled in seeing the big picture and hidden value.",
+        llm=agent_llm(),
+        verbose=True
+    )
 
-writer = Agent(
-    role="Report Writer",
-    goal="Write a clear, simple report from analysis.",
-    backstory="Experienced in technical writing and user docs.",
-    tools=[FileWriterTool()],
-    verbose=True
-)
+@registry.register("phase1.writer")
+def writer():
+    return crewai.Agent(
+        role="Report Writer",
+        goal="Write a clear, simple report from analysis.",
+        backstory="Experienced in technical writing and user docs.",
+        tools=[file_writer_tool()],
+        llm=agent_llm(),
+        verbose=True
+    )
 
-# --- TASKS ---
+# --- TASKS & CREW ---
 topic = "CrewAI workflow best practices"
+report_path = "outputs/report_phase1.md"
 
-research_task = Task(
-    description=f"Research: '{topic}'. List 3 important best practices for using CrewAI.",
-    expected_output="A bullet list of 3 best practices for CrewAI workflows.",
-    agent=researcher,
-    tools=[SerperDevTool()]
-)
-
-analysis_task = Task(
-    description="Analyze the research findings. Summarize main themes and highlight one surprising insight.",
-    expected_output="A 2-3 sentence paragraph summarizing main insights and a bullet of the most surprising one.",
-    agent=analyst,
-    context=[research_task]
-)
-
-report_task = Task(
-    description="Write a user-friendly Markdown report with a short intro, analysis, and closing.",
-    expected_output="A Markdown report. Use headings and at least one bullet list.",
-    agent=writer,
-    context=[analysis_task],
-    markdown=True,
-    output_file="outputs/report_phase1.md"
-)
-
-# --- CREW ---
-crew = Crew(
-    agents=[researcher, analyst, writer],
-    tasks=[research_task, analysis_task, report_task],
-    process=Process.sequential,
-    verbose=True
-)
+def make_crew():
+    research_task = crewai.Task(
+        description=f"Research: '{topic}'. List 3 important best practices for using CrewAI.",
+        expected_output="A bullet list of 3 best practices for CrewAI workflows.",
+        agent=researcher(),
+        tools=[web_search_tool()]
+    )
+    analysis_task = crewai.Task(
+        description="Analyze the research findings. Summarize main themes and highlight one surprising insight.",
+        expected_output="A 2-3 sentence paragraph summarizing main insights and a bullet of the most surprising one.",
+        agent=analyst(),
+        context=[research_task]
+    )
+    report_task = crewai.Task(
+        description="Write a user-friendly Markdown report with a short intro, analysis, and closing.",
+        expected_output="A Markdown report. Use headings and at least one bullet list.",
+        agent=writer(),
+        context=[analysis_task],
+        markdown=True
+    )
+    # Downstream tasks get a deduplicated (and, with CONTEXT_MAX_TOKENS, budgeted) upstream answer
+    compact_context(analysis_task)
+    compact_context(report_task)
+    # The report depends on all three tasks; saved by the store instead of output_file
+    inputs = task_inputs(research_task, analysis_task, report_task)
+    report_task.callback = output_writer(report_path, "phase1.report_task", inputs)
+    return crewai.Crew(
+        agents=[researcher(), analyst(), writer()],
+        tasks=[research_task, analysis_task, report_task],
+        process=crewai.Process.sequential,
+        verbose=True
+    )
 
 # --- RUN ---
-if __name__ == "__main__":
-    result = crew.kickoff()
+def main():
+    crew = make_crew()
+    inputs = task_inputs(*crew.tasks)
+    # The research searches the web live, so the report is only reused while it is recent
+    store = get_artifact_store()
+    result = store.reuse(report_path, "phase1.report_task", inputs, max_age=live_max_age()) if reuse_enabled() else None
+    if result is not None:
+        print(f"[artifacts] Tasks unchanged since {report_path} was made, within ARTIFACT_TTL_SECONDS: "
+              f"reusing it (ARTIFACT_REUSE=0 to re-run).")
+    else:
+        result = crew.kickoff()
     print("\n====== REPORT CREATED ======")
-    print("The Markdown report is saved in outputs/report_phase1.md")
+    print(f"The Markdown report is saved in {report_path}")
     print("Report preview:\n")
     print(result)
     print("===========================")
+    print_report()
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,15 @@ Skills:
 
 Outputs:
 - Prints report and "simulated Telegram post" to console.
+- With FLOW_STREAMING=1 the crew's output is streamed (workshop/streaming.py) and the
+  time to first token of each step is reported at the end.
+- The post goes through an outbox (workshop/outbox.py): the flow only enqueues it, and a
+  background worker delivers it with retries, so the flow never waits on the network.
+- Every finished step is checkpointed (workshop/checkpoints.py). If a run fails, the next
+  run resumes after the last finished step; --replay last [--from-step STEP] re-runs a
+  recorded run, skipping the steps it already finished, and --runs lists the runs.
+- The analyst and writer get a compacted version of the previous answer (duplicates
+  dropped, and at most CONTEXT_MAX_TOKENS if set; see workshop/context_compaction.py).
 
 Agents:
 - Researcher: Web research
@@ -23,103 +32,162 @@ Custom Tool:
 from dotenv import load_dotenv
 load_dotenv()
 
-from crewai import Agent, Task, Crew, Process
-from crewai_tools import SerperDevTool
-from crewai.flow.flow import Flow, start, listen
-from crewai.tools import tool
 from pydantic import BaseModel
+import argparse
+import sys
+
+from workshop.checkpoints import add_arguments, checkpointed, kickoff_checkpointed, kickoff_options, print_runs
+from workshop.context_compaction import compact_context
+from workshop.llm_cache import agent_llm
+from workshop.registry import registry, web_search_tool, print_report
+from workshop.outbox import get_outbox
+from workshop.streaming import kickoff_crew, stream_log, streaming_enabled
+from workshop.lazy import lazy_import
+
+# Imported on first use (see workshop/lazy.py), so importing this script stays fast
+crewai = lazy_import("crewai")
+crewai_flow = lazy_import("crewai.flow.flow")
 
 # --- AGENTS ---
-researcher = Agent(
-    role="Researcher",
-    goal="Find the most recent news about CrewAI.",
-    backstory="Always up-to-date on AI frameworks.",
-    tools=[SerperDevTool()],
-    verbose=True
-)
-
-analyst = Agent(
-    role="Analyst",
-    goal="Summarize and highlight the significance of CrewAI news.",
-    backstory="Great at making sense of new trends.",
-    verbose=True
-)
-
-writer = Agent(
-    role="Writer",
-    goal="Write a Markdown summary of CrewAI developments.",
-    backstory="Communicates complex news simply.",
-    verbose=True
-)
+# Built on first use and then shared by every crew make_crew() returns
+@registry.register("phase2.researcher")
+def researcher():
+    return crewai.Agent(
+        role="Researcher",
+        goal="Find the most recent news about CrewAI.",
+        backstory="Always up-to-date on AI frameworks.",
+        tools=[web_search_tool()],
+        llm=agent_llm(),
+        verbose=True
+    )
+
+@registry.register("phase2.analyst")
+def analyst():
+    return crewai.Agent(
+        role="Analyst",
+        goal="Summarize and highlight the significance of CrewAI news.",
+        backstory="Great at making sense of new trends.",
+        llm=agent_llm(),
+        verbose=True
+    )
+
+@registry.register("phase2.writer")
+def writer():
+    return crewai.Agent(
+        role="Writer",
+        goal="Write a Markdown summary of CrewAI developments.",
+        backstory="Communicates complex news simply.",
+        llm=agent_llm(),
+        verbose=True
+    )
 
 # --- CREW DEFINITION FUNCTION ---
 def make_crew(topic):
-    research_task = Task(
+    research_task = crewai.Task(
         description=f"Research the latest about '{topic}'. List the top 2-3 new things.",
         expected_output="A bullet list of the most significant recent CrewAI news.",
-        agent=researcher,
-        tools=[SerperDevTool()]
+        agent=researcher(),
+        tools=[web_search_tool()]
     )
-    analysis_task = Task(
+    analysis_task = crewai.Task(
         description="Analyze the research findings and explain why they're important.",
         expected_output="A 2-3 sentence explanation of the most significant insight.",
-        agent=analyst,
+        agent=analyst(),
         context=[research_task]
     )
-    report_task = Task(
+    report_task = crewai.Task(
         description="Write a Markdown summary report of the findings and analysis.",
         expected_output="A Markdown report, with headings and bullet points.",
-        agent=writer,
+        agent=writer(),
         context=[analysis_task],
         markdown=True
     )
-    return Crew(
-        agents=[researcher, analyst, writer],
+    # Downstream tasks get a deduplicated (and, with CONTEXT_MAX_TOKENS, budgeted) upstream answer
+    compact_context(analysis_task)
+    compact_context(report_task)
+    return crewai.Crew(
+        agents=[researcher(), analyst(), writer()],
         tasks=[research_task, analysis_task, report_task],
-        process=Process.sequential,
+        process=crewai.Process.sequential,
         verbose=True
     )
 
 # --- CUSTOM TOOL ---
-@tool("Post to Telegram")
-def post_to_telegram(report_text: str) -> str:
+def print_simulated_post(payload):
     """
-    Simulates posting a report to Telegram by printing it to the console.
+    Outbox handler: "delivers" a queued post by printing it to the console.
     """
     print("\n==== [Simulated Telegram Post] ====")
-    print(report_text)
+    print(payload["text"])
     print("==== [End Telegram Post] ====\n")
-    return "Posted to Telegram (simulated)!"
+
+@registry.tool("Post to Telegram")
+def post_to_telegram(report_text: str) -> str:
+    """
+    Simulates posting a report to Telegram by printing it to the console.
+    The post is queued and delivered in the background, so this returns at once.
+    """
+    outbox = get_outbox()
+    outbox.register("telegram_simulated", print_simulated_post)
+    outbox.put("telegram_simulated", {"text": report_text})
+    return "Queued for Telegram (simulated)!"
 
 # --- FLOW DEFINITION ---
 class FlowState(BaseModel):
     topic: str = ""
     report: str = ""
 
-class CrewFlow(Flow[FlowState]):
-    @start()
-    def get_topic(self):
-        self.state.topic = "CrewAI framework"
-        print(f"\n[Flow] Topic: {self.state.topic}")
-        return self.state.topic
-
-    @listen(get_topic)
-    def run_crew(self, topic):
-        print("\n[Flow] Running crew...")
-        crew = make_crew(topic)
-        result = crew.kickoff()
-        self.state.report = str(result)
-        return self.state.report
-
-    @listen(run_crew)
-    def post_report(self, report):
-        print("[Flow] Posting the report to Telegram...")
-        return post_to_telegram.run(report)
+# The Flow class is defined on first use: its base class comes from crewai
+@registry.register("phase2.CrewFlow")
+def crew_flow_class():
+    Flow, start, listen = crewai_flow.Flow, crewai_flow.start, crewai_flow.listen
+
+    class CrewFlow(Flow[FlowState]):
+        @start()
+        @checkpointed
+        def get_topic(self):
+            self.state.topic = "CrewAI framework"
+            print(f"\n[Flow] Topic: {self.state.topic}")
+            return self.state.topic
+
+        @listen(get_topic)
+        @checkpointed
+        def run_crew(self, topic):
+            print("\n[Flow] Running crew...")
+            crew = make_crew(topic)
+            result = kickoff_crew(crew, "run_crew")
+            self.state.report = str(result)
+            return self.state.report
+
+        @listen(run_crew)
+        @checkpointed
+        def post_report(self, report):
+            print("[Flow] Posting the report to Telegram...")
+            return post_to_telegram().run(report)
+
+    return CrewFlow
 
 # --- RUN ---
-if __name__ == "__main__":
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Research a topic with a crew inside a flow and post the report.")
+    add_arguments(parser)
+    # run.py calls main() without arguments: never read its command line
+    args = parser.parse_args(argv or [])
+    if args.runs:
+        print_runs("CrewFlow")
+        return
+
+    CrewFlow = crew_flow_class()
     flow = CrewFlow()
-    result = flow.kickoff()
+    result = kickoff_checkpointed(flow, **kickoff_options(args))
     print("\n====== FLOW COMPLETE ======")
     print("Final step result:", result)
+    # The flow is done; now wait for the queued post to go out before exiting
+    get_outbox().drain(timeout=30)
     print("===========================")
+    if streaming_enabled():
+        print(stream_log.report())
+    print_report()
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -4,10 +4,38 @@ PHASE 3: Multi-Crew Planning and Code Execution Pipeline
 Goal:
 - Chain two specialized crews: planning crew → execution crew, orchestrated by a Flow.
 - Pass structured info (JSON plan) from one crew to the next.
-- Let an agent write code (with CodeInterpreterTool/Docker), then QA agent reviews it.
+- Let an agent write and run code (in a pre-warmed sandbox), then QA agent reviews it.
 
 Skills:
 - Multi-crew flows, JSON output as contract, code execution tool, QA automation, error handling.
+- The plan is read with workshop/structured_output.py: the first JSON object in the answer
+  is validated against FunctionPlan, and common defects are repaired without another LLM run.
+- Context passed between tasks is compacted (workshop/context_compaction.py): duplicate
+  sentences dropped (and prose kept within CONTEXT_MAX_TOKENS if set), while JSON and code pass
+  through exactly as written.
+- With FLOW_STREAMING=1 the planner's tokens are streamed (workshop/streaming.py) and the
+  execution crew starts as soon as the plan JSON closes. Time to first token and latency
+  saved per step are printed at the end.
+- Agents and the code interpreter are built lazily (workshop/registry.py) and reused by
+  every crew the flow makes.
+- The developer's code runs in a pool of warm sandboxes (workshop/sandbox_pool.py)
+  instead of a fresh Docker container per run: every run is a process forked from a warm
+  interpreter (nothing carries over between runs), with memory/CPU/time limits and no
+  cold start. By default (SANDBOX_BACKEND=docker)
+  each sandbox is an isolated Docker container with no network and a read-only
+  filesystem, so a Docker daemon is required. SANDBOX_BACKEND=subprocess (tests, offline
+  runs) uses plain processes on this machine instead: they can read your files and use
+  the network, so only use it for code you would run yourself.
+- Batch mode runs many requests through the flow at once:
+  `python phases/phase3_creator_prototype.py --batch requests.txt` (one request per line).
+  CREATOR_BATCH_CONCURRENCY flows run at a time (default 4; --concurrency overrides it),
+  each with its own copies of the agents, and the LLM calls of all of them share the
+  budget set by LLM_MAX_CONCURRENCY / LLM_REQUESTS_PER_MINUTE (workshop/rate_limit.py).
+  Results are tracked per request and saved to outputs/phase3_batch_results.json.
+- Every finished step is checkpointed (workshop/checkpoints.py): if the execution crew
+  fails after a good plan, the next run (or batch) resumes with the saved plan instead of
+  planning again. --replay last [--from-step STEP] re-runs a recorded run, skipping the
+  steps it already finished; --runs lists the runs.
 
 Agents:
 - Intake: Clarify user intent.
@@ -17,132 +45,315 @@ Agents:
 
 Outputs:
 - Console logs. The QA agent's review appears at the end.
+- Batch mode: a per-request summary and outputs/phase3_batch_results.json.
 """
 
 from dotenv import load_dotenv
 load_dotenv()
 
-from crewai import Agent, Task, Crew, Process
-from crewai_tools import CodeInterpreterTool
-from crewai.flow.flow import Flow, start, listen
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, field_validator
+import argparse
 import json
+import os
+import re
+import sys
+import time
+
+from workshop.checkpoints import (add_arguments, checkpointed, kickoff_checkpointed, kickoff_checkpointed_async,
+                                  kickoff_options, print_runs)
+from workshop.context_compaction import compact_context
+from workshop.llm_cache import agent_llm
+from workshop.parallel import run_jobs
+from workshop.rate_limit import get_llm_limiter
+from workshop.registry import registry, code_interpreter_tool, print_report
+from workshop.structured_output import parse_model, StreamingModelParser
+from workshop.streaming import kickoff_crew, stream_crew, stream_log, streaming_enabled
+from workshop.lazy import lazy_import
+
+# Imported on first use (see workshop/lazy.py), so importing this script stays fast
+crewai = lazy_import("crewai")
+crewai_flow = lazy_import("crewai.flow.flow")
+
+DEFAULT_REQUEST = "Write a Python function to check if a number is prime."
+BATCH_CONCURRENCY = int(os.getenv("CREATOR_BATCH_CONCURRENCY", "4"))
+BATCH_TIMEOUT = float(os.getenv("CREATOR_BATCH_TIMEOUT_SECONDS", "0")) or None
+BATCH_RESULTS_PATH = "outputs/phase3_batch_results.json"
 
 # --- PLANNING CREW ---
-intake_agent = Agent(
-    role="Intake Specialist",
-    goal="Clarify and rephrase user requests for Python functions.",
-    backstory="Acts as the interface between users and the planning team.",
-    verbose=True
-)
-
-planner_agent = Agent(
-    role="Function Planner",
-    goal="Create a clear JSON plan for a Python function.",
-    backstory="Expert at transforming user requests into technical specs.",
-    verbose=True
-)
+@registry.register("phase3.intake_agent")
+def intake_agent():
+    return crewai.Agent(
+        role="Intake Specialist",
+        goal="Clarify and rephrase user requests for Python functions.",
+        backstory="Acts as the interface between users and the planning team.",
+        llm=agent_llm(),
+        verbose=True
+    )
+
+@registry.register("phase3.planner_agent")
+def planner_agent():
+    return crewai.Agent(
+        role="Function Planner",
+        goal="Create a clear JSON plan for a Python function.",
+        backstory="Expert at transforming user requests into technical specs.",
+        llm=agent_llm(),
+        verbose=True
+    )
 
 def make_planning_crew(user_request):
-    intake_task = Task(
+    intake_task = crewai.Task(
         description=f"Clarify and rephrase this request: '{user_request}'.",
         expected_output="A one-sentence, clarified description of the function.",
-        agent=intake_agent
+        agent=intake_agent()
     )
-    plan_task = Task(
+    plan_task = crewai.Task(
         description="Based on the clarification, create a JSON plan: {\"function_name\": str, \"description\": str}.",
         expected_output="A valid JSON object with 'function_name' and 'description'.",
-        agent=planner_agent,
+        agent=planner_agent(),
         context=[intake_task]
     )
-    return Crew(
-        agents=[intake_agent, planner_agent],
+    compact_context(plan_task)
+    return crewai.Crew(
+        agents=[intake_agent(), planner_agent()],
         tasks=[intake_task, plan_task],
-        process=Process.sequential,
+        process=crewai.Process.sequential,
         verbose=True
     )
 
 # --- EXECUTION CREW ---
-developer_agent = Agent(
-    role="Developer",
-    goal="Implement the planned function in Python.",
-    backstory="Writes robust Python code based on specs.",
-    tools=[CodeInterpreterTool()],
-    allow_code_execution=True,
-    code_execution_mode="safe",
-    verbose=True
-)
-
-qa_agent = Agent(
-    role="QA Reviewer",
-    goal="Review and critique the function code.",
-    backstory="Looks for correctness, clarity, and suggests improvements.",
-    verbose=True
-)
+# The code interpreter is built once and shared by the agent and every execution crew
+@registry.register("phase3.developer_agent")
+def developer_agent():
+    return crewai.Agent(
+        role="Developer",
+        goal="Implement the planned function in Python.",
+        backstory="Writes robust Python code based on specs.",
+        tools=[code_interpreter_tool()],
+        llm=agent_llm(),
+        verbose=True
+    )
+
+@registry.register("phase3.qa_agent")
+def qa_agent():
+    return crewai.Agent(
+        role="QA Reviewer",
+        goal="Review and critique the function code.",
+        backstory="Looks for correctness, clarity, and suggests improvements.",
+        llm=agent_llm(),
+        verbose=True
+    )
 
 def make_execution_crew(plan_json):
-    dev_task = Task(
+    dev_task = crewai.Task(
         description=f"Write a complete Python function based on this JSON: {json.dumps(plan_json)}",
         expected_output="A valid, well-commented Python function.",
-        agent=developer_agent,
-        tools=[CodeInterpreterTool()]
+        agent=developer_agent(),
+        tools=[code_interpreter_tool()]
     )
-    qa_task = Task(
+    qa_task = crewai.Task(
         description="Review the function for correctness and suggest at least one improvement.",
         expected_output="QA feedback paragraph.",
-        agent=qa_agent,
+        agent=qa_agent(),
         context=[dev_task]
     )
-    return Crew(
-        agents=[developer_agent, qa_agent],
+    # QA sees the code exactly as written; only the prose around it is compacted
+    compact_context(qa_task)
+    return crewai.Crew(
+        agents=[developer_agent(), qa_agent()],
         tasks=[dev_task, qa_task],
-        process=Process.sequential,
+        process=crewai.Process.sequential,
         verbose=True
     )
 
+# --- PLAN CONTRACT ---
+class FunctionPlan(BaseModel):
+    """
+    The JSON the planning crew must produce; checked before the execution crew runs.
+    """
+    model_config = ConfigDict(extra="allow")
+
+    function_name: str
+    description: str
+
+    @field_validator("function_name")
+    @classmethod
+    def python_identifier(cls, name):
+        # "is prime" / "is_prime()" -> "is_prime"
+        fixed = re.sub(r"\W+", "_", name.strip().removesuffix("()")).strip("_")
+        if not fixed.isidentifier():
+            raise ValueError(f"'{name}' is not a valid Python function name")
+        return fixed
+
+def stream_plan(planning_crew):
+    """
+    Reads the planner's tokens as they arrive and returns (plan, repaired) as soon as a
+    valid plan object closes; the planner's trailing text finishes in the background
+    while the execution crew already runs.
+    """
+    stream = stream_crew(planning_crew, "run_planning_crew")
+    parser = StreamingModelParser(FunctionPlan)
+    for token in stream.tokens(agent_role=planner_agent().role):
+        if parser.feed(token) is not None:
+            stream.mark_ready()
+            return parser.result, parser.repaired
+    # Nothing usable was streamed (e.g. the answer came from the LLM cache): use the final answer
+    return parse_model(stream.wait().raw, FunctionPlan)
+
 # --- FLOW ---
 class CreatorState(BaseModel):
     user_request: str = ""
+    own_agents: bool = False   # set for batch runs, see own_crew()
     plan_json: dict = {}
     qa_feedback: str = ""
 
-class CreatorFlow(Flow[CreatorState]):
-    @start()
-    def get_user_request(self):
-        self.state.user_request = "Write a Python function to check if a number is prime."
-        print(f"\n[Flow] User Request: {self.state.user_request}")
-        return self.state.user_request
-
-    @listen(get_user_request)
-    def run_planning_crew(self, user_request):
-        print("[Flow] Running planning crew...")
-        planning_crew = make_planning_crew(user_request)
-        result = planning_crew.kickoff()
-        # Extract JSON from result
-        raw = result.raw.strip()
-        if raw.startswith("```"):
-            import re
-            raw = re.sub(r"^```[a-zA-Z]*\n?", "", raw)
-            raw = re.sub(r"\n?```$", "", raw)
-        plan_json = json.loads(raw)
-        self.state.plan_json = plan_json
-        print(f"[Flow] Plan JSON: {plan_json}")
-        return plan_json
-
-    @listen(run_planning_crew)
-    def run_execution_crew(self, plan_json):
-        print("[Flow] Running execution crew...")
-        execution_crew = make_execution_crew(plan_json)
-        result = execution_crew.kickoff()
-        self.state.qa_feedback = str(result)
-        print("[Flow] QA Feedback:\n", self.state.qa_feedback)
-        return self.state.qa_feedback
+def own_crew(crew):
+    """
+    A copy of crew with its own agents. The shared agents from the registry keep state
+    while they work, so flows running at the same time must not share them. The copies
+    are quiet, so concurrent runs don't interleave their logs.
+    """
+    crew = crew.copy()
+    crew.verbose = False
+    for agent in crew.agents:
+        agent.verbose = False
+    return crew
+
+# The Flow class is defined on first use: its base class comes from crewai
+@registry.register("phase3.CreatorFlow")
+def creator_flow_class():
+    Flow, start, listen = crewai_flow.Flow, crewai_flow.start, crewai_flow.listen
+
+    class CreatorFlow(Flow[CreatorState]):
+        @start()
+        @checkpointed
+        def get_user_request(self):
+            # Batch runs pass the request in kickoff(inputs=...)
+            self.state.user_request = self.state.user_request or DEFAULT_REQUEST
+            print(f"\n[Flow] User Request: {self.state.user_request}")
+            return self.state.user_request
+
+        @listen(get_user_request)
+        @checkpointed
+        def run_planning_crew(self, user_request):
+            print("[Flow] Running planning crew...")
+            planning_crew = make_planning_crew(user_request)
+            if self.state.own_agents:
+                planning_crew = own_crew(planning_crew)
+            if streaming_enabled():
+                plan, repaired = stream_plan(planning_crew)
+            else:
+                result = planning_crew.kickoff()
+                # Take the first JSON object that fits the contract, wherever it sits in the answer;
+                # small defects are fixed locally instead of re-running the crew
+                plan, repaired = parse_model(result.raw, FunctionPlan)
+            if repaired:
+                print("[Flow] Plan JSON was malformed and has been repaired locally.")
+            plan_json = plan.model_dump()
+            self.state.plan_json = plan_json
+            print(f"[Flow] Plan JSON: {plan_json}")
+            return plan_json
+
+        @listen(run_planning_crew)
+        @checkpointed
+        def run_execution_crew(self, plan_json):
+            print("[Flow] Running execution crew...")
+            execution_crew = make_execution_crew(plan_json)
+            if self.state.own_agents:
+                execution_crew = own_crew(execution_crew)
+            result = kickoff_crew(execution_crew, "run_execution_crew")
+            self.state.qa_feedback = str(result)
+            print("[Flow] QA Feedback:\n", self.state.qa_feedback)
+            return self.state.qa_feedback
+
+    return CreatorFlow
+
+# --- BATCH ---
+def run_batch(user_requests, max_concurrency=None, timeout=None):
+    """
+    Runs one CreatorFlow per request, max_concurrency (default CREATOR_BATCH_CONCURRENCY)
+    at a time. Returns a CrewRun per request, in order, whose result is the flow's state.
+    """
+    CreatorFlow = creator_flow_class()
+
+    def job(user_request):
+        async def run():
+            flow = CreatorFlow()
+            # A request whose last run failed resumes after its last finished step
+            await kickoff_checkpointed_async(flow, inputs={"user_request": user_request, "own_agents": True})
+            return flow.state
+        return run
+
+    jobs = [(f"request-{i}", job(request)) for i, request in enumerate(user_requests, 1)]
+    return run_jobs(jobs, timeout=timeout or BATCH_TIMEOUT, max_concurrency=max_concurrency or BATCH_CONCURRENCY)
+
+def read_requests(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+def save_batch_results(user_requests, runs, path=BATCH_RESULTS_PATH):
+    results = [
+        {
+            "name": run.name,
+            "request": request,
+            "ok": run.ok,
+            "error": run.error,
+            "seconds": round(run.seconds, 3),
+            "plan": run.result.plan_json if run.ok else None,
+            "qa_feedback": run.result.qa_feedback if run.ok else None,
+        }
+        for request, run in zip(user_requests, runs)
+    ]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+def print_batch_summary(runs, wall_seconds):
+    print("\n====== CREATOR BATCH COMPLETE ======")
+    for run in runs:
+        status = run.result.plan_json.get("function_name", "?") if run.ok else f"failed: {run.error}"
+        print(f"{run.name:<14} {run.seconds:8.1f}s  {status}")
+    ok = sum(run.ok for run in runs)
+    busy = sum(run.seconds for run in runs)
+    print(f"{ok}/{len(runs)} request(s) succeeded in {wall_seconds:.1f}s "
+          f"({busy:.1f}s of flow time, {busy / max(wall_seconds, 1e-9):.1f}x concurrency)")
+    limiter = get_llm_limiter()
+    if limiter is not None:
+        print(limiter.report())
+    print(f"Results saved to {BATCH_RESULTS_PATH}")
+
+def batch_main(path, max_concurrency=None):
+    user_requests = read_requests(path)
+    started = time.perf_counter()
+    runs = run_batch(user_requests, max_concurrency=max_concurrency)
+    save_batch_results(user_requests, runs)
+    print_batch_summary(runs, time.perf_counter() - started)
 
 # --- RUN ---
-if __name__ == "__main__":
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plan, write and review Python functions.")
+    parser.add_argument("--batch", metavar="FILE", help="run every request in FILE (one per line) concurrently")
+    parser.add_argument("--concurrency", type=int, help="flows to run at once (default CREATOR_BATCH_CONCURRENCY)")
+    add_arguments(parser)
+    # run.py calls main() without arguments: never read its command line
+    args = parser.parse_args(argv or [])
+    if args.runs:
+        print_runs("CreatorFlow")
+        return
+    if args.batch:
+        batch_main(args.batch, args.concurrency)
+        print_report()
+        return
+
+    CreatorFlow = creator_flow_class()
     flow = CreatorFlow()
-    result = flow.kickoff()
+    result = kickoff_checkpointed(flow, **kickoff_options(args))
     print("\n====== CREATOR FLOW COMPLETE ======")
     print("Final QA feedback:\n")
     print(result)
     print("===========================")
+    if streaming_enabled():
+        print(stream_log.report())
+    print_report()
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
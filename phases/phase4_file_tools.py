@@ -8,6 +8,11 @@ Goal:
 
 Skills:
 - FileWriterTool, FileReadTool, artifact pipeline, agent-to-agent file collaboration.
+- A memory-mapped line search tool, so large files can be checked without reading them whole.
+- The code file goes through the artifact store (workshop/artifacts.py): the writer tool
+  and the task share it, so identical content is written only once. If the write
+  task is unchanged since the file was made, the Developer is skipped and QA reviews the
+  existing file (ARTIFACT_REUSE=0 forces a new run).
 
 Outputs:
 - Python code written to outputs/generated_code_phase4.py
@@ -22,63 +27,107 @@ Agents:
 from dotenv import load_dotenv
 load_dotenv()
 
-from crewai import Agent, Task, Crew, Process
-from crewai_tools import FileWriterTool, FileReadTool
-
 import os
 
+from workshop.artifacts import get_artifact_store, output_writer, reuse_enabled, task_inputs
+from workshop.llm_cache import agent_llm
+from workshop.registry import registry, file_writer_tool, file_read_tool, print_report
+from workshop.mmap_scan import search_lines
+from workshop.lazy import lazy_import
+
+# Imported on first use (see workshop/lazy.py), so importing this script stays fast
+crewai = lazy_import("crewai")
+
+# --- CUSTOM TOOL ---
+@registry.tool("Search File Lines")
+def search_file_lines(file_path: str, query: str) -> str:
+    """
+    Returns the lines of a text file that mention query (case-insensitive), with line numbers.
+    The file is memory-mapped, so even very large files are searched without loading them.
+    """
+    if not os.path.isfile(file_path):
+        return f"File not found: {file_path}"
+    try:
+        hits = search_lines(file_path, query, limit=200)
+    except Exception as e:
+        return f"Failed to search file: {e}"
+    if not hits:
+        return f"No lines in '{file_path}' mention '{query}'."
+    return "\n".join(f"{line_no}: {text}" for line_no, text in hits)
+
 # --- AGENTS ---
-developer = Agent(
-    role="Developer",
-    goal="Write a Python function to a file.",
-    backstory="Expert Python developer, always documents code.",
-    tools=[FileWriterTool()],
-    verbose=True
-)
-
-qa = Agent(
-    role="QA Reviewer",
-    goal="Read and review the generated code file.",
-    backstory="Meticulous reviewer, finds bugs and gives feedback.",
-    tools=[FileReadTool()],
-    verbose=True
-)
-
-# --- TASKS ---
+@registry.register("phase4.developer")
+def developer():
+    return crewai.Agent(
+        role="Developer",
+        goal="Write a Python function to a file.",
+        backstory="Expert Python developer, always documents code.",
+        tools=[file_writer_tool()],
+        llm=agent_llm(),
+        verbose=True
+    )
+
+@registry.register("phase4.qa")
+def qa():
+    return crewai.Agent(
+        role="QA Reviewer",
+        goal="Read and review the generated code file.",
+        backstory="Meticulous reviewer, finds bugs and gives feedback.",
+        tools=[file_read_tool(), search_file_lines()],
+        llm=agent_llm(),
+        verbose=True
+    )
+
+# --- TASKS & CREW ---
 function_name = "is_even"
 code_filename = "outputs/generated_code_phase4.py"
 
-write_task = Task(
-    description=f"Write a Python function named '{function_name}' that checks if a number is even. Save the code to '{code_filename}'. Add a docstring and comments.",
-    expected_output=f"A Python function in '{code_filename}' that checks if a number is even.",
-    agent=developer,
-    tools=[FileWriterTool()],
-    output_file=code_filename
-)
-
-review_task = Task(
-    description=f"Read the file '{code_filename}', review the function for correctness, docstring, and suggest at least one improvement.",
-    expected_output="A brief QA review with at least one suggestion.",
-    agent=qa,
-    tools=[FileReadTool()],
-    context=[write_task]
-)
-
-# --- CREW ---
-crew = Crew(
-    agents=[developer, qa],
-    tasks=[write_task, review_task],
-    process=Process.sequential,
-    verbose=True
-)
+def make_write_task():
+    write_task = crewai.Task(
+        description=f"Write a Python function named '{function_name}' that checks if a number is even. Save the code to '{code_filename}'. Add a docstring and comments.",
+        expected_output=f"A Python function in '{code_filename}' that checks if a number is even.",
+        agent=developer(),
+        tools=[file_writer_tool()]
+    )
+    # Saved by the store instead of output_file; a no-op if the tool already wrote the same text
+    write_task.callback = output_writer(code_filename, "phase4.write_task", task_inputs(write_task))
+    return write_task
+
+def make_crew(write_task=None):
+    """
+    Without write_task, the crew only reviews the code file that is already there.
+    """
+    review_task = crewai.Task(
+        description=f"Read the file '{code_filename}', review the function for correctness, docstring, and suggest at least one improvement.",
+        expected_output="A brief QA review with at least one suggestion.",
+        agent=qa(),
+        tools=[file_read_tool(), search_file_lines()],
+        context=[write_task] if write_task else []
+    )
+    if write_task is None:
+        return crewai.Crew(agents=[qa()], tasks=[review_task], process=crewai.Process.sequential, verbose=True)
+    return crewai.Crew(
+        agents=[developer(), qa()],
+        tasks=[write_task, review_task],
+        process=crewai.Process.sequential,
+        verbose=True
+    )
 
 # --- RUN ---
-if __name__ == "__main__":
+def main():
     # Ensure output folder exists
     os.makedirs("outputs", exist_ok=True)
-    result = crew.kickoff()
+    write_task = make_write_task()
+    if reuse_enabled() and get_artifact_store().reuse(code_filename, "phase4.write_task", task_inputs(write_task)) is not None:
+        print(f"[artifacts] Write task unchanged since {code_filename} was made: reviewing it without the Developer.")
+        write_task = None
+    result = make_crew(write_task).kickoff()
     print("\n====== FILE TOOLS PIPELINE COMPLETE ======")
     print(f"Function written to: {code_filename}")
     print("QA review:\n")
     print(result)
     print("===========================")
+    print_report()
+
+if __name__ == "__main__":
+    main()
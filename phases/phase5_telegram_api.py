@@ -8,10 +8,16 @@ Goal:
 
 Skills:
 - Secure API key usage, custom @tool, POST requests, agent-to-user automation.
+- A pooled, rate-limited HTTP client (workshop/telegram_client.py) with timeouts.
+- An outbox (workshop/outbox.py): messages are queued on disk and sent by a background
+  worker with retries, so the crew never waits on the network and a crash loses nothing.
+  Messages that pile up for the same chat are sent together as one message.
 
 Requirements:
 - TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID in .env
 - requests library
+- Optional: TELEGRAM_TIMEOUT_SECONDS, TELEGRAM_MIN_INTERVAL_SECONDS, and TELEGRAM_API_BASE
+  (point it at a local stand-in server to test without the real API), OUTBOX_PATH
 
 Outputs:
 - Message sent to your Telegram from your CrewAI pipeline!
@@ -20,60 +26,72 @@ Outputs:
 from dotenv import load_dotenv
 load_dotenv()
 
-import os
-import requests
+from workshop.llm_cache import agent_llm
+from workshop.registry import registry, print_report
+from workshop.telegram_client import get_client, deliver_payload, merge_payloads
+from workshop.outbox import get_outbox
+from workshop.lazy import lazy_import
 
-from crewai import Agent, Task, Crew, Process
-from crewai.tools import tool
+# Imported on first use (see workshop/lazy.py), so importing this script stays fast
+crewai = lazy_import("crewai")
 
 # --- CUSTOM TOOL ---
-@tool("Send Telegram Message")
+@registry.tool("Send Telegram Message")
 def send_telegram_message(text: str) -> str:
     """
     Sends a text message to a Telegram chat using your bot.
+    The message is queued and delivered in the background (with retries), so this returns at once.
     """
-    token = os.getenv("TELEGRAM_BOT_TOKEN")
-    chat_id = os.getenv("TELEGRAM_CHAT_ID")
-    if not token or not chat_id:
+    client = get_client()
+    if not client.configured:
         return "TELEGRAM_BOT_TOKEN or TELEGRAM_CHAT_ID not set in environment."
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    resp = requests.post(url, data={
-        "chat_id": chat_id,
-        "text": text
-    })
-    if resp.status_code == 200:
-        return "✅ Message sent to Telegram!"
-    else:
-        return f"❌ Failed to send: {resp.text}"
+    outbox = get_outbox()
+    outbox.register("telegram", deliver_payload, merge=merge_payloads)
+    outbox.put("telegram", {"text": text, "chat_id": client.chat_id})
+    return "✅ Message queued for Telegram!"
 
 # --- AGENT ---
-notifier = Agent(
-    role="Notifier",
-    goal="Send a summary to the user's Telegram using the bot API.",
-    backstory="Expert in messaging and notifications.",
-    tools=[send_telegram_message],
-    verbose=True
-)
-
-# --- TASK ---
-notify_task = Task(
-    description="Send the message '👋 Hello from CrewAI Phase 5! Your pipeline works.' to the user's Telegram using your tool.",
-    expected_output="Confirmation that the message was sent.",
-    agent=notifier,
-    tools=[send_telegram_message]
-)
+@registry.register("phase5.notifier")
+def notifier():
+    return crewai.Agent(
+        role="Notifier",
+        goal="Send a summary to the user's Telegram using the bot API.",
+        backstory="Expert in messaging and notifications.",
+        tools=[send_telegram_message()],
+        llm=agent_llm(),
+        verbose=True
+    )
 
-# --- CREW ---
-crew = Crew(
-    agents=[notifier],
-    tasks=[notify_task],
-    process=Process.sequential,
-    verbose=True
-)
+# --- TASK & CREW ---
+def make_crew():
+    notify_task = crewai.Task(
+        description="Send the message '👋 Hello from CrewAI Phase 5! Your pipeline works.' to the user's Telegram using your tool.",
+        expected_output="Confirmation that the message was queued for sending.",
+        agent=notifier(),
+        tools=[send_telegram_message()]
+    )
+    return crewai.Crew(
+        agents=[notifier()],
+        tasks=[notify_task],
+        process=crewai.Process.sequential,
+        verbose=True
+    )
 
 # --- RUN ---
-if __name__ == "__main__":
-    result = crew.kickoff()
+def main():
+    result = make_crew().kickoff()
     print("\n====== TELEGRAM NOTIFY PIPELINE COMPLETE ======")
     print("Result:", result)
+    # Give the background worker a moment to deliver before the script exits;
+    # anything still queued is sent by the next run.
+    if get_outbox().drain(timeout=30):
+        print("Outbox: all messages delivered.")
+    else:
+        print("Outbox: some messages are still queued and will be retried on the next run.")
+    for msg_id, _, payload, error in get_outbox().dead_letters():
+        print(f"Outbox: message {msg_id} gave up ({error}): {payload['text'][:60]}")
     print("===========================")
+    print_report()
+
+if __name__ == "__main__":
+    main()
@@ -8,180 +8,391 @@ Goal:
 Requirements:
 - outputs/sample_phase6.pdf, outputs/sample_phase6.json, outputs/sample_phase6.csv
 - pip install PyPDF2
+- Optional: PDF_CACHE_DIR in .env to keep extracted PDF text on disk between runs.
+- Optional: PDF_WORKERS (processes extracting PDF pages in parallel, default one per CPU)
+  and PDF_PAGE_RANGE (e.g. "1-50") to read only some pages of a long PDF.
+- Optional: FILE_QA_MAX_MATCHES / FILE_QA_MAX_OUTPUT_BYTES to cap tool output,
+  JSON_STREAM_MIN_BYTES / CSV_SCAN_MIN_BYTES to choose when the JSON/CSV tools
+  stream the file instead of building an index (large one-record-per-line CSVs are
+  searched memory-mapped, so only matching lines are ever decoded).
+- Optional: CREW_TIMEOUT_SECONDS / CREW_MAX_CONCURRENCY for the parallel crew run.
+
+Corpus mode:
+- `python phases/phase6_file_qa_fallback.py --corpus docs/` (or a glob like
+  'docs/**/*.csv', or CORPUS_PATH in .env) asks the same questions across every PDF,
+  JSON, CSV and text file there, with one agent and one "Corpus Search" tool.
+- A background indexer (workshop/corpus.py) indexes each file once and re-indexes only
+  files whose mtime or size changed (CORPUS_POLL_SECONDS); results are ranked across
+  the corpus, and a record found in several files is shown once.
 
 Outputs:
-- Answers printed to console.
+- Answers printed to console (the PDF, JSON and CSV crews run in parallel).
 """
 
 from dotenv import load_dotenv
 load_dotenv()
 
-import os, json, csv
-import PyPDF2
+import argparse
+import os
+import sys
 
-from crewai import Agent, Task, Crew, Process
-from crewai.tools import tool
+from workshop.corpus import format_hits, get_corpus
+from workshop.llm_cache import agent_llm
+from workshop.registry import registry, print_report
+from workshop.text_index import pdf_index, json_index, csv_index
+from workshop.json_stream import iter_matching_rows, scan_json_batch, dump_rows
+from workshop.csv_scan import scan_csv, scan_csv_batch, mmap_scan_csv, mmap_scan_csv_batch, records_are_lines
+from workshop.parallel import run_crews
+from workshop.lazy import lazy_import
 
-# --- Check/print model for confidence ---
-import os
-print(f"Model set to: {os.getenv('OPENAI_MODEL_NAME')}")
+# Imported on first use (see workshop/lazy.py), so importing this script stays fast
+crewai = lazy_import("crewai")
 
 PDF_PATH = "outputs/sample_phase6.pdf"
 JSON_PATH = "outputs/sample_phase6.json"
 CSV_PATH = "outputs/sample_phase6.csv"
 
+# Output caps for the tools, and the size above which read_json streams the file
+MAX_MATCHES = int(os.getenv("FILE_QA_MAX_MATCHES", "100"))
+MAX_OUTPUT_BYTES = int(os.getenv("FILE_QA_MAX_OUTPUT_BYTES", "50000"))
+JSON_STREAM_MIN_BYTES = int(os.getenv("JSON_STREAM_MIN_BYTES", str(50 * 1024 * 1024)))
+CSV_SCAN_MIN_BYTES = int(os.getenv("CSV_SCAN_MIN_BYTES", str(50 * 1024 * 1024)))
+
+# Corpus mode: directory or glob, and how long a query waits for the first indexing pass
+CORPUS_PATH = os.getenv("CORPUS_PATH", "")
+CORPUS_READY_TIMEOUT = float(os.getenv("CORPUS_READY_TIMEOUT_SECONDS", "60"))
+
+# Per-crew timeout (seconds, 0 = none) and how many crews may run at once
+CREW_TIMEOUT = float(os.getenv("CREW_TIMEOUT_SECONDS", "0")) or None
+CREW_CONCURRENCY = int(os.getenv("CREW_MAX_CONCURRENCY", "3"))
+
 # --- TOOLS ---
 
-@tool("Simple PDF Text Extractor")
+def format_rows(query, rows, hint="query"):
+    """
+    Formats matching JSON/CSV rows as a capped JSON list (or a no-match message).
+    """
+    text, count, truncated = dump_rows(rows, MAX_MATCHES, MAX_OUTPUT_BYTES)
+    if not count:
+        return f"No matches for '{query}'."
+    if truncated:
+        text += f"\n(Showing the first {count} matches. Use a more specific {hint} to narrow them down.)"
+    return text
+
+def format_batch(answers):
+    """
+    Joins per-query answers into one tool result, in the order the queries were given.
+    """
+    return "\n\n".join(f"=== '{query}' ===\n{answer}" for query, answer in answers.items())
+
+def check_queries(queries):
+    """
+    Returns the de-duplicated query list, or None if it is not a list of strings.
+    """
+    if not isinstance(queries, list) or not queries or not all(isinstance(q, str) for q in queries):
+        return None
+    return list(dict.fromkeys(queries))
+
+def pdf_lines(query):
+    lines = pdf_index(PDF_PATH).search(query)
+    if lines:
+        return "\n".join(lines)
+    return f"No PDF lines mention '{query}'."
+
+@registry.tool("Simple PDF Text Extractor")
 def extract_pdf_text(query: str) -> str:
     """
     Query must be a plain string (e.g. 'Amazon' or 'Python').
-    Reads all PDF text and returns lines that mention the query string (case-insensitive).
+    Returns the PDF lines that mention the query string (case-insensitive), each prefixed
+    with its page and line number (e.g. '[p. 3, line 12]') so answers can cite it.
+    Page text is cached and indexed, so repeated queries on an unchanged PDF skip PyPDF2 entirely.
     """
     if not isinstance(query, str):
         return "ERROR: Query must be a string like 'Amazon'."
     if not os.path.isfile(PDF_PATH):
         return "PDF not found."
     try:
-        with open(PDF_PATH, "rb") as f:
-            reader = PyPDF2.PdfReader(f)
-            all_text = ""
-            for page in reader.pages:
-                all_text += page.extract_text() or ""
-            lines = [line.strip() for line in all_text.splitlines() if query.lower() in line.lower()]
-            if lines:
-                return "\n".join(lines)
-            else:
-                return f"No PDF lines mention '{query}'."
+        return pdf_lines(query)
     except Exception as e:
         return f"Failed to read PDF: {e}"
 
-@tool("Simple JSON Reader")
+@registry.tool("Batch PDF Text Extractor")
+def extract_pdf_text_batch(queries: list[str]) -> str:
+    """
+    Queries must be a list of plain strings (e.g. ['Amazon', 'Python']).
+    Looks up every query in one go and returns the matching PDF lines grouped by query.
+    Use this instead of calling the single extractor many times.
+    """
+    queries = check_queries(queries)
+    if queries is None:
+        return "ERROR: Queries must be a list of strings like ['Amazon', 'Python']."
+    if not os.path.isfile(PDF_PATH):
+        return "PDF not found."
+    try:
+        return format_batch({q: pdf_lines(q) for q in queries})
+    except Exception as e:
+        return f"Failed to read PDF: {e}"
+
+@registry.tool("Simple JSON Reader")
 def read_json(query: str) -> str:
     """
     Query must be a plain string (e.g. 'Berlin').
     Returns JSON rows from the file containing the query string (case-insensitive).
+    Works for JSON arrays and NDJSON; large files are streamed row by row.
     """
     if not isinstance(query, str):
         return "ERROR: Query must be a string like 'Berlin'."
     if not os.path.isfile(JSON_PATH):
         return "JSON file not found."
     try:
-        with open(JSON_PATH) as f:
-            data = json.load(f)
-        results = [row for row in data if any(query.lower() in str(v).lower() for v in row.values())]
-        if not results:
-            return f"No matches for '{query}'."
-        return json.dumps(results, indent=2)
+        if os.path.getsize(JSON_PATH) >= JSON_STREAM_MIN_BYTES:
+            results = iter_matching_rows(JSON_PATH, query)
+        else:
+            results = json_index(JSON_PATH).search(query)
+        return format_rows(query, results)
+    except Exception as e:
+        return f"Error: {e}"
+
+@registry.tool("Batch JSON Reader")
+def read_json_batch(queries: list[str]) -> str:
+    """
+    Queries must be a list of plain strings (e.g. ['Berlin', 'London']).
+    Returns the matching JSON rows grouped by query, from a single pass over the file.
+    Use this instead of calling the single reader many times.
+    """
+    queries = check_queries(queries)
+    if queries is None:
+        return "ERROR: Queries must be a list of strings like ['Berlin', 'London']."
+    if not os.path.isfile(JSON_PATH):
+        return "JSON file not found."
+    try:
+        if os.path.getsize(JSON_PATH) >= JSON_STREAM_MIN_BYTES:
+            matches = scan_json_batch(JSON_PATH, queries, limit=MAX_MATCHES + 1)
+        else:
+            index = json_index(JSON_PATH)
+            matches = {q: index.search(q) for q in queries}
+        return format_batch({q: format_rows(q, rows) for q, rows in matches.items()})
     except Exception as e:
         return f"Error: {e}"
 
-@tool("Simple CSV Reader")
-def read_csv(query: str) -> str:
+@registry.tool("Simple CSV Reader")
+def read_csv(query: str, column: str = "") -> str:
     """
     Query must be a plain string (e.g. 'Manager').
     Returns CSV rows from the file containing the query string (case-insensitive).
+    Optionally pass column (e.g. 'role') to search only that column.
     """
     if not isinstance(query, str):
         return "ERROR: Query must be a string like 'Manager'."
+    if not isinstance(column, str):
+        return "ERROR: Column must be a column name string like 'role'."
     if not os.path.isfile(CSV_PATH):
         return "CSV file not found."
     try:
-        with open(CSV_PATH, newline="") as f:
-            reader = csv.DictReader(f)
-            results = [row for row in reader if any(query.lower() in str(v).lower() for v in row.values())]
-        if not results:
-            return f"No matches for '{query}'."
-        return json.dumps(results, indent=2)
+        if os.path.getsize(CSV_PATH) >= CSV_SCAN_MIN_BYTES and records_are_lines(CSV_PATH):
+            results = mmap_scan_csv(CSV_PATH, query, column=column or None, limit=MAX_MATCHES + 1)
+        elif column or os.path.getsize(CSV_PATH) >= CSV_SCAN_MIN_BYTES:
+            results = scan_csv(CSV_PATH, query, column=column or None)
+        else:
+            results = csv_index(CSV_PATH).search(query)
+        return format_rows(query, results, hint="query or a column")
+    except Exception as e:
+        return f"Error: {e}"
+
+@registry.tool("Batch CSV Reader")
+def read_csv_batch(queries: list[str], column: str = "") -> str:
+    """
+    Queries must be a list of plain strings (e.g. ['Manager', 'Engineer']).
+    Returns the matching CSV rows grouped by query, from a single pass over the file.
+    Optionally pass column (e.g. 'role') to search only that column.
+    Use this instead of calling the single reader many times.
+    """
+    queries = check_queries(queries)
+    if queries is None:
+        return "ERROR: Queries must be a list of strings like ['Manager', 'Engineer']."
+    if not isinstance(column, str):
+        return "ERROR: Column must be a column name string like 'role'."
+    if not os.path.isfile(CSV_PATH):
+        return "CSV file not found."
+    try:
+        if os.path.getsize(CSV_PATH) >= CSV_SCAN_MIN_BYTES and records_are_lines(CSV_PATH):
+            matches = mmap_scan_csv_batch(CSV_PATH, queries, column=column or None, limit=MAX_MATCHES + 1)
+        elif column or os.path.getsize(CSV_PATH) >= CSV_SCAN_MIN_BYTES:
+            matches = scan_csv_batch(CSV_PATH, queries, column=column or None, limit=MAX_MATCHES + 1)
+        else:
+            index = csv_index(CSV_PATH)
+            matches = {q: index.search(q) for q in queries}
+        return format_batch({q: format_rows(q, rows, hint="query or a column") for q, rows in matches.items()})
+    except Exception as e:
+        return f"Error: {e}"
+
+@registry.tool("Corpus Search")
+def search_corpus(query: str, location: str = "") -> str:
+    """
+    Query must be a plain string (e.g. 'Amazon'). Optionally pass location, a directory or
+    glob (default: the corpus this run was started with).
+    Searches every PDF, JSON, CSV and text file there and returns the best-ranked matching
+    lines/rows, each with its file and position; a line found in several files is listed once.
+    """
+    if not isinstance(query, str) or not isinstance(location, str):
+        return "ERROR: Query and location must be strings like 'Amazon' and 'docs/'."
+    location = location or CORPUS_PATH
+    if not location:
+        return "ERROR: No corpus given. Pass location, e.g. 'docs/' or 'docs/**/*.pdf'."
+    try:
+        corpus = get_corpus(location)
+        ready = corpus.wait_ready(CORPUS_READY_TIMEOUT)
+        hits = corpus.search(query, limit=MAX_MATCHES)
+        root = location if os.path.isdir(location) else None
+        text = format_hits(hits, root)[:MAX_OUTPUT_BYTES] if hits else f"No files mention '{query}'."
+        if not ready:
+            text += "\n(The corpus is still being indexed; results may be incomplete.)"
+        return text
     except Exception as e:
         return f"Error: {e}"
 
 # --- AGENTS ---
-pdf_agent = Agent(
-    role="PDF File Analyst",
-    goal="Find lines in the PDF matching the user's query.",
-    backstory="Knows how to scan PDF text for answers. Always use the query string, not full questions.",
-    tools=[extract_pdf_text],
-    verbose=True
-)
-json_agent = Agent(
-    role="JSON Data Analyst",
-    goal="Find answers in the JSON data file.",
-    backstory="Knows how to filter structured data. Always use the query string, not full questions.",
-    tools=[read_json],
-    verbose=True
-)
-csv_agent = Agent(
-    role="CSV Data Analyst",
-    goal="Find answers in the CSV data file.",
-    backstory="Can analyze spreadsheet data. Always use the query string, not full questions.",
-    tools=[read_csv],
-    verbose=True
-)
+@registry.register("phase6.pdf_agent")
+def pdf_agent():
+    return crewai.Agent(
+        role="PDF File Analyst",
+        goal="Find lines in the PDF matching the user's query.",
+        backstory="Knows how to scan PDF text for answers. Always use the query string, not full questions.",
+        tools=[extract_pdf_text(), extract_pdf_text_batch()],
+        llm=agent_llm(),
+        verbose=True
+    )
+
+@registry.register("phase6.json_agent")
+def json_agent():
+    return crewai.Agent(
+        role="JSON Data Analyst",
+        goal="Find answers in the JSON data file.",
+        backstory="Knows how to filter structured data. Always use the query string, not full questions.",
+        tools=[read_json(), read_json_batch()],
+        llm=agent_llm(),
+        verbose=True
+    )
+
+@registry.register("phase6.csv_agent")
+def csv_agent():
+    return crewai.Agent(
+        role="CSV Data Analyst",
+        goal="Find answers in the CSV data file.",
+        backstory="Can analyze spreadsheet data. Always use the query string, not full questions.",
+        tools=[read_csv(), read_csv_batch()],
+        llm=agent_llm(),
+        verbose=True
+    )
+
+@registry.register("phase6.corpus_agent")
+def corpus_agent():
+    return crewai.Agent(
+        role="Document Corpus Analyst",
+        goal="Find answers across a whole collection of documents and cite where they come from.",
+        backstory="Searches many PDF, JSON, CSV and text files at once. Always use the query string, not full questions.",
+        tools=[search_corpus()],
+        llm=agent_llm(),
+        verbose=True
+    )
 
 # --- TASKS (Customize Questions) ---
 pdf_question = "Amazon"     # Use a company or keyword exactly as written in your CV PDF
 json_question = "Berlin"
 csv_question = "Manager"
 
-pdf_task = Task(
-    description=f"Use the Simple PDF Text Extractor to find info about '{pdf_question}' in the file. Only pass the string to the tool, not a full question.",
-    expected_output="PDF lines mentioning the query.",
-    agent=pdf_agent,
-    tools=[extract_pdf_text]
-)
-json_task = Task(
-    description=f"Use the Simple JSON Reader to find info about '{json_question}' in the file. Only pass the string to the tool.",
-    expected_output="A summary of any matching rows.",
-    agent=json_agent,
-    tools=[read_json]
-)
-csv_task = Task(
-    description=f"Use the Simple CSV Reader to find info about '{csv_question}' in the file. Only pass the string to the tool.",
-    expected_output="A summary of any matching rows.",
-    agent=csv_agent,
-    tools=[read_csv]
-)
-
-pdf_crew = Crew(
-    agents=[pdf_agent],
-    tasks=[pdf_task],
-    process=Process.sequential,
-    verbose=True
-)
-json_crew = Crew(
-    agents=[json_agent],
-    tasks=[json_task],
-    process=Process.sequential,
-    verbose=True
-)
-csv_crew = Crew(
-    agents=[csv_agent],
-    tasks=[csv_task],
-    process=Process.sequential,
-    verbose=True
-)
+# --- CREWS (one per file type, built only for the files that exist) ---
+def make_pdf_crew():
+    pdf_task = crewai.Task(
+        description=f"Use the Simple PDF Text Extractor to find info about '{pdf_question}' in the file. Only pass the string to the tool, not a full question.",
+        expected_output="PDF lines mentioning the query.",
+        agent=pdf_agent(),
+        tools=[extract_pdf_text(), extract_pdf_text_batch()]
+    )
+    return crewai.Crew(agents=[pdf_agent()], tasks=[pdf_task], process=crewai.Process.sequential, verbose=True)
 
-if __name__ == "__main__":
-    print("\n==== PDF FILE QA ====")
-    if os.path.isfile(PDF_PATH):
-        pdf_result = pdf_crew.kickoff()
-        print("PDF answer:", pdf_result)
-    else:
-        print(f"(No PDF found at {PDF_PATH})")
+def make_json_crew():
+    json_task = crewai.Task(
+        description=f"Use the Simple JSON Reader to find info about '{json_question}' in the file. Only pass the string to the tool.",
+        expected_output="A summary of any matching rows.",
+        agent=json_agent(),
+        tools=[read_json(), read_json_batch()]
+    )
+    return crewai.Crew(agents=[json_agent()], tasks=[json_task], process=crewai.Process.sequential, verbose=True)
 
-    print("\n==== JSON FILE QA ====")
-    if os.path.isfile(JSON_PATH):
-        json_result = json_crew.kickoff()
-        print("JSON answer:", json_result)
-    else:
-        print(f"(No JSON found at {JSON_PATH})")
+def make_csv_crew():
+    csv_task = crewai.Task(
+        description=f"Use the Simple CSV Reader to find info about '{csv_question}' in the file. Only pass the string to the tool.",
+        expected_output="A summary of any matching rows.",
+        agent=csv_agent(),
+        tools=[read_csv(), read_csv_batch()]
+    )
+    return crewai.Crew(agents=[csv_agent()], tasks=[csv_task], process=crewai.Process.sequential, verbose=True)
+
+def make_corpus_crew(location):
+    questions = ", ".join(f"'{q}'" for q in (pdf_question, json_question, csv_question))
+    corpus_task = crewai.Task(
+        description=f"Use the Corpus Search tool on '{location}' to find info about each of {questions}. "
+                    "Search one query string at a time.",
+        expected_output="A short answer per query, citing the file and position of each match.",
+        agent=corpus_agent(),
+        tools=[search_corpus()]
+    )
+    return crewai.Crew(agents=[corpus_agent()], tasks=[corpus_task], process=crewai.Process.sequential, verbose=True)
 
-    print("\n==== CSV FILE QA ====")
-    if os.path.isfile(CSV_PATH):
-        csv_result = csv_crew.kickoff()
-        print("CSV answer:", csv_result)
+# --- RUN ---
+def corpus_main(location):
+    # Start indexing now, so it overlaps with building the crew
+    corpus = get_corpus(location)
+    runs = run_crews([("CORPUS", make_corpus_crew(location))], timeout=CREW_TIMEOUT)
+    print("\n==== CORPUS FILE QA ====")
+    run = runs[0]
+    if run.ok:
+        print("Corpus answer:", run.result)
+        print(f"({run.seconds:.1f}s)")
     else:
-        print(f"(No CSV found at {CSV_PATH})")
+        print(f"Corpus crew failed: {run.error}")
+    print(corpus.summary())
+    print("\n==================")
+    print_report()
+
+def main(argv=None):
+    global CORPUS_PATH
+    parser = argparse.ArgumentParser(description="Answer questions from PDF, JSON and CSV files.")
+    parser.add_argument("--corpus", metavar="DIR_OR_GLOB", help="search every file in a directory or glob (default CORPUS_PATH)")
+    # run.py calls main() without arguments: never read its command line
+    args = parser.parse_args(argv or [])
+
+    # --- Check/print model for confidence ---
+    print(f"Model set to: {os.getenv('OPENAI_MODEL_NAME')}")
+    CORPUS_PATH = args.corpus or CORPUS_PATH
+    if CORPUS_PATH:
+        corpus_main(CORPUS_PATH)
+        return
+
+    # The three crews share no state, so run them at the same time
+    # and print the answers in a fixed order once they are all done.
+    sections = [
+        ("PDF", PDF_PATH, make_pdf_crew),
+        ("JSON", JSON_PATH, make_json_crew),
+        ("CSV", CSV_PATH, make_csv_crew),
+    ]
+    jobs = [(label, make_crew()) for label, path, make_crew in sections if os.path.isfile(path)]
+    runs = {run.name: run for run in run_crews(jobs, timeout=CREW_TIMEOUT, max_concurrency=CREW_CONCURRENCY)}
+
+    for label, path, _ in sections:
+        print(f"\n==== {label} FILE QA ====")
+        run = runs.get(label)
+        if run is None:
+            print(f"(No {label} found at {path})")
+        elif run.ok:
+            print(f"{label} answer:", run.result)
+            print(f"({run.seconds:.1f}s)")
+        else:
+            print(f"{label} crew failed: {run.error}")
 
     print("\n==================")
+    print_report()
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,26 @@
+"""
+Workshop Runner: one entry point for every phase.
+
+Goal:
+- Run one phase, or a chain of phases, inside a single warm Python process, or hand
+  them to a resident daemon that already has everything imported and built.
+
+Usage:
+    python phases/run.py 0 2 6          # phases 0, 2 and 6, one after another
+    python phases/run.py all            # every phase (including the live web and Telegram ones)
+    python phases/run.py serve          # start the daemon (Ctrl+C to stop)
+    python phases/run.py --remote 0 6   # run phases 0 and 6 in the daemon
+    python phases/run.py status         # what the daemon has loaded and built
+    python phases/run.py stop           # stop the daemon
+
+Without arguments it only prints this usage; nothing runs.
+
+The daemon listens on WORKSHOP_DAEMON_ADDRESS (default 127.0.0.1:8765).
+"""
+
+import sys
+
+from workshop.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
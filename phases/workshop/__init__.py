@@ -0,0 +1,7 @@
+"""
+Shared helpers for the workshop phase scripts.
+
+Each phase script stays runnable on its own (python phases/phaseN_*.py);
+the helpers here are plain Python modules the scripts import when they need
+caching, indexing or other plumbing that would clutter the lesson code.
+"""
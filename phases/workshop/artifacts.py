@@ -0,0 +1,222 @@
+"""
+Artifact Store for Task Outputs (used by phases 1 and 4)
+
+Goal:
+- Write each output file once, safely, and only when its content changed. The file
+  writer tool and the task that produced the content used to write the same text to the
+  same file twice per run.
+- Remember which task produced each file from which inputs, so a re-run with unchanged
+  inputs reuses the file instead of paying for the LLM steps again.
+
+How it works:
+- write() hashes the content (SHA-256). If the file already holds that content nothing
+  is written; otherwise the file is replaced atomically (temporary file in the same
+  directory, then os.replace), so readers never see half a file.
+- Every version is also kept once under ARTIFACT_DIR/blobs/ (named by its hash), and
+  ARTIFACT_DIR/manifest.json records per file: hash, size, producer (task or tool),
+  a hash of the producer's inputs, write counts and recent versions.
+- reuse(path, producer, inputs) returns the content when the file was last produced by
+  the same producer from the same inputs and hasn't been edited since (a deleted file
+  is restored from its blob). task_inputs() builds that inputs hash from crewai tasks:
+  description, expected output, agent, model and tools.
+- Those inputs can't capture what live tools (web search) return, so the callers whose
+  tasks use them pass max_age=live_max_age(): such an artifact is only reused for
+  ARTIFACT_TTL_SECONDS (default 3600) after it was made, then the tasks run again.
+- ARTIFACT_DIR defaults to outputs/.artifacts. Set ARTIFACT_REUSE=0 to always re-run.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+MAX_HISTORY = 20
+
+
+def content_hash(content):
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha256(content).hexdigest()
+
+
+def _new_file_mode(path):
+    # mkstemp creates 0600 files; keep the mode of the file being replaced, or the usual one
+    try:
+        return os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def atomic_write(path, content):
+    """
+    Writes content (str or bytes) to path so the file is either the old or the new
+    version, never a partial one.
+    """
+    data = content.encode("utf-8") if isinstance(content, str) else content
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    try:
+        os.fchmod(fd, _new_file_mode(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def inputs_key(inputs):
+    """
+    SHA-256 of any JSON-able description of a producer's inputs.
+    """
+    return content_hash(json.dumps(inputs, sort_keys=True, default=str))
+
+
+def task_inputs(*tasks):
+    """
+    Inputs hash of crewai tasks: what each one is asked, by which agent, with which
+    model and tools. Output of upstream tasks isn't known beforehand, so pass every task
+    that feeds the artifact.
+    """
+    parts = []
+    for task in tasks:
+        agent = task.agent
+        llm = getattr(agent, "llm", None)
+        parts.append({
+            "description": task.description,
+            "expected_output": task.expected_output,
+            "agent": [agent.role, agent.goal, agent.backstory] if agent else None,
+            "model": getattr(llm, "model", None) or str(llm),
+            "tools": sorted(t.name for t in (task.tools or []) + (getattr(agent, "tools", None) or [])),
+        })
+    return inputs_key(parts)
+
+
+def file_hash(path):
+    try:
+        with open(path, "rb") as f:
+            return content_hash(f.read())
+    except FileNotFoundError:
+        return None
+
+
+class ArtifactStore:
+    def __init__(self, root):
+        self.root = root
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self._lock = threading.RLock()
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.manifest = {}
+
+    @staticmethod
+    def _name(path):
+        return os.path.relpath(os.path.abspath(path)).replace(os.sep, "/")
+
+    def _blob_path(self, digest):
+        return os.path.join(self.root, "blobs", digest[:2], digest)
+
+    def _save_manifest(self):
+        atomic_write(self.manifest_path, json.dumps(self.manifest, indent=2, sort_keys=True))
+
+    def record(self, path):
+        """
+        Returns the manifest entry of path, or None.
+        """
+        with self._lock:
+            return self.manifest.get(self._name(path))
+
+    # --- WRITING ---
+    def write(self, path, content, producer, inputs=None, written=False):
+        """
+        Writes content to path unless it is already there, and records its provenance.
+        written=True: the caller has just written content to path itself; only record it.
+        Returns True if the file changed.
+        """
+        digest = content_hash(content)
+        with self._lock:
+            blob = self._blob_path(digest)
+            if not os.path.exists(blob):
+                atomic_write(blob, content)
+            changed = written or file_hash(path) != digest
+            if changed and not written:
+                atomic_write(path, content)
+
+            name = self._name(path)
+            entry = self.manifest.get(name) or {"writes": 0, "unchanged_writes": 0, "history": []}
+            entry["writes" if changed else "unchanged_writes"] += 1
+            entry.update(sha256=digest, size=len(content.encode("utf-8") if isinstance(content, str) else content),
+                         producer=producer, inputs=inputs, recorded_at=time.time())
+            if changed or not entry["history"]:
+                entry["history"] = (entry["history"] + [[digest, producer, entry["recorded_at"]]])[-MAX_HISTORY:]
+            self.manifest[name] = entry
+            self._save_manifest()
+            return changed
+
+    # --- REUSE ---
+    def reuse(self, path, producer, inputs, max_age=None):
+        """
+        Returns the content of path if producer last made it from the same inputs, no
+        more than max_age seconds ago (if given), and it is unchanged on disk (restoring
+        a deleted file from its blob); otherwise None.
+        """
+        with self._lock:
+            entry = self.manifest.get(self._name(path))
+            if not entry or entry.get("producer") != producer or entry.get("inputs") != inputs:
+                return None
+            if max_age is not None and time.time() - entry.get("recorded_at", 0) > max_age:
+                return None   # made from live data that may have changed since
+            blob = self._blob_path(entry["sha256"])
+            on_disk = file_hash(path)
+            if on_disk is None and os.path.exists(blob):
+                with open(blob, "rb") as f:
+                    atomic_write(path, f.read())
+            elif on_disk != entry["sha256"]:
+                return None   # edited by hand or by another writer: not what producer made
+            with open(path, encoding="utf-8") as f:
+                return f.read()
+
+
+_shared_store = None
+_shared_lock = threading.Lock()
+
+
+def get_artifact_store():
+    """
+    Returns the process-wide ArtifactStore in ARTIFACT_DIR (default outputs/.artifacts).
+    """
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = ArtifactStore(os.getenv("ARTIFACT_DIR") or os.path.join("outputs", ".artifacts"))
+        return _shared_store
+
+
+def reuse_enabled():
+    return os.getenv("ARTIFACT_REUSE", "1").lower() not in ("0", "false", "no")
+
+
+def live_max_age():
+    """
+    How long (seconds) an artifact made with live tools may be reused: ARTIFACT_TTL_SECONDS.
+    """
+    return float(os.getenv("ARTIFACT_TTL_SECONDS", "3600"))
+
+
+def output_writer(path, producer, inputs):
+    """
+    A Task callback that saves the task's output to path through the store; use it
+    instead of Task(output_file=...).
+    """
+    def save(output):
+        get_artifact_store().write(path, output.raw, producer, inputs)
+    return save
@@ -0,0 +1,103 @@
+"""
+Caching LLM Wrapper (used through workshop/llm_cache.agent_llm)
+
+Goal:
+- Answer repeated LLM requests from the response cache in workshop/llm_cache.py.
+- Keep the calls that do reach the API within the budget of workshop/rate_limit.py.
+
+How it works:
+- CachedLLM is a crewai BaseLLM around the agent's real LLM. It lives in its own module
+  because defining it imports crewai; llm_cache.py stays light enough to import at
+  start-up and only loads this module when an agent is built with LLM_CACHE=1 or an
+  LLM budget.
+- The wrapped LLM can be shared by concurrent crews, so it is never mutated: the stop
+  words and streaming mode crewai sets on the wrapper reach it through crewai's
+  call-scoped overrides (call_stop_override/call_stream_override) for that call only.
+"""
+
+import asyncio
+import contextlib
+from typing import Any
+
+from crewai import BaseLLM
+from crewai.llms.base_llm import call_stop_override, call_stream_override
+from pydantic import Field
+
+from workshop import tracing
+from workshop.llm_cache import cache_key
+
+
+class CachedLLM(BaseLLM):
+    """
+    A crewai LLM that answers repeated requests from a ResponseCache (if given) and
+    sends everything else to the wrapped LLM, within the RateLimiter (if given).
+    """
+
+    llm_type: str = "cached"
+    inner: Any = Field(exclude=True)
+    cache: Any = Field(default=None, exclude=True)
+    limiter: Any = Field(default=None, exclude=True)
+
+    def __init__(self, inner, cache=None, limiter=None, **kwargs):
+        super().__init__(model=inner.model, inner=inner, cache=cache, limiter=limiter, **kwargs)
+
+    def _stop(self):
+        return list(self.stop_sequences or ())
+
+    def _key(self, messages, tools):
+        return cache_key(self.model, messages, tools, self._stop())
+
+    @contextlib.contextmanager
+    def _inner_settings(self):
+        # crewai sets stop words and streaming on the wrapper; apply them to this call only
+        with call_stop_override(self.inner, self._stop()), \
+                call_stream_override(self.inner, bool(self._effective_stream())):
+            yield
+
+    def _lookup(self, key):
+        return None if self.cache is None else self.cache.get(key)
+
+    def _store(self, key, response):
+        if self.cache is not None and isinstance(response, str) and response:
+            self.cache.set(key, response)
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        key = self._key(messages, tools)
+        cached = self._lookup(key)
+        if cached is not None:
+            tracing.record_cache_hit(self.model)
+            return cached
+        with self.limiter.slot() if self.limiter else contextlib.nullcontext(), self._inner_settings():
+            response = self.inner.call(messages, tools=tools, callbacks=callbacks,
+                                       available_functions=available_functions, **kwargs)
+        self._store(key, response)
+        return response
+
+    async def acall(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        key = self._key(messages, tools)
+        cached = self._lookup(key)
+        if cached is not None:
+            tracing.record_cache_hit(self.model)
+            return cached
+        if self.limiter:
+            # The limiter blocks, so wait for a slot in a thread and keep the event loop free
+            await asyncio.to_thread(self.limiter.acquire)
+        try:
+            with self._inner_settings():
+                response = await self.inner.acall(messages, tools=tools, callbacks=callbacks,
+                                                  available_functions=available_functions, **kwargs)
+        finally:
+            if self.limiter:
+                self.limiter.release()
+        self._store(key, response)
+        return response
+
+    def supports_function_calling(self):
+        supports = getattr(self.inner, "supports_function_calling", None)
+        return bool(supports and supports())
+
+    def supports_stop_words(self):
+        return self.inner.supports_stop_words()
+
+    def get_context_window_size(self):
+        return self.inner.get_context_window_size()
@@ -0,0 +1,339 @@
+"""
+Flow Checkpoints (used by phases 2 and 3)
+
+Goal:
+- A flow that fails in a late step (e.g. phase 3's execution crew) shouldn't pay for the
+  earlier LLM steps again. Each finished step is saved, and a restart picks up after the
+  last one that finished.
+
+How it works:
+- Step methods are decorated with @checkpointed (under @start/@listen). After a step
+  returns, its output and a snapshot of the flow state are stored in a small SQLite file
+  (FLOW_CHECKPOINT_PATH, default outputs/flow_checkpoints.sqlite3) as zlib-compressed
+  JSON, keyed by run and step.
+- kickoff_checkpointed(flow, inputs) starts the flow inside a run. A run is identified
+  by the flow class and its inputs: if the last run with the same inputs failed or was
+  interrupted (Ctrl-C, or its process is gone), it is resumed. A run that is still in
+  progress is never shared: resuming claims the run atomically, so two identical
+  requests running at once (e.g. in a batch) each get their own run. Steps already
+  saved aren't executed; their state snapshot is restored and their saved output is
+  passed on, so later steps see exactly what they would have.
+- Replay (replay="last" or a run id) re-runs a recorded run the same way, skipping its
+  finished steps; from_step re-executes that step and every step saved after it.
+- fresh=True ignores a failed or interrupted run. FLOW_CHECKPOINTS=0 turns checkpointing
+  off.
+"""
+
+import functools
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+
+from workshop.artifacts import inputs_key
+
+
+def enabled():
+    return os.getenv("FLOW_CHECKPOINTS", "1").lower() not in ("0", "false", "no")
+
+
+def _owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _owner_gone(owner):
+    # Only a process on this machine can be checked; elsewhere assume it is still running
+    host, _, pid = (owner or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+def pack(value):
+    return zlib.compress(json.dumps(value, separators=(",", ":"), default=str).encode("utf-8"))
+
+
+def unpack(blob):
+    return json.loads(zlib.decompress(blob))
+
+
+class CheckpointStore:
+    def __init__(self, path=None):
+        self.path = path or os.getenv("FLOW_CHECKPOINT_PATH") or "outputs/flow_checkpoints.sqlite3"
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " run_id TEXT PRIMARY KEY,"
+            " flow TEXT NOT NULL,"
+            " inputs_key TEXT NOT NULL,"
+            " inputs BLOB NOT NULL,"
+            " status TEXT NOT NULL,"    # running, failed, interrupted or finished
+            " created REAL NOT NULL,"
+            " updated REAL NOT NULL,"
+            " owner TEXT)"              # host:pid of the process running it
+        )
+        if "owner" not in [row[1] for row in self._db.execute("PRAGMA table_info(runs)")]:
+            self._db.execute("ALTER TABLE runs ADD COLUMN owner TEXT")   # stores made before owners
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS steps ("
+            " run_id TEXT NOT NULL,"
+            " step TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " data BLOB NOT NULL,"      # {"output": ..., "state": {...}}
+            " seconds REAL NOT NULL,"
+            " PRIMARY KEY (run_id, step))"
+        )
+        self._lock = threading.Lock()
+
+    # --- RUNS ---
+    def new_run(self, flow, inputs):
+        run_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT INTO runs VALUES (?, ?, ?, ?, 'running', ?, ?, ?)",
+                             (run_id, flow, inputs_key(inputs), pack(inputs), now, now, _owner()))
+        return run_id
+
+    def resumable_run(self, flow, inputs):
+        """
+        The latest run of flow with these inputs if it failed or was interrupted (status
+        "running" but its process is gone), else None.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT run_id, status, owner FROM runs WHERE flow = ? AND inputs_key = ?"
+                " ORDER BY created DESC LIMIT 1",
+                (flow, inputs_key(inputs))).fetchone()
+        if row is None or row[1] == "finished":
+            return None
+        if row[1] == "running" and not _owner_gone(row[2]):
+            return None   # still in progress somewhere: don't share it
+        return row[0]
+
+    def claim(self, run_id):
+        """
+        Marks a run as running in this process unless another live process has it.
+        Returns False if the run is in progress elsewhere.
+        """
+        with self._lock:
+            row = self._db.execute("SELECT status, owner FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if row is None or (row[0] == "running" and not _owner_gone(row[1])):
+                return False
+            # The WHERE makes the claim atomic: a process that claimed it in between wins
+            cur = self._db.execute(
+                "UPDATE runs SET status = 'running', owner = ?, updated = ? WHERE run_id = ? AND status = ?"
+                " AND owner IS ?",
+                (_owner(), time.time(), run_id, row[0], row[1]))
+        return cur.rowcount == 1
+
+    def find_run(self, flow, run_id="last"):
+        """
+        Returns (run_id, inputs) of a recorded run of flow ("last" = the latest), or None.
+        """
+        with self._lock:
+            if run_id == "last":
+                row = self._db.execute("SELECT run_id, inputs FROM runs WHERE flow = ? ORDER BY created DESC LIMIT 1",
+                                       (flow,)).fetchone()
+            else:
+                row = self._db.execute("SELECT run_id, inputs FROM runs WHERE flow = ? AND run_id = ?",
+                                       (flow, run_id)).fetchone()
+        return (row[0], unpack(row[1])) if row else None
+
+    def set_status(self, run_id, status):
+        with self._lock:
+            self._db.execute("UPDATE runs SET status = ?, updated = ? WHERE run_id = ?", (status, time.time(), run_id))
+
+    def runs(self, flow=None, limit=20):
+        """
+        [(run_id, flow, status, steps saved, updated)] newest first.
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT r.run_id, r.flow, r.status, COUNT(s.step), r.updated FROM runs r"
+                " LEFT JOIN steps s ON s.run_id = r.run_id"
+                " WHERE ? IS NULL OR r.flow = ? GROUP BY r.run_id ORDER BY r.created DESC LIMIT ?",
+                (flow, flow, limit)).fetchall()
+
+    # --- STEPS ---
+    def steps(self, run_id):
+        """
+        {step: {"output": ..., "state": {...}}} in the order the steps finished.
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT step, data FROM steps WHERE run_id = ? ORDER BY seq",
+                                    (run_id,)).fetchall()
+        return {step: unpack(data) for step, data in rows}
+
+    def save_step(self, run_id, step, output, state, seconds):
+        with self._lock:
+            seq = self._db.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM steps WHERE run_id = ?", (run_id,)).fetchone()[0]
+            self._db.execute("INSERT OR REPLACE INTO steps VALUES (?, ?, ?, ?, ?)",
+                             (run_id, step, seq, pack({"output": output, "state": state}), seconds))
+            self._db.execute("UPDATE runs SET updated = ? WHERE run_id = ?", (time.time(), run_id))
+
+    def drop_steps(self, run_id, steps):
+        with self._lock:
+            self._db.executemany("DELETE FROM steps WHERE run_id = ? AND step = ?", [(run_id, s) for s in steps])
+
+
+_shared_store = None
+_shared_lock = threading.Lock()
+
+
+def get_checkpoint_store():
+    """
+    Returns the process-wide CheckpointStore (FLOW_CHECKPOINT_PATH).
+    """
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = CheckpointStore()
+        return _shared_store
+
+
+# --- FLOW INTEGRATION ---
+class FlowRun:
+    """
+    A flow's current run: its id and the steps it can skip.
+    """
+
+    def __init__(self, store, run_id, saved):
+        self.store = store
+        self.run_id = run_id
+        self.saved = saved
+        self.skipped = []
+
+
+def _state_snapshot(flow):
+    state = flow.state.model_dump(mode="json")
+    state.pop("id", None)
+    return state
+
+
+def checkpointed(method):
+    """
+    Saves a flow step's output and the flow state after it; skips the step if its run
+    already saved it. Put it under @start()/@listen().
+    """
+    step = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        run = getattr(self, "_checkpoint_run", None)
+        if run is None:
+            return method(self, *args, **kwargs)
+        saved = run.saved.get(step)
+        if saved is not None:
+            for name, value in saved["state"].items():
+                setattr(self.state, name, value)
+            run.skipped.append(step)
+            print(f"[checkpoint] {step}: already finished in run {run.run_id}, skipped.")
+            return saved["output"]
+        started = time.perf_counter()
+        output = method(self, *args, **kwargs)
+        run.store.save_step(run.run_id, step, output, _state_snapshot(self), time.perf_counter() - started)
+        return output
+
+    return wrapper
+
+
+def _begin(flow, inputs, replay, from_step, fresh):
+    store = get_checkpoint_store()
+    name = type(flow).__name__
+    run_id = None
+    if replay:
+        found = store.find_run(name, replay)
+        if found is None:
+            raise ValueError(f"No recorded {name} run '{replay}'.")
+        run_id, inputs = found
+        if not store.claim(run_id):
+            raise ValueError(f"{name} run {run_id} is still in progress in another process.")
+    elif not fresh:
+        run_id = store.resumable_run(name, inputs or {})
+        if run_id is not None and not store.claim(run_id):
+            run_id = None   # another identical request just resumed it
+    if run_id is None:
+        run_id = store.new_run(name, inputs or {})
+
+    saved = store.steps(run_id)
+    if from_step:
+        if from_step not in saved:
+            raise ValueError(f"Run {run_id} has no saved step '{from_step}' (saved: {', '.join(saved) or 'none'}).")
+        order = list(saved)
+        again = order[order.index(from_step):]
+        store.drop_steps(run_id, again)
+        saved = {step: saved[step] for step in order if step not in again}
+    if saved:
+        print(f"[checkpoint] Resuming {name} run {run_id}: {len(saved)} finished step(s) will be skipped.")
+    flow._checkpoint_run = FlowRun(store, run_id, saved)
+    return store, run_id, inputs
+
+
+def kickoff_checkpointed(flow, inputs=None, replay=None, from_step=None, fresh=False):
+    """
+    flow.kickoff(inputs) with its steps checkpointed (see the module docstring).
+    """
+    if not enabled():
+        return flow.kickoff(inputs=inputs)
+    store, run_id, inputs = _begin(flow, inputs, replay, from_step, fresh)
+    try:
+        result = flow.kickoff(inputs=inputs)
+    except BaseException as e:
+        store.set_status(run_id, "interrupted" if isinstance(e, KeyboardInterrupt) else "failed")
+        raise
+    store.set_status(run_id, "finished")
+    return result
+
+
+async def kickoff_checkpointed_async(flow, inputs=None, replay=None, from_step=None, fresh=False):
+    """
+    The async version of kickoff_checkpointed().
+    """
+    if not enabled():
+        return await flow.kickoff_async(inputs=inputs)
+    store, run_id, inputs = _begin(flow, inputs, replay, from_step, fresh)
+    try:
+        result = await flow.kickoff_async(inputs=inputs)
+    except BaseException as e:
+        store.set_status(run_id, "interrupted" if isinstance(e, KeyboardInterrupt) else "failed")
+        raise
+    store.set_status(run_id, "finished")
+    return result
+
+
+# --- COMMAND LINE ---
+def add_arguments(parser):
+    """
+    Adds --fresh/--replay/--from-step/--runs to a phase's argparse parser (resuming a
+    failed run needs no flag: it is the default).
+    """
+    group = parser.add_argument_group("checkpoints (FLOW_CHECKPOINTS)")
+    group.add_argument("--fresh", action="store_true", help="start a new run even if the last one failed or was interrupted")
+    group.add_argument("--replay", metavar="RUN", help="re-run a recorded run ('last' or a run id), skipping finished steps")
+    group.add_argument("--from-step", metavar="STEP", help="with --replay: run this step and the ones after it again")
+    group.add_argument("--runs", action="store_true", help="list recorded runs and exit")
+
+
+def kickoff_options(args):
+    return {"replay": args.replay, "from_step": args.from_step, "fresh": args.fresh}
+
+
+def print_runs(flow_name):
+    rows = get_checkpoint_store().runs(flow_name)
+    if not rows:
+        print(f"No recorded {flow_name} runs.")
+    for run_id, _, status, steps, updated in rows:
+        print(f"{run_id}  {status:<9} {steps} step(s) saved  {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(updated))}")
@@ -0,0 +1,279 @@
+"""
+Multi-Phase Runner (behind phases/run.py)
+
+Goal:
+- Run any phase, or several phases in a row, in one warm Python process. Interpreter
+  start-up, .env loading, the crewai import and agent construction are paid once, not
+  once per phase.
+- A daemon mode keeps all of that resident and takes jobs over a local socket, so
+  repeated runs skip start-up entirely.
+
+How it works:
+- A phase is imported as a module (phases/phaseN_*.py) and its main() is called. Modules
+  stay imported, and their agents and tools live in the shared registry
+  (workshop/registry.py), so running a phase again reuses them.
+- `serve` listens on WORKSHOP_DAEMON_ADDRESS (default 127.0.0.1:8765; local only) and
+  runs one job at a time. A job names phases, never code. The console output of the
+  phases is streamed back to the client as it is printed.
+- Phases are always named on the command line (`all` for every phase); with no
+  argument the runner only prints its usage.
+- `--remote` sends the job to a running daemon instead of running it here; `status`
+  and `stop` talk to the daemon too.
+"""
+
+import argparse
+import contextlib
+import glob
+import importlib
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+import traceback
+
+from workshop.lazy import lazy_import, startup_report
+from workshop.registry import registry
+
+PHASES_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+
+
+def available_phases():
+    """
+    Returns {"0": "phase0_hello_crew", ...} for the phase scripts in phases/.
+    """
+    phases = {}
+    for path in sorted(glob.glob(os.path.join(PHASES_DIR, "phase*_*.py"))):
+        module = os.path.splitext(os.path.basename(path))[0]
+        phases[module.split("_")[0][len("phase"):]] = module
+    return phases
+
+
+def resolve_phases(names):
+    """
+    Turns "0", "phase0" or "phase0_hello_crew" (or "all") into phase module names.
+    Raises ValueError for an unknown phase or when no phase is named.
+    """
+    phases = available_phases()
+    if not names:
+        raise ValueError(f"Name the phases to run: {', '.join(phases)} or all")
+    if list(names) == ["all"]:
+        return list(phases.values())
+    modules = []
+    for name in names:
+        key = str(name).removeprefix("phase").split("_")[0]
+        if key not in phases:
+            raise ValueError(f"Unknown phase '{name}'. Choose from: {', '.join(phases)} or all")
+        modules.append(phases[key])
+    return modules
+
+
+def run_phase(module_name):
+    """
+    Imports the phase (once per process) and runs its main().
+    """
+    importlib.import_module(module_name).main()
+
+
+def run_phases(names):
+    """
+    Runs the phases one after another and prints a timing summary.
+    Returns [(module name, seconds, error or None)].
+    """
+    results = []
+    for module_name in resolve_phases(names):
+        print(f"\n########## {module_name} ##########")
+        started = time.perf_counter()
+        try:
+            run_phase(module_name)
+            error = None
+        except Exception as e:
+            traceback.print_exc()
+            error = e
+        results.append((module_name, time.perf_counter() - started, error))
+
+    print("\n########## SUMMARY ##########")
+    for module_name, seconds, error in results:
+        status = "ok" if error is None else f"failed: {type(error).__name__}: {error}"
+        print(f"{module_name:<30} {seconds:8.1f}s  {status}")
+    return results
+
+
+# --- DAEMON ---
+def parse_address(address=None):
+    host, _, port = (address or os.getenv("WORKSHOP_DAEMON_ADDRESS") or DEFAULT_ADDRESS).rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+class _StreamToClient:
+    """
+    File-like object that forwards printed text to the client as JSON lines. A client
+    that hangs up doesn't stop the job; its output is just dropped.
+    """
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self.connected = True
+        self._lock = threading.Lock()
+
+    def write(self, text):
+        if text and self.connected:
+            with self._lock:
+                try:
+                    self.wfile.write(json.dumps({"out": text}).encode("utf-8") + b"\n")
+                    self.wfile.flush()
+                except OSError:
+                    self.connected = False
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+class _JobHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline() or b"{}")
+        except ValueError:
+            request = {}
+        command = request.get("command", "run")
+        if command == "status":
+            reply = {
+                "done": True, "ok": True,
+                "phases_loaded": [m for m in available_phases().values() if m in sys.modules],
+                "jobs_run": self.server.jobs_run,
+                "uptime_seconds": round(time.monotonic() - self.server.started, 1),
+                "report": f"{startup_report()}\n{registry.report()}",
+            }
+        elif command == "stop":
+            reply = {"done": True, "ok": True}
+            # shutdown() waits for serve_forever() to return, so it can't run on this thread
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        elif command == "run":
+            reply = self._run(request.get("phases") or [])
+        else:
+            reply = {"done": True, "ok": False, "error": f"Unknown command '{command}'"}
+        self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+    def _run(self, names):
+        try:
+            resolve_phases(names)
+        except ValueError as e:
+            return {"done": True, "ok": False, "error": str(e)}
+        stream = _StreamToClient(self.wfile)
+        with contextlib.redirect_stdout(stream), contextlib.redirect_stderr(stream):
+            results = run_phases(names)
+        self.server.jobs_run += 1
+        return {
+            "done": True,
+            "ok": all(error is None for _, _, error in results),
+            "results": [[name, round(seconds, 3), error and str(error)] for name, seconds, error in results],
+        }
+
+
+class WorkshopDaemon(socketserver.TCPServer):
+    """
+    Serves one job at a time; later connections wait in the listen backlog.
+    """
+
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, _JobHandler)
+        self.jobs_run = 0
+        self.started = time.monotonic()
+
+
+def warm_up():
+    """
+    Imports every phase and builds its agents and tools, so the first job is as fast as the rest.
+    """
+    started = time.perf_counter()
+    for module_name in available_phases().values():
+        importlib.import_module(module_name)
+    lazy_import("crewai").Agent   # most agents need it anyway; import it before any job
+    for name, error in registry.warm().items():
+        print(f"[daemon] could not pre-build {name}: {type(error).__name__}: {error}")
+    print(f"[daemon] warm-up took {time.perf_counter() - started:.1f}s")
+
+
+def serve(address=None, warm=True):
+    host, port = parse_address(address)
+    if warm:
+        warm_up()
+    with WorkshopDaemon((host, port)) as server:
+        print(f"[daemon] listening on {host}:{port} (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    print("[daemon] stopped")
+
+
+def send_request(request, address=None, out=None):
+    """
+    Sends one request to the daemon, copies streamed output to out (default stdout)
+    and returns the daemon's final reply.
+    """
+    out = out or sys.stdout
+    with socket.create_connection(parse_address(address)) as sock:
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        for line in sock.makefile("r", encoding="utf-8"):
+            message = json.loads(line)
+            if "out" in message:
+                out.write(message["out"])
+                out.flush()
+            else:
+                return message
+    raise ConnectionError("The daemon closed the connection before the job finished.")
+
+
+# --- COMMAND LINE ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python phases/run.py",
+        description="Run workshop phases in one warm process, or through a resident daemon.",
+        epilog="Nothing runs without a phase argument; 'all' includes the phases that call "
+               "live services (web search, Telegram).",
+    )
+    parser.add_argument("phases", nargs="*",
+                        help="phase numbers (e.g. 0 2 6), 'all', or one of: serve, status, stop")
+    parser.add_argument("--remote", action="store_true", help="run the phases in the running daemon")
+    parser.add_argument("--address", help=f"daemon host:port (default WORKSHOP_DAEMON_ADDRESS or {DEFAULT_ADDRESS})")
+    parser.add_argument("--no-warm", action="store_true", help="serve: skip building every agent up front")
+    args = parser.parse_args(argv)
+
+    if not args.phases:
+        parser.print_help(sys.stderr)
+        return 2
+    command = args.phases[0]
+    try:
+        if command == "serve":
+            serve(args.address, warm=not args.no_warm)
+            return 0
+        if command in ("status", "stop"):
+            reply = send_request({"command": command}, args.address)
+            if command == "status":
+                print(f"Daemon up {reply['uptime_seconds']}s, {reply['jobs_run']} job(s) run")
+                print("Loaded phases:", ", ".join(reply["phases_loaded"]) or "none")
+                print(reply["report"])
+            return 0
+        if args.remote:
+            reply = send_request({"command": "run", "phases": args.phases}, args.address)
+            if reply.get("error"):
+                print(reply["error"], file=sys.stderr)
+            return 0 if reply.get("ok") else 1
+        results = run_phases(args.phases)
+    except ValueError as e:
+        parser.error(str(e))
+    except ConnectionRefusedError:
+        print(f"No daemon is listening on {':'.join(map(str, parse_address(args.address)))}. "
+              "Start one with: python phases/run.py serve", file=sys.stderr)
+        return 1
+    return 0 if all(error is None for _, _, error in results) else 1
@@ -0,0 +1,277 @@
+"""
+Context Compaction Between Chained Tasks (used by phases 1, 2 and 3)
+
+Goal:
+- A task with context=[upstream] gets the upstream task's whole answer pasted into its
+  prompt, so prompts (and latency and cost) grow with every hop. Hand each downstream
+  task a compact version instead: no repeated sentences and, if a token budget is set,
+  no more than that, while code and JSON (e.g. phase 3's plan) pass through exactly as
+  written.
+
+How it works:
+- compact_context(task) marks a task; a crewai pre-step hook then rewrites the context
+  string the task receives just before its agent runs. Nothing else changes: the upstream
+  task's own output, callbacks and files stay as they were.
+- compact() splits the context into units (lines, long lines into sentences). Fenced
+  ``` code blocks, JSON objects and the dividers between several upstream outputs are
+  protected and always kept verbatim.
+- Exact duplicates are always dropped: the same unit again, ignoring only case,
+  punctuation and bullet markers. Units that differ in any word or number (e.g. two
+  bullets with different figures) are never treated as duplicates.
+- Only with a budget (CONTEXT_MAX_TOKENS, or max_tokens given to compact_context): if
+  the rest is still over it, units are picked extractively (SumBasic): by how
+  frequent their words are across the context, with extra weight for words the downstream
+  task's description mentions and a bonus for headings and each section's first line; once
+  a unit is picked its words count less, so repeats of the same point lose out. The picks
+  that fit are kept, in their original order. This drops content, so it is off unless a
+  budget is set: by default only exact duplicates are removed.
+- Tokens are estimated as characters / 4 (no tokenizer download needed).
+- CONTEXT_MAX_TOKENS sets the budget (unset: no budget); CONTEXT_COMPACTION=0 turns
+  compaction off entirely.
+  report() lists tokens before/after per task; print_report() shows it.
+"""
+
+import json
+import os
+import re
+import threading
+from collections import Counter
+
+from workshop.lazy import lazy_import
+
+hooks = lazy_import("crewai.hooks.dispatch")
+
+_FENCE = re.compile(r"```.*?(?:```|\Z)", re.S)
+_DIVIDER = re.compile(r"^-{3,}$")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'(*\[A-Z0-9])")
+_WORD = re.compile(r"[a-z0-9][a-z0-9_'-]*")
+_MARKER = re.compile(r"^\s*(?:[-*+•]|\d+[.)]|#+)\s*")
+_STOPWORDS = frozenset("""
+a an and are as at be been but by can for from has have how if in into is it its more most
+not of on or our so than that the their them then there these they this to was were what
+when which while who will with you your also such use used using
+""".split())
+
+
+def estimate_tokens(text):
+    return (len(text) + 3) // 4
+
+
+def enabled():
+    return os.getenv("CONTEXT_COMPACTION", "1").lower() not in ("0", "false", "no")
+
+
+def default_budget():
+    """
+    CONTEXT_MAX_TOKENS, or None (no budget: only duplicates are dropped) if it isn't set.
+    """
+    value = os.getenv("CONTEXT_MAX_TOKENS", "").strip()
+    return int(value) if value else None
+
+
+# --- SPLITTING ---
+class _Unit:
+    __slots__ = ("text", "sep", "protected", "words", "heading", "first")
+
+    def __init__(self, text, sep, protected=False, heading=False, first=False):
+        self.text, self.sep = text, sep
+        self.protected, self.heading, self.first = protected, heading, first
+        self.words = [] if protected else _WORD.findall(_MARKER.sub("", text.lower()))
+
+
+def _protected_spans(text):
+    """
+    (start, end) of code fences and valid JSON objects, which are never altered.
+    """
+    spans = [m.span() for m in _FENCE.finditer(text)]
+    decoder = json.JSONDecoder()
+    i = text.find("{")
+    while i != -1:
+        if not any(start <= i < end for start, end in spans):
+            try:
+                value, end = decoder.raw_decode(text, i)
+            except ValueError:
+                value = None
+            if isinstance(value, dict):
+                spans.append((i, end))
+                i = text.find("{", end)
+                continue
+        i = text.find("{", i + 1)
+    return sorted(spans)
+
+
+def _split(text):
+    units = []
+    first = True
+
+    def add_prose(chunk):
+        nonlocal first
+        for line in chunk.splitlines(keepends=True):
+            body = line.strip()
+            if not body:
+                if units:
+                    units[-1].sep += line
+                else:
+                    units.append(_Unit("", line, protected=True))
+                first = True
+                continue
+            indent = line[:len(line) - len(line.lstrip())]
+            trailing = line[len(indent) + len(body):]
+            if _DIVIDER.match(body):
+                units.append(_Unit(indent + body, trailing, protected=True))
+                first = True
+                continue
+            heading = body.startswith("#")
+            parts = [body] if heading or _MARKER.match(line) else _SENTENCE_END.split(body)
+            for n, part in enumerate(parts):
+                last = n == len(parts) - 1
+                units.append(_Unit(indent + part if n == 0 else part, trailing if last else " ",
+                                   heading=heading, first=first))
+                first = heading
+
+    pos = 0
+    for start, end in _protected_spans(text):
+        add_prose(text[pos:start])
+        units.append(_Unit(text[start:end], "", protected=True))
+        pos = end
+    add_prose(text[pos:])
+    return units
+
+
+# --- COMPACTION ---
+def _drop(units, keep):
+    """
+    The units whose index is in keep; a line break ending a dropped unit moves to the
+    kept unit before it, so lines don't run together.
+    """
+    kept = []
+    for i, unit in enumerate(units):
+        if i in keep:
+            kept.append(unit)
+        elif kept and "\n" in unit.sep and "\n" not in kept[-1].sep:
+            kept[-1].sep = unit.sep
+    return kept
+
+
+def _dedupe(units):
+    keep, seen = set(), set()
+    for i, unit in enumerate(units):
+        if unit.protected or not unit.words:
+            keep.add(i)
+            continue
+        key = " ".join(unit.words)
+        if key in seen:
+            continue
+        seen.add(key)
+        keep.add(i)
+    return _drop(units, keep), len(units) - len(keep)
+
+
+def _select(units, budget, focus):
+    """
+    Keeps protected units and the best-scoring others that fit in budget tokens.
+    """
+    cost = [estimate_tokens(u.text + u.sep) for u in units]
+    left = budget - sum(c for u, c in zip(units, cost) if u.protected)
+    freq = Counter(w for u in units for w in u.words if w not in _STOPWORDS and len(w) > 2)
+    total = sum(freq.values()) or 1
+    weight = {w: n / total for w, n in freq.items()}
+    top = max(weight.values(), default=1.0)
+    focus_words = set(_WORD.findall((focus or "").lower())) - _STOPWORDS
+
+    def score(i):
+        unit = units[i]
+        content = [w for w in set(unit.words) if w in weight]
+        value = sum(weight[w] * (2 if w in focus_words else 1) for w in content) / top / max(len(content), 1) ** 0.5
+        return value + (1.0 if unit.heading else 0.0) + (0.5 if unit.first else 0.0)
+
+    # SumBasic: after a unit is picked its words count less, so the next pick adds something new
+    candidates = [i for i, u in enumerate(units) if not u.protected]
+    keep = {i for i, u in enumerate(units) if u.protected}
+    while candidates and left > 0:
+        best = max(candidates, key=lambda i: (score(i), -i))
+        candidates.remove(best)
+        if cost[best] > left:
+            continue
+        keep.add(best)
+        left -= cost[best]
+        for w in set(units[best].words):
+            if w in weight:
+                weight[w] **= 2
+    return _drop(units, keep)
+
+
+def compact(text, max_tokens=None, focus=None):
+    """
+    Returns (compacted text, stats). focus is the downstream task's description. Without
+    max_tokens only duplicates are dropped.
+    """
+    before = estimate_tokens(text)
+    units, duplicates = _dedupe(_split(text))
+    size = sum(estimate_tokens(u.text + u.sep) for u in units)
+    over = max_tokens is not None and size > max_tokens
+    if not duplicates and not over:
+        return text, {"tokens_before": before, "tokens_after": before, "duplicates": 0, "dropped": 0}
+    selected = _select(units, max_tokens, focus) if over else units
+    result = "".join(u.text + u.sep for u in selected).strip()
+    stats = {"tokens_before": before, "tokens_after": estimate_tokens(result),
+             "duplicates": duplicates, "dropped": len(units) - len(selected)}
+    return result, stats
+
+
+# --- CREWAI HOOK ---
+_budgets = {}    # task.key -> max tokens, or None for no budget
+_stats = {}      # task name -> totals
+_lock = threading.Lock()
+_installed = False
+
+
+def _task_name(task):
+    name = task.name or task.description
+    return name if len(name) <= 60 else name[:59] + "…"
+
+
+def _pre_step(ctx):
+    if ctx.kind != "task" or ctx.task is None or not isinstance(ctx.payload, str) or not ctx.payload:
+        return None
+    if ctx.task.key not in _budgets:
+        return None
+    budget = _budgets[ctx.task.key]
+    result, stats = compact(ctx.payload, budget, focus=ctx.task.description)
+    with _lock:
+        row = _stats.setdefault(_task_name(ctx.task), dict.fromkeys(("runs", *stats), 0))
+        row["runs"] += 1
+        for key, value in stats.items():
+            row[key] += value
+    return result
+
+
+def compact_context(task, max_tokens=None):
+    """
+    Marks task so the context it gets from upstream tasks is deduplicated and, if a
+    budget is given (max_tokens, else CONTEXT_MAX_TOKENS), cut down to it. Returns task.
+    """
+    global _installed
+    if not enabled():
+        return task
+    _budgets[task.key] = max_tokens or default_budget()
+    with _lock:
+        if not _installed:
+            hooks.register(hooks.InterceptionPoint.PRE_STEP, _pre_step)
+            _installed = True
+    return task
+
+
+def report():
+    """
+    Context tokens before/after compaction per task, or "" if nothing was compacted.
+    """
+    with _lock:
+        rows = dict(_stats)
+    if not rows:
+        return ""
+    lines = ["Context compaction (estimated tokens):"]
+    for name, row in rows.items():
+        lines.append(f"  {name:<60} {row['tokens_before']:>6} -> {row['tokens_after']:>6}  "
+                     f"({row['duplicates']} duplicate, {row['dropped']} dropped units, {row['runs']} runs)")
+    return "\n".join(lines)
@@ -0,0 +1,281 @@
+"""
+Corpus Index for Multi-File QA (used by phase 6's corpus mode)
+
+Goal:
+- Answer questions over a whole directory (or glob) of PDF, JSON, CSV and text files,
+  thousands of them, with one tool, without reading unchanged files again per query.
+
+How it works:
+- CorpusIndex(location) takes a directory (searched recursively) or a glob pattern.
+  A background thread builds one TextIndex (workshop/text_index.py) per file, then
+  keeps polling every CORPUS_POLL_SECONDS (default 2): files whose size or mtime
+  changed are re-indexed, new files are added and deleted ones dropped. A poll only
+  stat()s; file contents are read only when they changed.
+- Queries only look at the indexes. Records that contain the query as a phrase or all
+  of its words are ranked with BM25 over the whole corpus (phrase matches first), and
+  the same record found in several files (same text, ignoring case and punctuation) is
+  returned once, with the other files listed.
+- Files above CORPUS_MAX_FILE_BYTES (default 50 MB) and files that fail to parse are
+  skipped (and retried once they change); summary() reports them. A pass that fails
+  as a whole is reported and the indexer keeps polling. Every page of a PDF is indexed
+  (PDF_PAGE_RANGE only applies to phase 6's single-PDF mode).
+"""
+
+import glob
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+
+from workshop.text_index import (TOKEN_RE, TextIndex, load_csv_rows, load_json_rows, load_pdf_lines,
+                                 tokenize)
+
+K1, B = 1.2, 0.75            # BM25 parameters
+PHRASE_BONUS = 2.0
+_NORMALIZE = re.compile(r"[\W_]+")
+
+Hit = namedtuple("Hit", "score path record also")   # also: [(path, record)] in other files
+
+
+def load_text_lines(path):
+    with open(path, encoding="utf-8", errors="replace") as f:
+        lines = f.read().splitlines()
+    return [line.lower() for line in lines], [f"[line {n}] {line.strip()}" for n, line in enumerate(lines, 1)]
+
+
+def _rows(load):
+    # JSON/CSV records are dicts; show them with their row number
+    def build(path):
+        texts, rows = load(path)
+        return texts, [f"[row {n}] {json.dumps(row, ensure_ascii=False)}" for n, row in enumerate(rows, 1)]
+    return build
+
+
+def load_whole_pdf(path):
+    # PDF_PAGE_RANGE is meant for phase 6's single PDF; a corpus indexes every page
+    return load_pdf_lines(path, pages=None)
+
+
+LOADERS = {
+    ".pdf": load_whole_pdf,
+    ".json": _rows(load_json_rows),
+    ".jsonl": _rows(load_json_rows),
+    ".ndjson": _rows(load_json_rows),
+    ".csv": _rows(load_csv_rows),
+    ".txt": load_text_lines,
+    ".md": load_text_lines,
+}
+
+
+class _FileEntry:
+    __slots__ = ("key", "index", "lengths", "total_tokens", "error")
+
+    def __init__(self, key, index=None, error=None):
+        self.key = key
+        self.index = index
+        self.error = error
+        self.lengths = [len(TOKEN_RE.findall(text)) for text in index.texts] if index else []
+        self.total_tokens = sum(self.lengths)
+
+
+class CorpusIndex:
+    def __init__(self, location, poll_seconds=None, max_file_bytes=None):
+        self.location = location
+        self.poll_seconds = poll_seconds or float(os.getenv("CORPUS_POLL_SECONDS", "2"))
+        self.max_file_bytes = max_file_bytes or int(os.getenv("CORPUS_MAX_FILE_BYTES", str(50 * 1024 * 1024)))
+        self._files = {}     # path -> _FileEntry
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_error = None
+        self.stats = {"passes": 0, "indexed": 0, "removed": 0, "errors": 0, "seconds": 0.0}
+
+    # --- INDEXING ---
+    def paths(self):
+        """
+        The supported files the location currently covers.
+        """
+        if os.path.isdir(self.location):
+            found = (os.path.join(root, name) for root, _, names in os.walk(self.location) for name in names)
+        else:
+            found = glob.iglob(self.location, recursive=True)
+        return sorted(p for p in found if os.path.splitext(p)[1].lower() in LOADERS and os.path.isfile(p))
+
+    def _build(self, path, key):
+        if key[0] > self.max_file_bytes:
+            return _FileEntry(key, error=f"larger than {self.max_file_bytes} bytes")
+        try:
+            texts, records = LOADERS[os.path.splitext(path)[1].lower()](path)
+        except Exception as e:
+            return _FileEntry(key, error=str(e) or type(e).__name__)
+        return _FileEntry(key, TextIndex(texts, records))
+
+    def refresh(self):
+        """
+        One pass: indexes new and changed files, drops deleted ones. Returns how many
+        files were (re)indexed.
+        """
+        started = time.perf_counter()
+        seen, changed = set(), 0
+        for path in self.paths():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            seen.add(path)
+            key = (st.st_size, st.st_mtime_ns)
+            with self._lock:
+                current = self._files.get(path)
+            if current is not None and current.key == key:
+                continue
+            entry = self._build(path, key)
+            with self._lock:
+                self._files[path] = entry
+            changed += 1
+        with self._lock:
+            gone = [path for path in self._files if path not in seen]
+            for path in gone:
+                del self._files[path]
+            self.stats["passes"] += 1
+            self.stats["indexed"] += changed
+            self.stats["removed"] += len(gone)
+            self.stats["seconds"] += time.perf_counter() - started
+        return changed
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                # Keep polling: the next pass may succeed (e.g. a directory that was briefly gone)
+                with self._lock:
+                    self.stats["errors"] += 1
+                    self.last_error = f"{type(e).__name__}: {e}"
+                print(f"[corpus] Indexing pass over {self.location} failed, retrying: {self.last_error}")
+            finally:
+                self._ready.set()
+            self._stop.wait(self.poll_seconds)
+
+    def start(self):
+        """
+        Starts the background indexer (once). Returns self.
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="corpus-indexer", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def wait_ready(self, timeout=None):
+        """
+        Waits for the first indexing pass; returns False on timeout.
+        """
+        return self._ready.wait(timeout)
+
+    # --- QUERIES ---
+    def search(self, query, limit=20):
+        """
+        Returns up to limit Hits, best first, one per distinct record.
+        """
+        words = sorted(set(tokenize(query)))
+        with self._lock:
+            entries = [(path, e) for path, e in self._files.items() if e.index is not None]
+        records = sum(len(e.index) for _, e in entries) or 1
+        avg_length = sum(e.total_tokens for _, e in entries) / records or 1.0
+        df = {w: sum(len(e.index.tokens.get(w, ())) for _, e in entries) for w in words}
+        idf = {w: math.log(1 + (records - n + 0.5) / (n + 0.5)) for w, n in df.items()}
+
+        hits = []
+        for path, entry in entries:
+            index = entry.index
+            phrase = set(index.search_ids(query))
+            for i in phrase.union(index.search_ids(query, mode="token") if words else ()):
+                text = index.texts[i]
+                tokens = TOKEN_RE.findall(text)
+                score = PHRASE_BONUS if i in phrase else 0.0
+                for w in words:
+                    tf = tokens.count(w)
+                    if tf:
+                        norm = K1 * (1 - B + B * entry.lengths[i] / avg_length)
+                        score += idf[w] * tf * (K1 + 1) / (tf + norm)
+                hits.append((score, path, i, text))
+
+        hits.sort(key=lambda h: (-h[0], h[1], h[2]))
+        results, by_text = [], {}
+        for score, path, i, text in hits:
+            norm = _NORMALIZE.sub(" ", text).strip()
+            first = by_text.get(norm)
+            if first is not None and (path == first.path or any(path == p for p, _ in first.also)):
+                continue   # another copy in a file the hit already lists
+            if first is None and len(results) == limit:
+                continue
+            with self._lock:
+                entry = self._files.get(path)
+            if entry is None or entry.index is None:
+                continue
+            if first is not None:
+                first.also.append((path, entry.index.records[i]))
+                continue
+            hit = Hit(score, path, entry.index.records[i], [])
+            by_text[norm] = hit
+            results.append(hit)
+        return results
+
+    def summary(self):
+        with self._lock:
+            indexed = sum(e.index is not None for e in self._files.values())
+            skipped = {path: e.error for path, e in self._files.items() if e.error}
+            records = sum(len(e.index) for e in self._files.values() if e.index is not None)
+            stats = dict(self.stats)
+        lines = [f"Corpus {self.location}: {indexed} files, {records} records indexed "
+                 f"({stats['passes']} passes, {stats['indexed']} (re)indexed, {stats['removed']} removed, "
+                 f"{stats['seconds']:.1f}s indexing)"]
+        if stats["errors"]:
+            lines.append(f"  {stats['errors']} indexing passes failed; last: {self.last_error}")
+        lines += [f"  skipped {path}: {error}" for path, error in sorted(skipped.items())]
+        return "\n".join(lines)
+
+
+def _position(record):
+    # "[p. 3, line 12]", "[line 4]" or "[row 7]"
+    return record[:record.index("]") + 1] if record.startswith("[") and "]" in record else ""
+
+
+def format_hits(hits, root=None):
+    """
+    One line per hit: rank, file (relative to root), position and text, plus the other
+    files holding the same record and where in them.
+    """
+    def name(path):
+        return os.path.relpath(path, root) if root else path
+    lines = []
+    for rank, hit in enumerate(hits, 1):
+        line = f"{rank}. {name(hit.path)} {hit.record}"
+        if hit.also:
+            line += f" (also in: {', '.join(f'{name(p)} {_position(r)}' for p, r in hit.also[:5])}"
+            line += f" and {len(hit.also) - 5} more)" if len(hit.also) > 5 else ")"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+_corpora = {}
+_corpora_lock = threading.Lock()
+
+
+def get_corpus(location):
+    """
+    Returns the shared, started CorpusIndex for location.
+    """
+    key = os.path.abspath(location) if os.path.isdir(location) else location
+    with _corpora_lock:
+        corpus = _corpora.get(key)
+        if corpus is None:
+            corpus = _corpora[key] = CorpusIndex(location).start()
+        return corpus
@@ -0,0 +1,238 @@
+"""
+Columnar CSV Scanner (used by phase 6)
+
+Goal:
+- Search very large / very wide CSV files fast, optionally in just one column.
+
+How it works:
+- The file is read in chunks of rows and transposed into column arrays (plain tuples).
+- Each searched column is joined into one lowercase string, so the match runs as a
+  single C-level str.find() loop over the whole chunk instead of a Python loop per cell.
+  Hit positions are mapped back to row numbers with a bisect over the cell offsets.
+- Only the matching rows are turned into dicts (same shape as csv.DictReader rows).
+- For files where every record sits on one line, mmap_scan_csv() skips CSV parsing
+  entirely: it searches the memory-mapped bytes and parses only the lines with hits.
+"""
+
+import csv
+import mmap
+import re
+from bisect import bisect_right
+from itertools import accumulate, count, islice, zip_longest
+from operator import add
+
+from workshop.mmap_scan import iter_hit_lines
+from workshop.pdf_cache import file_fingerprint
+
+# Rows per chunk: big enough to amortize the per-chunk joins, small enough that the
+# garbage collector is not rescanning a huge chunk of live row lists (measured: 2k rows
+# beats 100k rows by ~2x on a 300k x 20 CSV).
+CHUNK_ROWS = 2_000
+SEP = "\x00"   # cell separator in the joined column string; never part of a query
+
+
+class Column:
+    """
+    One column of a chunk, joined into a single lowercase string for fast searching.
+    Build it once per chunk; hits() can then be called for any number of queries.
+    """
+
+    def __init__(self, values):
+        self.values = values
+        joined = SEP.join(values)
+        self.lowered = joined.lower()
+        # Rare: lower() can change string lengths (e.g. 'İ'), so offsets would drift
+        self.aligned = len(self.lowered) == len(joined)
+        self._starts = None
+
+    def hits(self, query_lower):
+        """
+        Returns the indexes of the values that contain query_lower (case-insensitive).
+        """
+        if not query_lower:
+            return list(range(len(self.values)))
+        if SEP in query_lower or not self.aligned:
+            return [i for i, v in enumerate(self.values) if query_lower in v.lower()]
+        pos = self.lowered.find(query_lower)
+        if pos == -1:
+            return []
+        if self._starts is None:
+            # Offset of each cell in the joined string (cell lengths + one separator each)
+            self._starts = list(map(add, accumulate(map(len, self.values), initial=0), count()))
+        starts = self._starts
+        hits = []
+        while pos != -1:
+            i = bisect_right(starts, pos) - 1
+            hits.append(i)
+            # Skip the rest of this cell: one hit per cell is enough
+            pos = self.lowered.find(query_lower, starts[i + 1])
+        return hits
+
+
+def column_hits(values, query_lower):
+    """
+    Returns the indexes of the values that contain query_lower (case-insensitive).
+    """
+    return Column(values).hits(query_lower)
+
+
+def resolve_column(header, column):
+    """
+    Returns the index of column in header (case-insensitive), or raises ValueError.
+    """
+    wanted = column.strip().lower()
+    for i, name in enumerate(header):
+        if name.strip().lower() == wanted:
+            return i
+    raise ValueError(f"Unknown column '{column}'. Columns: {', '.join(header)}")
+
+
+def make_row(header, row):
+    """
+    Builds the same dict csv.DictReader would for this row.
+    """
+    record = dict(zip(header, row))
+    if len(row) > len(header):
+        record[None] = row[len(header):]
+    for name in header[len(row):]:
+        record[name] = None
+    return record
+
+
+def iter_chunks(path, column=None, chunk_rows=CHUNK_ROWS):
+    """
+    Yields (header, rows, columns) per chunk, where columns holds a Column for every
+    searched column (just one if column is given).
+    """
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        target = resolve_column(header, column) if column else None
+        while True:
+            chunk = list(islice(reader, chunk_rows))
+            if not chunk:
+                return
+            rows = list(filter(None, chunk))   # drop blank lines like DictReader
+            if not rows:
+                continue
+            transposed = list(zip_longest(*rows, fillvalue=""))
+            if target is None:
+                searched = transposed
+            else:
+                searched = [transposed[target]] if target < len(transposed) else []
+            yield header, rows, [Column(values) for values in searched]
+
+
+def _chunk_hits(columns, query_lower):
+    hits = set()
+    for col in columns:
+        hits.update(col.hits(query_lower))
+    return sorted(hits)
+
+
+def scan_csv(path, query, column=None, chunk_rows=CHUNK_ROWS):
+    """
+    Yields the rows (as dicts) whose cells contain query, case-insensitive.
+    If column is given, only that column is searched.
+    """
+    q = query.lower()
+    for header, rows, columns in iter_chunks(path, column, chunk_rows):
+        for i in _chunk_hits(columns, q):
+            yield make_row(header, rows[i])
+
+
+def scan_csv_batch(path, queries, column=None, limit=None, chunk_rows=CHUNK_ROWS):
+    """
+    Answers several queries in one pass over the CSV; each chunk is lowercased once
+    and then searched for every query.
+
+    Returns {query: [matching rows]}. Each list stops growing at limit rows, and the
+    scan ends early once every query has reached its limit.
+    """
+    results = {q: [] for q in queries}
+    pending = {q: q.lower() for q in queries}
+    for header, rows, columns in iter_chunks(path, column, chunk_rows):
+        for q, q_lower in list(pending.items()):
+            for i in _chunk_hits(columns, q_lower):
+                results[q].append(make_row(header, rows[i]))
+                if limit is not None and len(results[q]) >= limit:
+                    del pending[q]
+                    break
+        if not pending:
+            break
+    return results
+
+
+# --- MEMORY-MAPPED MODE ---
+# A line with an odd number of quotes opens a quoted cell that continues on the next line
+_ODD_QUOTES_LINE = re.compile(rb'^[^"\n]*"(?:[^"\n]*"[^"\n]*")*[^"\n]*$', re.MULTILINE)
+_one_line_records = {}   # file fingerprint -> bool
+
+
+def records_are_lines(path):
+    """
+    True if no quoted cell in the CSV spans several lines, i.e. every line is one record.
+    Checked once per file version with a regex over the memory-mapped file.
+    """
+    key = file_fingerprint(path)
+    if key not in _one_line_records:
+        if not key[1]:
+            _one_line_records[key] = True
+        else:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                _one_line_records[key] = _ODD_QUOTES_LINE.search(mm) is None
+    return _one_line_records[key]
+
+
+def _read_header(path):
+    with open(path, newline="") as f:
+        return next(csv.reader(f), None)
+
+
+def mmap_scan_csv_batch(path, queries, column=None, limit=None):
+    """
+    Same results as scan_csv_batch(), but only the lines that contain a hit are ever
+    decoded and parsed. Requires records_are_lines(path).
+
+    Inside a quoted cell each " is stored as "", so the raw bytes are searched for
+    both spellings of a query that contains quotes:
+
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), "quotes.csv")
+    >>> _ = open(path, "w").write('id,text\\n1,"they say ""hi"" a lot"\\n2,say "hi" raw\\n3,hi\\n')
+    >>> rows = mmap_scan_csv(path, 'say "hi"')
+    >>> [r["id"] for r in rows], rows == list(scan_csv(path, 'say "hi"'))
+    (['1', '2'], True)
+    """
+    results = {q: [] for q in queries}
+    header = _read_header(path)
+    if header is None:
+        return results
+    target = resolve_column(header, column) if column else None
+    pending = {q: q.lower() for q in queries}
+    raw = {spelling for q in pending for spelling in (q, q.replace('"', '""'))}
+    for _, start, text in iter_hit_lines(path, sorted(raw)):
+        if start == 0:
+            continue   # the header line
+        row = next(csv.reader([text]), None)
+        if not row:
+            continue
+        cells = [row[target] if target < len(row) else ""] if target is not None else row
+        cells = [c.lower() for c in cells]
+        for q, q_lower in list(pending.items()):
+            if any(q_lower in c for c in cells):
+                results[q].append(make_row(header, row))
+                if limit is not None and len(results[q]) >= limit:
+                    del pending[q]
+        if not pending:
+            break
+    return results
+
+
+def mmap_scan_csv(path, query, column=None, limit=None):
+    """
+    Returns the matching rows for one query using the memory-mapped mode.
+    """
+    return mmap_scan_csv_batch(path, [query], column=column, limit=limit)[query]
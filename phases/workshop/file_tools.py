@@ -0,0 +1,42 @@
+"""
+Artifact-Aware File Writer (used through workshop/registry.file_writer_tool)
+
+Goal:
+- Agents writing output files are recorded in the same store as the tasks (see
+  workshop/artifacts.py): no rewrite of unchanged content, provenance and versions.
+
+How it works:
+- ArtifactFileWriterTool is a drop-in FileWriterTool: same name, arguments, encoding
+  and confinement to its base directory (default: the working directory). Writing
+  content a file already holds succeeds without touching the file, even without
+  overwrite. Anything else is written by FileWriterTool itself, and the file is then
+  recorded in the store.
+"""
+
+import os
+
+from crewai_tools import FileWriterTool
+
+from workshop.artifacts import content_hash, file_hash, get_artifact_store
+
+WRITTEN = "Content successfully written to "
+
+
+class ArtifactFileWriterTool(FileWriterTool):
+    def _target(self, filename, directory):
+        # The path FileWriterTool would write, or None if it would refuse it
+        base = self.base_dir or os.path.realpath(os.getcwd())
+        path = os.path.realpath(os.path.join(base, directory or "./", filename))
+        return path if os.path.commonpath([base, path]) == base and path != base else None
+
+    def _run(self, filename, content, directory="./", overwrite=False):
+        path = self._target(filename, directory)
+        data = content.encode(self.encoding) if isinstance(content, str) else content
+        if path is not None and file_hash(path) == content_hash(data):
+            get_artifact_store().write(path, data, producer=f"tool:{self.name}")
+            return f"{WRITTEN}{os.path.relpath(path, self.base_dir or os.getcwd())} (unchanged)"
+        result = super()._run(filename, content, directory, overwrite)
+        if path is not None and result.startswith(WRITTEN):
+            # Already on disk, so the store only records it (and keeps a copy of this version)
+            get_artifact_store().write(path, data, producer=f"tool:{self.name}", written=True)
+        return result
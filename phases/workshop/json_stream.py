@@ -0,0 +1,162 @@
+"""
+Streaming JSON Reader (used by phase 6)
+
+Goal:
+- Filter huge JSON exports without ever holding the whole file (or all matches) in memory.
+
+How it works:
+- The file is read in chunks; each top-level row is decoded as soon as it is complete
+  and handed to the caller, then dropped.
+- Works for a JSON array of rows ([{...}, {...}]) and for NDJSON / concatenated rows
+  ({...}\\n{...}).
+- dump_rows() serializes matches one by one and stops at a match cap or a byte cap,
+  so memory stays flat however large the file is.
+"""
+
+import json
+import re
+import textwrap
+
+_WS = re.compile(r"\s*")
+_decoder = json.JSONDecoder()
+
+
+class _ChunkedText:
+    """
+    A read buffer over a text file that only keeps the not-yet-decoded tail in memory.
+    """
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def more(self):
+        # Read at least as much as we already hold, so one huge row is not re-parsed
+        # once per small chunk.
+        chunk = self.f.read(max(self.chunk_size, len(self.buf) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """
+        Skips whitespace and returns the next character without consuming it ('' at EOF).
+        """
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.more():
+                return ""
+
+    def decode(self):
+        """
+        Decodes and consumes the next JSON value, reading more of the file if needed.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+                # A value that ends exactly at the buffer edge may be cut short (e.g. a number)
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.more()
+
+
+def iter_json_rows(path, chunk_size=1 << 16):
+    """
+    Yields the top-level rows of a JSON array file or an NDJSON file, one at a time.
+    """
+    with open(path, encoding="utf-8") as f:
+        reader = _ChunkedText(f, chunk_size)
+        if reader.peek() != "[":
+            while reader.peek():
+                yield reader.decode()
+            return
+        reader.pos += 1
+        if reader.peek() == "]":
+            return
+        while True:
+            yield reader.decode()
+            c = reader.peek()
+            if c == ",":
+                reader.pos += 1
+            elif c == "]":
+                return
+            else:
+                raise ValueError(f"Expected ',' or ']' in JSON array, got {c!r}")
+
+
+def row_matches(row, query_lower):
+    """
+    True if any value of the row contains the (already lowercased) query.
+    """
+    values = row.values() if isinstance(row, dict) else [row]
+    return any(query_lower in str(v).lower() for v in values)
+
+
+def iter_matching_rows(path, query, chunk_size=1 << 16):
+    """
+    Yields the rows of a JSON/NDJSON file that contain query (case-insensitive).
+    """
+    q = query.lower()
+    for row in iter_json_rows(path, chunk_size):
+        if row_matches(row, q):
+            yield row
+
+
+def scan_json_batch(path, queries, limit=None, chunk_size=1 << 16):
+    """
+    Answers several queries in one pass over a JSON/NDJSON file.
+
+    Returns {query: [matching rows]}. Each list stops growing at limit rows, and the
+    scan ends early once every query has reached its limit.
+    """
+    results = {q: [] for q in queries}
+    pending = {q: q.lower() for q in queries}
+    for row in iter_json_rows(path, chunk_size):
+        values = [str(v).lower() for v in (row.values() if isinstance(row, dict) else [row])]
+        for q, q_lower in list(pending.items()):
+            if any(q_lower in v for v in values):
+                results[q].append(row)
+                if limit is not None and len(results[q]) >= limit:
+                    del pending[q]
+        if not pending:
+            break
+    return results
+
+
+def dump_rows(rows, max_matches=None, max_bytes=None):
+    """
+    Serializes rows exactly like json.dumps(list(rows), indent=2), but stops once
+    max_matches rows or max_bytes of output are reached. The first row is always kept.
+
+    Returns (text, count, truncated).
+    """
+    parts, size, count = [], 4, 0   # 4 bytes for "[\\n" and "\\n]"
+    truncated = False
+    for row in rows:
+        if max_matches is not None and count >= max_matches:
+            truncated = True
+            break
+        piece = textwrap.indent(json.dumps(row, indent=2), "  ")
+        piece_size = len(piece.encode("utf-8")) + 2   # + ",\n"
+        if count and max_bytes is not None and size + piece_size > max_bytes:
+            truncated = True
+            break
+        parts.append(piece)
+        size += piece_size
+        count += 1
+    if not count:
+        return "[]", 0, truncated
+    return "[\n" + ",\n".join(parts) + "\n]", count, truncated
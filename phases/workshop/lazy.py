@@ -0,0 +1,83 @@
+"""
+Lazy Imports (used by every phase)
+
+Goal:
+- Importing a phase script should take milliseconds, not the seconds crewai and
+  crewai_tools need. Heavy libraries are imported only when a crew is actually built,
+  which keeps CLI start-up and cold-started workers fast.
+
+How it works:
+- lazy_import("crewai") returns a stand-in module. The real import happens (and is
+  timed) on the first attribute access, e.g. crewai.Agent.
+- Phase scripts only touch those attributes inside agent factories, make_*crew()
+  functions and flow class factories (see workshop/registry.py), so importing a phase
+  loads nothing heavy.
+- startup_report() lists the deferred imports that happened, what triggered them and
+  how long they took. benchmarks/startup_budget.py measures each phase's import cost
+  with python -X importtime and checks it against a budget.
+"""
+
+import importlib
+import sys
+import threading
+import time
+import types
+
+_proxies = {}
+_loads = []   # (module name, attribute that triggered the import, seconds)
+_lock = threading.Lock()
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that is imported on first attribute access.
+    """
+
+    def _load(self, attr):
+        module = self.__dict__.get("_module")
+        if module is None:
+            already_loaded = self.__name__ in sys.modules
+            started = time.perf_counter()
+            module = importlib.import_module(self.__name__)
+            if not already_loaded:
+                with _lock:
+                    _loads.append((self.__name__, attr, time.perf_counter() - started))
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        if attr.startswith("__") and attr.endswith("__"):
+            raise AttributeError(attr)
+        return getattr(self._load(attr), attr)
+
+    def __dir__(self):
+        return dir(self._load("__dir__"))
+
+
+def lazy_import(name):
+    """
+    Returns a LazyModule for name (one shared stand-in per module name).
+    """
+    with _lock:
+        if name not in _proxies:
+            _proxies[name] = LazyModule(name)
+        return _proxies[name]
+
+
+def is_loaded(name):
+    return name in sys.modules
+
+
+def startup_report():
+    """
+    Returns a small table of the deferred imports that have happened so far.
+    """
+    with _lock:
+        loads = list(_loads)
+    if not loads:
+        return "Lazy imports: nothing heavy imported yet."
+    width = max(len(name) + len(attr) + 1 for name, attr, _ in loads)
+    lines = [f"Lazy imports: {len(loads)} deferred, {sum(s for _, _, s in loads):.2f}s in total"]
+    for name, attr, seconds in loads:
+        lines.append(f"  {name + '.' + attr:<{width}}  {seconds * 1000:8.1f} ms")
+    return "\n".join(lines)
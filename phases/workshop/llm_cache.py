@@ -0,0 +1,195 @@
+"""
+LLM Response Cache (used by every phase)
+
+Goal:
+- Identical prompts shouldn't cost a second API call. Re-running a phase with the same
+  topic in CI or during development answers from cache in milliseconds.
+
+How it works:
+- CachedLLM (workshop/cached_llm.py) wraps the agent's real LLM. Each call is keyed on
+  a SHA-256 of the model name, the messages, the tool schemas and the stop words.
+- Two tiers: an in-memory LRU (fast, per process) and a SQLite file (shared between
+  runs). Both honour a TTL; the disk tier also evicts least-recently-used entries once
+  it holds more than LLM_CACHE_MAX_ENTRIES.
+- Only plain-text answers are cached. Calls that return tool calls or structured
+  objects always go to the real LLM.
+
+- The same wrapper applies the LLM call budget (LLM_MAX_CONCURRENCY,
+  LLM_REQUESTS_PER_MINUTE; see workshop/rate_limit.py), with or without the cache.
+
+Enable it with LLM_CACHE=1 in .env. Optional: LLM_CACHE_PATH (default
+outputs/llm_cache.sqlite3), LLM_CACHE_TTL_SECONDS (default one day),
+LLM_CACHE_MAX_ENTRIES (default 5000).
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from workshop.lazy import lazy_import
+
+crewai = lazy_import("crewai")
+cached_llm = lazy_import("workshop.cached_llm")
+rate_limit = lazy_import("workshop.rate_limit")
+
+
+def cache_key(model, messages, tools=None, stop=None):
+    """
+    Returns the hex SHA-256 identifying one LLM request.
+    """
+    blob = json.dumps(
+        {"model": model, "messages": messages, "tools": tools or [], "stop": sorted(stop or [])},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+# --- TIERS ---
+class MemoryCache:
+    """
+    In-memory LRU with a TTL.
+    """
+
+    def __init__(self, max_entries=256, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._items = OrderedDict()   # key -> (stored_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if self.ttl is not None and time.time() - item[0] > self.ttl:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return item[1]
+
+    def set(self, key, value, stored_at=None):
+        with self._lock:
+            self._items[key] = (stored_at or time.time(), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+
+class SQLiteCache:
+    """
+    On-disk tier: one SQLite table, TTL on read, LRU eviction on write.
+    """
+
+    def __init__(self, path, max_entries=5000, ttl=None, table="responses"):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.table = table
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns (stored_at, value) or None.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(f"SELECT value, stored_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl is not None and now - row[1] > self.ttl:
+                self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                return None
+            self._db.execute(f"UPDATE {self.table} SET used_at = ? WHERE key = ?", (now, key))
+        return row[1], row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, stored_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            if self.ttl is not None:
+                self._db.execute(f"DELETE FROM {self.table} WHERE stored_at < ?", (now - self.ttl,))
+            self._db.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f" SELECT key FROM {self.table} ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+
+class ResponseCache:
+    """
+    Memory tier in front of an optional disk tier. Tracks hits and misses.
+    """
+
+    def __init__(self, memory=None, disk=None):
+        self.memory = memory or MemoryCache()
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            found = self.disk.get(key)
+            if found is not None:
+                stored_at, value = found
+                self.memory.set(key, value, stored_at=stored_at)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_response_cache():
+    """
+    Returns the process-wide ResponseCache configured from the environment.
+    """
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            ttl = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(24 * 3600))) or None
+            disk = SQLiteCache(
+                os.getenv("LLM_CACHE_PATH", "outputs/llm_cache.sqlite3"),
+                max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000")),
+                ttl=ttl,
+            )
+            _shared_cache = ResponseCache(MemoryCache(ttl=ttl), disk)
+        return _shared_cache
+
+
+def agent_llm(model=None):
+    """
+    The llm= to give an Agent. With LLM_CACHE=1 or an LLM budget this is the usual
+    model wrapped in CachedLLM; otherwise it is None, which keeps crewai's default LLM.
+    """
+    cache = get_response_cache() if os.getenv("LLM_CACHE", "").lower() in ("1", "true", "yes") else None
+    limiter = rate_limit.get_llm_limiter()
+    if cache is None and limiter is None:
+        return None
+    model = model or os.getenv("OPENAI_MODEL_NAME") or os.getenv("MODEL") or "gpt-4o-mini"
+    return cached_llm.CachedLLM(crewai.LLM(model=model), cache, limiter)
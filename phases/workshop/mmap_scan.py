@@ -0,0 +1,89 @@
+"""
+Memory-Mapped Line Scanner (used by phases 4 and 6)
+
+Goal:
+- Search multi-GB text files (CSV exports, logs, code) with near-constant memory.
+
+How it works:
+- The file is mmapped, and a bytes regex runs directly over the mapping, so the
+  operating system pages the file in and out and nothing is copied into Python objects.
+- Case folding happens in the pattern: ASCII queries use re.IGNORECASE; other queries
+  match every upper/lower-case spelling of each character.
+- Only the lines that contain a hit are sliced out and decoded, then checked again with
+  the usual `query.lower() in line.lower()` test.
+"""
+
+import mmap
+import os
+import re
+
+COUNT_WINDOW = 1 << 20   # bytes per slice when counting line numbers
+
+
+def _spellings(ch):
+    encoded = sorted({v.encode("utf-8") for v in (ch, ch.lower(), ch.upper())})
+    if len(encoded) == 1:
+        return re.escape(encoded[0])
+    return b"(?:" + b"|".join(re.escape(v) for v in encoded) + b")"
+
+
+def query_pattern(queries):
+    """
+    Compiles one bytes regex that finds any of the queries, case-insensitively.
+    """
+    if all(q.isascii() for q in queries):
+        return re.compile(b"|".join(re.escape(q.encode("ascii")) for q in queries), re.IGNORECASE)
+    return re.compile(b"|".join(b"".join(_spellings(ch) for ch in q) for q in queries))
+
+
+def _count_newlines(mm, start, end):
+    # mmap has no count(); copy at most COUNT_WINDOW bytes at a time
+    total = 0
+    for pos in range(start, end, COUNT_WINDOW):
+        total += mm[pos:min(pos + COUNT_WINDOW, end)].count(b"\n")
+    return total
+
+
+def iter_hit_lines(path, queries, line_numbers=False, encoding="utf-8"):
+    """
+    Yields (line_number, line_start, text) for every line that contains one of the
+    queries (case-insensitive). line_number is 0 unless line_numbers=True, which costs
+    an extra bounded-memory newline count between hits.
+    """
+    if not os.path.getsize(path):
+        return
+    lowered = [q.lower() for q in queries]
+    pattern = query_pattern(queries)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        pos, line_no, counted_to = 0, 1, 0
+        while pos < size:
+            m = pattern.search(mm, pos)
+            if not m:
+                return
+            start = mm.rfind(b"\n", 0, m.start()) + 1
+            end = mm.find(b"\n", m.start())
+            if end == -1:
+                end = size
+            text = mm[start:end].decode(encoding, errors="replace").rstrip("\r")
+            pos = end + 1
+            # The pattern can over-match odd Unicode case pairs; keep the exact semantics
+            line = text.lower()
+            if not any(q in line for q in lowered):
+                continue
+            if line_numbers:
+                line_no += _count_newlines(mm, counted_to, start)
+                counted_to = start
+            yield (line_no if line_numbers else 0), start, text
+
+
+def search_lines(path, query, line_numbers=True, limit=None):
+    """
+    Returns [(line_number, text)] for the lines of a text file that mention query.
+    """
+    hits = []
+    for line_no, _, text in iter_hit_lines(path, [query], line_numbers=line_numbers):
+        hits.append((line_no, text))
+        if limit is not None and len(hits) >= limit:
+            break
+    return hits
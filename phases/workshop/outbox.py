@@ -0,0 +1,228 @@
+"""
+Persistent Notification Outbox (used by phases 2 and 5)
+
+Goal:
+- Take notifications off the critical path: the caller enqueues a message and returns
+  at once, and a background worker delivers it.
+- Never lose a message: the queue lives in a small SQLite file (OUTBOX_PATH, default
+  outputs/outbox.sqlite3), so anything not yet delivered survives a crash and is sent
+  by the next run.
+
+How it works:
+- put(channel, payload) stores the message; a handler registered for that channel
+  delivers it from a worker thread.
+- A failed delivery is retried with exponential backoff (1s, 2s, 4s, ... capped, plus
+  jitter). After max_attempts, or on PermanentFailure, the message is kept as "dead"
+  with its last error instead of being retried forever.
+- A message being delivered is leased for a while, so if the process dies mid-send,
+  another run picks it up again once the lease expires.
+- A channel can register merge(a, b): due messages queued behind the first one are
+  folded into it as long as merge returns a payload (not None), and sent as one
+  delivery. Telegram uses this to coalesce bursts per chat (workshop/telegram_client.py).
+"""
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+
+MAX_MERGED = 50   # messages looked at per delivery when the channel merges
+
+
+class PermanentFailure(Exception):
+    """
+    Raised by a delivery handler when retrying can't help (e.g. a bad chat id).
+    """
+
+
+class Outbox:
+    def __init__(self, path=None, max_attempts=5, base_delay=1.0, max_delay=60.0, lease=300.0):
+        self.path = path or os.getenv("OUTBOX_PATH", "outputs/outbox.sqlite3")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease = lease
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " channel TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_attempt REAL NOT NULL,"
+            " dead INTEGER NOT NULL DEFAULT 0,"
+            " last_error TEXT)"
+        )
+        self._handlers = {}
+        self._mergers = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    # --- PUBLIC API ---
+    def register(self, channel, deliver, merge=None):
+        """
+        deliver(payload) sends one message; it raises to ask for a retry. merge(a, b)
+        optionally returns one payload that replaces both, or None if they can't merge.
+        """
+        self._handlers[channel] = deliver
+        if merge is not None:
+            self._mergers[channel] = merge
+        self.start()
+
+    def put(self, channel, payload):
+        """
+        Stores a message for delivery and returns its id without waiting for the network.
+        """
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT INTO messages (channel, payload, next_attempt) VALUES (?, ?, ?)",
+                (channel, json.dumps(payload), time.time()),
+            )
+        self.start()
+        self._wake.set()
+        return cur.lastrowid
+
+    def pending(self):
+        """
+        Number of undelivered (not dead) messages for the registered channels.
+        """
+        channels = list(self._handlers)
+        if not channels:
+            return 0
+        marks = ",".join("?" * len(channels))
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT COUNT(*) FROM messages WHERE dead = 0 AND channel IN ({marks})", channels
+            ).fetchone()
+        return row[0]
+
+    def dead_letters(self):
+        """
+        Returns [(id, channel, payload, last_error)] for messages that gave up.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, channel, payload, last_error FROM messages WHERE dead = 1 ORDER BY id"
+            ).fetchall()
+        return [(i, channel, json.loads(payload), error) for i, channel, payload, error in rows]
+
+    def drain(self, timeout=30.0):
+        """
+        Waits until every registered message is delivered or dead. Call it at the end
+        of a script; returns False if messages are still pending after timeout.
+        """
+        deadline = time.monotonic() + timeout
+        self._wake.set()
+        while self.pending():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def start(self):
+        """
+        Starts the delivery worker (also sends messages left over from earlier runs).
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="outbox", daemon=True)
+                self._thread.start()
+
+    # --- WORKER ---
+    def _claim(self):
+        """
+        Leases the next due message and, if its channel merges, the due messages right
+        behind it that merge into it. Returns (ids, channel, payload, attempts) or None.
+        """
+        channels = list(self._handlers)
+        if not channels:
+            return None
+        marks = ",".join("?" * len(channels))
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, channel, payload, attempts, next_attempt FROM messages"
+                f" WHERE dead = 0 AND next_attempt <= ? AND channel IN ({marks})"
+                " ORDER BY id LIMIT 1",
+                [now, *channels],
+            ).fetchone()
+            if row is None:
+                return None
+            rows = [row]
+            if row[1] in self._mergers:
+                rows += self._db.execute(
+                    "SELECT id, channel, payload, attempts, next_attempt FROM messages"
+                    " WHERE dead = 0 AND next_attempt <= ? AND channel = ? AND id > ? ORDER BY id LIMIT ?",
+                    (now, row[1], row[0], MAX_MERGED - 1),
+                ).fetchall()
+            ids, payload, attempts = [], None, 0
+            for msg_id, channel, raw, tries, next_attempt in rows:
+                value = json.loads(raw)
+                merged = value if payload is None else self._mergers[channel](payload, value)
+                if merged is None:
+                    break   # keep the order: the rest waits for the next delivery
+                # Lease the message; the WHERE guards against another process claiming it first
+                cur = self._db.execute(
+                    "UPDATE messages SET next_attempt = ? WHERE id = ? AND next_attempt = ?",
+                    (now + self.lease, msg_id, next_attempt),
+                )
+                if cur.rowcount != 1:
+                    break
+                ids.append(msg_id)
+                payload, attempts = merged, max(attempts, tries)
+        return (ids, row[1], payload, attempts) if ids else None
+
+    def _next_due_in(self):
+        with self._lock:
+            row = self._db.execute("SELECT MIN(next_attempt) FROM messages WHERE dead = 0").fetchone()
+        if row[0] is None:
+            return 1.0
+        return min(max(row[0] - time.time(), 0.0), 1.0)
+
+    def _run(self):
+        while True:
+            claimed = self._claim()
+            if claimed is None:
+                self._wake.wait(self._next_due_in())
+                self._wake.clear()
+                continue
+            ids, channel, payload, attempts = claimed
+            try:
+                self._handlers[channel](payload)
+            except Exception as e:
+                self._failed(ids, attempts + 1, e)
+            else:
+                with self._lock:
+                    self._db.executemany("DELETE FROM messages WHERE id = ?", [(i,) for i in ids])
+
+    def _failed(self, ids, attempts, error):
+        dead = isinstance(error, PermanentFailure) or attempts >= self.max_attempts
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        delay += random.uniform(0, delay / 10)
+        with self._lock:
+            self._db.executemany(
+                "UPDATE messages SET attempts = ?, next_attempt = ?, dead = ?, last_error = ? WHERE id = ?",
+                [(attempts, time.time() + delay, int(dead), f"{type(error).__name__}: {error}", i) for i in ids],
+            )
+
+
+_default_outbox = None
+_default_lock = threading.Lock()
+
+
+def get_outbox():
+    """
+    Returns the shared Outbox, created on first use (after .env is loaded).
+    """
+    global _default_outbox
+    with _default_lock:
+        if _default_outbox is None:
+            _default_outbox = Outbox()
+        return _default_outbox
@@ -0,0 +1,89 @@
+"""
+Parallel Crew Runner
+
+Goal:
+- Run independent crews (or whole flows) at the same time, so the total wall-clock time
+  is roughly that of the slowest one instead of the sum of all of them.
+
+How it works:
+- Each crew runs through Crew.kickoff_async() on one asyncio event loop. run_jobs()
+  does the same for any async job, e.g. a Flow's kickoff_async() with its inputs.
+- A semaphore limits how many crews run at once (useful for API rate limits).
+- Every crew can have its own timeout. Results come back in the order the crews
+  were given, whichever finishes first.
+
+Note: kickoff_async() runs the crew in a worker thread. A timed-out crew stops being
+awaited, but its thread finishes in the background (Python threads can't be killed).
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+
+@dataclass
+class CrewRun:
+    name: str
+    result: Any = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+async def run_jobs_async(jobs, timeout=None, max_concurrency=None):
+    """
+    Runs (name, start) jobs concurrently and returns a CrewRun per job, in job order.
+    start is called with no arguments when the job's turn comes and returns an awaitable.
+
+    timeout is either seconds for every job or a dict {name: seconds}; None means no limit.
+    max_concurrency limits how many jobs run at once (default: all of them).
+    """
+    jobs = list(jobs)
+    semaphore = asyncio.Semaphore(max_concurrency or max(len(jobs), 1))
+
+    async def run_one(name, start):
+        limit = timeout.get(name) if isinstance(timeout, dict) else timeout
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(start(), limit)
+                return CrewRun(name, result=result, seconds=time.perf_counter() - started)
+            except asyncio.TimeoutError:
+                return CrewRun(name, error=f"timed out after {limit}s", seconds=time.perf_counter() - started)
+            except Exception as e:
+                return CrewRun(name, error=str(e), seconds=time.perf_counter() - started)
+
+    return await asyncio.gather(*(run_one(name, start) for name, start in jobs))
+
+
+async def run_crews_async(jobs, timeout=None, max_concurrency=None):
+    """
+    Runs (name, crew) jobs concurrently and returns a CrewRun per job, in job order.
+    """
+    return await run_jobs_async([(name, crew.kickoff_async) for name, crew in jobs],
+                                timeout=timeout, max_concurrency=max_concurrency)
+
+
+def run_jobs(jobs, timeout=None, max_concurrency=None):
+    """
+    Blocking wrapper around run_jobs_async() for plain scripts.
+    """
+    # Not asyncio.run(): that waits for every worker thread on exit, so one timed-out
+    # job would hold up the results. loop.close() lets those threads finish on their own.
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(run_jobs_async(jobs, timeout=timeout, max_concurrency=max_concurrency))
+    finally:
+        loop.close()
+
+
+def run_crews(jobs, timeout=None, max_concurrency=None):
+    """
+    Blocking wrapper around run_crews_async() for plain scripts.
+    """
+    return run_jobs([(name, crew.kickoff_async) for name, crew in jobs],
+                    timeout=timeout, max_concurrency=max_concurrency)
@@ -0,0 +1,250 @@
+"""
+PDF Page-Text Cache (used by phase 6)
+
+Goal:
+- Parse each PDF page with PyPDF2 once, then answer every later query from cache.
+
+How it works:
+- Text is cached per page, keyed by file path, size, mtime and a SHA-256 of the content.
+- Unchanged PDFs skip PyPDF2 entirely; an edited PDF gets a new key and is re-extracted.
+- The cache always lives in memory. Set PDF_CACHE_DIR in .env to also keep it on disk
+  between runs (one small JSON file per PDF version).
+- iter_pages() streams (page number, text) in page order. Only pages missing from the
+  cache are extracted: in chunks of pages on a process pool (PDF_WORKERS processes,
+  default one per CPU), or in this process for a few pages or a single worker. Pages
+  are yielded as soon as their chunk is done, so a reader can start on page 1 while
+  later pages are still being parsed.
+- PDF_PAGE_RANGE (e.g. "1-50" or "1-10,30") limits phase 6 to some pages; only those
+  are extracted.
+"""
+
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+PARALLEL_MIN_PAGES = 8   # fewer missing pages than this are extracted in-process
+MAX_CHUNK_PAGES = 32
+
+
+def file_fingerprint(path):
+    """
+    Returns (absolute path, size, mtime_ns) for a file. Cheap: only a stat() call.
+    """
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_size, st.st_mtime_ns
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """
+    Returns the SHA-256 hex digest of a file, read in 1 MB chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_page_range(spec):
+    """
+    "1-10,30" -> sorted 0-based page indexes {0..9, 29}. Returns None for an empty spec.
+    """
+    if not spec or not spec.strip():
+        return None
+    pages = set()
+    for part in spec.split(","):
+        first, _, last = part.strip().partition("-")
+        first = int(first)
+        last = int(last) if last else first
+        if first < 1 or last < first:
+            raise ValueError(f"Bad page range '{part.strip()}' in '{spec}' (pages start at 1).")
+        pages.update(range(first - 1, last))
+    return sorted(pages)
+
+
+def page_range():
+    """
+    The pages PDF_PAGE_RANGE selects (0-based), or None for all pages.
+    """
+    return parse_page_range(os.getenv("PDF_PAGE_RANGE", ""))
+
+
+# --- EXTRACTION ---
+def page_count(path):
+    import PyPDF2
+
+    with open(path, "rb") as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def extract_page_chunk(path, indexes):
+    """
+    Returns [(page index, text)] for some pages of path. Runs in the pool's worker
+    processes, so it opens its own reader.
+    """
+    import PyPDF2
+
+    with open(path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        return [(i, reader.pages[i].extract_text() or "") for i in indexes]
+
+
+def pdf_workers():
+    return int(os.getenv("PDF_WORKERS", "0")) or os.cpu_count() or 1
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # forkserver: workers start from a clean process, not a fork of this threaded one
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return _pool
+
+
+def _extract(path, indexes):
+    """
+    Yields (page index, text) for indexes, in that order.
+    """
+    if not indexes:
+        return
+    workers = pdf_workers()
+    if workers <= 1 or len(indexes) < PARALLEL_MIN_PAGES:
+        yield from extract_page_chunk(path, indexes)
+        return
+    # About four chunks per worker: balances uneven pages without parsing the file too often
+    size = min(max(math.ceil(len(indexes) / (workers * 4)), 1), MAX_CHUNK_PAGES)
+    pool = _get_pool(workers)
+    futures = [pool.submit(extract_page_chunk, path, indexes[i:i + size]) for i in range(0, len(indexes), size)]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+class PdfPageCache:
+    """
+    In-memory (and optionally on-disk) cache of extracted PDF text, one entry per page.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or None
+        self._entries = {}   # cache key -> {"page_count": int, "pages": {page index: text}}
+        self._hashes = {}    # (path, size, mtime_ns) -> sha256, so we only hash changed files
+        self._lock = threading.Lock()
+
+    # --- KEYS ---
+    def cache_key(self, path):
+        """
+        Returns the cache key (path, size, mtime_ns, sha256) for the file as it is right now.
+        """
+        fingerprint = file_fingerprint(path)
+        with self._lock:
+            sha = self._hashes.get(fingerprint)
+        if sha is None:
+            sha = file_sha256(path)
+            with self._lock:
+                # Forget hashes of older versions of the same file
+                for old in [fp for fp in self._hashes if fp[0] == fingerprint[0]]:
+                    del self._hashes[old]
+                self._hashes[fingerprint] = sha
+        return fingerprint + (sha,)
+
+    def _disk_path(self, key):
+        name = hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.json")
+
+    # --- STORAGE ---
+    def _load(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None or not self.cache_dir:
+            return entry
+        disk_path = self._disk_path(key)
+        try:
+            with open(disk_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if tuple(data.get("key", ())) != key:
+            return None
+        entry = {
+            "page_count": data["page_count"],
+            "pages": {int(i): text for i, text in data["pages"].items()},
+        }
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key, entry):
+        with self._lock:
+            # Only keep the newest version of each file in memory
+            for old in [k for k in self._entries if k[0] == key[0] and k != key]:
+                del self._entries[old]
+            self._entries[key] = entry
+
+    def _save(self, key, entry):
+        self._remember(key, entry)
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        disk_path = self._disk_path(key)
+        tmp_path = f"{disk_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"key": list(key), "page_count": entry["page_count"], "pages": entry["pages"]}, f)
+        os.replace(tmp_path, disk_path)
+
+    # --- PUBLIC API ---
+    def iter_pages(self, path, pages=None):
+        """
+        Yields (page number starting at 1, text) for pages (0-based indexes, default all),
+        in page order. Pages not cached yet are extracted in parallel and cached.
+        """
+        key = self.cache_key(path)
+        entry = self._load(key)
+        count = entry["page_count"] if entry is not None else page_count(path)
+        cached = entry["pages"] if entry is not None else {}
+        wanted = [i for i in (range(count) if pages is None else pages) if 0 <= i < count]
+        missing = [i for i in wanted if i not in cached]
+        extracted = {}
+        try:
+            fresh = _extract(path, missing)
+            for i in wanted:
+                if i in cached:
+                    text = cached[i]
+                else:
+                    _, text = next(fresh)
+                    extracted[i] = text
+                yield i + 1, text
+        finally:
+            if extracted or entry is None:
+                self._save(key, {"page_count": count, "pages": {**cached, **extracted}})
+
+    def get_pages(self, path):
+        """
+        Returns the text of every page in the PDF, using the cache whenever the file is unchanged.
+        """
+        return [text for _, text in self.iter_pages(path)]
+
+    def clear(self):
+        """
+        Drops everything held in memory. Files in PDF_CACHE_DIR are left alone.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._hashes.clear()
+
+
+# Shared instance used by the phase scripts
+pdf_cache = PdfPageCache(cache_dir=os.getenv("PDF_CACHE_DIR"))
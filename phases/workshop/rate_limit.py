@@ -0,0 +1,115 @@
+"""
+LLM Call Budget (used through workshop/llm_cache.agent_llm)
+
+Goal:
+- Let many crews run at once without going over the API's limits. Batch runs (phase 3
+  --batch) scale with the number of LLM calls allowed in flight, not with the number of
+  crews started.
+
+How it works:
+- RateLimiter combines a concurrency limit (calls in flight) with a requests-per-minute
+  budget (a token bucket that refills continuously, so short bursts are allowed).
+- Every LLM call made through agent_llm() takes a slot first and gives it back when the
+  answer arrives. Cached answers don't take a slot.
+- Callers wait in threads, so one limiter is shared by all crews, flows and event loops
+  in the process.
+
+Configure it with LLM_MAX_CONCURRENCY and LLM_REQUESTS_PER_MINUTE in .env (both unset
+means no limit).
+"""
+
+import contextlib
+import os
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    At most max_concurrency calls in flight and requests_per_minute calls started per
+    minute (None for no limit). Tracks how long callers waited.
+    """
+
+    def __init__(self, max_concurrency=None, requests_per_minute=None):
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self._tokens = float(requests_per_minute or 0)
+        self._refilled_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.waited_seconds = 0.0
+
+    def _take_token(self):
+        """
+        Returns 0 if a call may start now, else how long to wait before asking again.
+        """
+        rate = self.requests_per_minute / 60.0
+        now = time.monotonic()
+        self._tokens = min(self.requests_per_minute, self._tokens + (now - self._refilled_at) * rate)
+        self._refilled_at = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / rate
+
+    def acquire(self):
+        started = time.monotonic()
+        if self._slots is not None:
+            self._slots.acquire()
+        try:
+            while self.requests_per_minute:
+                with self._lock:
+                    delay = self._take_token()
+                if not delay:
+                    break
+                time.sleep(delay)
+        except BaseException:
+            if self._slots is not None:
+                self._slots.release()
+            raise
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            self.waited_seconds += time.monotonic() - started
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        if self._slots is not None:
+            self._slots.release()
+
+    @contextlib.contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def report(self):
+        return (f"LLM budget: {self.calls} call(s), peak {self.peak_in_flight} in flight "
+                f"(limit {self.max_concurrency or 'none'}, {self.requests_per_minute or 'no'} rpm), "
+                f"{self.waited_seconds:.1f}s spent waiting")
+
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+
+def get_llm_limiter():
+    """
+    Returns the process-wide RateLimiter from the environment, or None if no limit is set.
+    """
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            concurrency = int(os.getenv("LLM_MAX_CONCURRENCY") or 0) or None
+            rpm = float(os.getenv("LLM_REQUESTS_PER_MINUTE") or 0) or None
+            if concurrency is None and rpm is None:
+                return None
+            _shared_limiter = RateLimiter(concurrency, rpm)
+        return _shared_limiter
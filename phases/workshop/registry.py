@@ -0,0 +1,182 @@
+"""
+Lazy Agent and Tool Registry (used by every phase)
+
+Goal:
+- Importing a phase script shouldn't build every agent and tool up front, and a crew
+  made once per flow run shouldn't make new tool objects every time.
+
+How it works:
+- Phase scripts register a factory under a name, usually as a decorator:
+
+      @registry.register("phase0.researcher")
+      def researcher():
+          return Agent(...)
+
+  The decorated name becomes an accessor: nothing is built until researcher() is first
+  called, and every later call (from any crew or flow run in the process) returns the
+  same instance.
+- The common tools (web search, file read/write, code interpreter) are registered here;
+  their libraries are imported inside the factories, so a phase only pays for the tools
+  it actually uses. @registry.tool("Name") does the same for a phase's own @tool
+  functions: crewai's tool object is made on first use.
+- Every build is timed. registry.report() lists what was built and how long it took;
+  set WORKSHOP_STARTUP_REPORT=1 to have the phase scripts print it (together with the
+  deferred imports from workshop/lazy.py) after a run.
+- With WORKSHOP_TRACE=1, importing this module also starts the tracer (workshop/tracing.py),
+  before any flow or crew exists, and print_report() prints its summary.
+"""
+
+import functools
+import os
+import threading
+import time
+
+from workshop import context_compaction, tracing
+from workshop.lazy import lazy_import, startup_report
+
+crewai_tools = lazy_import("crewai_tools")
+search_cache = lazy_import("workshop.search_cache")
+sandbox_pool = lazy_import("workshop.sandbox_pool")
+file_tools = lazy_import("workshop.file_tools")
+tools = lazy_import("crewai.tools")
+
+
+class Registry:
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self.build_seconds = {}   # name -> seconds its factory took, in build order
+        self._lock = threading.RLock()
+
+    def register(self, name, factory=None):
+        """
+        Registers factory under name and returns an accessor for it. Without factory,
+        works as a decorator.
+        """
+        if factory is None:
+            return lambda f: self.register(name, f)
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+        @functools.wraps(factory)
+        def accessor():
+            return self.get(name)
+        return accessor
+
+    def tool(self, name):
+        """
+        Lazy version of crewai's @tool(name): the decorated function becomes an accessor
+        for the tool object, which is built on first use.
+        """
+        def decorate(func):
+            def factory():
+                return tools.tool(name)(func)
+            return self.register(f"tool.{func.__name__}", functools.wraps(func)(factory))
+        return decorate
+
+    def get(self, name):
+        """
+        Returns the instance registered under name, building it on first use.
+        """
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        # Re-entrant: an agent's factory usually asks for its tools
+        with self._lock:
+            if name not in self._instances:
+                if name not in self._factories:
+                    raise KeyError(f"Nothing registered as '{name}'. Known: {', '.join(sorted(self._factories))}")
+                started = time.perf_counter()
+                self._instances[name] = self._factories[name]()
+                self.build_seconds[name] = time.perf_counter() - started
+            return self._instances[name]
+
+    def warm(self, prefix=""):
+        """
+        Builds everything registered under prefix now (e.g. in a long-running process
+        before the first job). Returns {name: error} for the factories that failed.
+        """
+        failures = {}
+        for name in sorted(n for n in list(self._factories) if n.startswith(prefix)):
+            try:
+                self.get(name)
+            except Exception as e:
+                failures[name] = e
+        return failures
+
+    def built(self, name):
+        return name in self._instances
+
+    def reset(self, name=None):
+        """
+        Forgets one built instance (or all of them); the next get() builds it again.
+        """
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+                self.build_seconds.clear()
+            else:
+                self._instances.pop(name, None)
+                self.build_seconds.pop(name, None)
+
+    def report(self):
+        """
+        Returns a small table of what was built and how long each build took.
+        Nested builds are counted in their parent too (an agent includes its tools).
+        """
+        if not self.build_seconds:
+            return "Registry: nothing built yet."
+        width = max(len(name) for name in self.build_seconds)
+        lines = [f"Registry: built {len(self.build_seconds)} of {len(self._factories)} registered objects"]
+        for name, seconds in self.build_seconds.items():
+            lines.append(f"  {name:<{width}}  {seconds * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+
+registry = Registry()
+
+
+def print_report():
+    """
+    Prints registry.report() and the lazy-import report when WORKSHOP_STARTUP_REPORT is set,
+    the trace summary when WORKSHOP_TRACE is set, and what context compaction saved.
+    """
+    if os.getenv("WORKSHOP_STARTUP_REPORT", "").lower() in ("1", "true", "yes"):
+        print(startup_report())
+        print(registry.report())
+    if tracing.tracer is not None:
+        print(tracing.report())
+    if context_compaction.report():
+        print(context_compaction.report())
+
+
+# Subscribed up front: a flow emits its first events before any agent is built
+tracing.install_if_enabled()
+
+
+# --- SHARED TOOLS ---
+@registry.register("tool.web_search")
+def web_search_tool():
+    return search_cache.CachedSerperDevTool()
+
+
+@registry.register("tool.file_writer")
+def file_writer_tool():
+    # Writes through the artifact store (workshop/artifacts.py): atomic, skips unchanged content
+    return file_tools.ArtifactFileWriterTool()
+
+
+@registry.register("tool.file_reader")
+def file_read_tool():
+    return crewai_tools.FileReadTool()
+
+
+@registry.register("tool.code_interpreter")
+def code_interpreter_tool():
+    # Pooled, pre-warmed sandboxes (Docker containers unless SANDBOX_BACKEND=subprocess);
+    # the workers start warming up right away
+    pool = sandbox_pool.get_pool()
+    if pool.backend == "subprocess":
+        print("[sandbox] SANDBOX_BACKEND=subprocess: generated code runs on this machine without isolation.")
+    return tools.tool("Python Code Sandbox")(sandbox_pool.run_python_code)
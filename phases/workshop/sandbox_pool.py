@@ -0,0 +1,251 @@
+"""
+Pre-warmed Code Sandboxes (used by phase 3)
+
+Goal:
+- Run the developer agent's code without a cold start per execution. Starting a fresh
+  sandbox for every run (a Docker container in crewai's "safe" mode) dominates the
+  latency of each code run; here the sandboxes are already running when code arrives.
+
+How it works:
+- SandboxPool keeps SANDBOX_POOL_SIZE (default 2) workers running
+  workshop/sandbox_worker.py with modules from SANDBOX_PREIMPORT already imported.
+- SANDBOX_BACKEND picks where a worker runs:
+  - "docker" (the default): each worker is its own long-lived container from
+    SANDBOX_DOCKER_IMAGE (default python:3.12-slim) with no network, a read-only root
+    filesystem (only a tmpfs /tmp is writable), no capabilities, an unprivileged user and
+    memory/CPU/process limits. This is the isolated mode; it needs a Docker daemon.
+  - "subprocess": plain Python processes on the host, for tests and offline runs. They
+    have resource limits but are not a security boundary: they can read and write your
+    files and use the network, so only use them for code you would run locally anyway.
+- A worker never runs the code itself: for every run it forks a child from its warm,
+  untouched interpreter, and the child runs the code in a fresh temporary directory and
+  exits. Module state, monkeypatches and os.environ changes die with the child, so
+  nothing carries over to the next run. A worker is replaced after SANDBOX_MAX_RUNS runs,
+  if it dies or stops answering, or if its reply channel is corrupted; the replacement
+  warms up in the background.
+- Limits: address space SANDBOX_MEMORY_MB (default 512) and CPU time; every run also has
+  a wall-clock SANDBOX_TIMEOUT_SECONDS (default 10).
+- run_python_code() is the function behind phase 3's code tool.
+"""
+
+import json
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+DEFAULT_PREIMPORT = "math,json,re,collections,itertools,functools,datetime,random,statistics"
+BACKENDS = ("docker", "subprocess")
+_BAD_REPLY = {}   # put on a worker's reply queue when its reply channel was corrupted
+DEFAULT_IMAGE = "python:3.12-slim"
+
+
+def backend():
+    name = os.getenv("SANDBOX_BACKEND", "docker").strip().lower() or "docker"
+    if name not in BACKENDS:
+        raise ValueError(f"SANDBOX_BACKEND must be one of {', '.join(BACKENDS)}, not '{name}'.")
+    return name
+
+
+def docker_command(name, image, memory_mb, args):
+    """
+    `docker run` for one isolated worker container; the worker script is mounted read-only.
+    """
+    return [
+        "docker", "run", "-i", "--rm", "--name", name,
+        "--network", "none", "--read-only", "--tmpfs", "/tmp:rw,size=64m",
+        "--workdir", "/tmp", "--user", "65534:65534",
+        "--cap-drop", "ALL", "--security-opt", "no-new-privileges",
+        "--memory", f"{memory_mb}m", "--memory-swap", f"{memory_mb}m", "--cpus", "1", "--pids-limit", "64",
+        "-v", f"{WORKER_SCRIPT}:/sandbox/sandbox_worker.py:ro",
+        image, "python", "-I", "/sandbox/sandbox_worker.py", *args,
+    ]
+
+
+@dataclass
+class SandboxResult:
+    ok: bool
+    output: str = ""
+    error: str = ""
+    seconds: float = 0.0
+
+
+class SandboxWorker:
+    """
+    One warm worker process. Not thread-safe: the pool hands it to one caller at a time.
+    """
+
+    def __init__(self, preimport=(), memory_mb=512, backend="docker", image=DEFAULT_IMAGE):
+        self.runs = 0
+        self.container = None
+        args = [str(memory_mb), *preimport]
+        if backend == "docker":
+            if shutil.which("docker") is None:
+                raise RuntimeError("SANDBOX_BACKEND=docker needs the docker CLI and a running daemon "
+                                   "(SANDBOX_BACKEND=subprocess runs code on the host without isolation)")
+            self.container = f"crew-sandbox-{uuid.uuid4().hex[:12]}"
+            command, startup_timeout = docker_command(self.container, image, memory_mb, args), 120
+        else:
+            command, startup_timeout = [sys.executable, "-I", WORKER_SCRIPT, *args], 30
+        self.proc = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding="utf-8", bufsize=1,
+        )
+        self._replies = queue.Queue()
+        threading.Thread(target=self._read_replies, name="sandbox-reader", daemon=True).start()
+        try:
+            ready = self._replies.get(timeout=startup_timeout)
+        except queue.Empty:
+            ready = None
+        if not (ready and ready.get("ready")):
+            self.kill()
+            raise RuntimeError(f"Sandbox worker failed to start ({backend} backend)")
+
+    def _read_replies(self):
+        for line in self.proc.stdout:
+            try:
+                reply = json.loads(line)
+            except ValueError:
+                reply = _BAD_REPLY
+            if not isinstance(reply, dict):
+                self._replies.put(_BAD_REPLY)
+                return   # the channel can't be trusted any more; run() replaces the worker
+            self._replies.put(reply)
+        self._replies.put(None)   # the worker exited
+
+    @property
+    def alive(self):
+        return self.proc.poll() is None
+
+    def run(self, code, timeout):
+        self.runs += 1
+        started = time.perf_counter()
+        try:
+            self.proc.stdin.write(json.dumps({"code": code, "cpu_seconds": timeout, "timeout": timeout}) + "\n")
+            self.proc.stdin.flush()
+            # The worker kills a run at timeout itself; this only catches a stuck worker
+            reply = self._replies.get(timeout=timeout + 5)
+        except queue.Empty:
+            self.kill()
+            return SandboxResult(False, error=f"Timed out after {timeout}s", seconds=time.perf_counter() - started)
+        except OSError:
+            reply = None
+        seconds = time.perf_counter() - started
+        if reply is None:
+            self.kill()
+            return SandboxResult(False, error="The sandbox process died (memory or CPU limit exceeded?)",
+                                 seconds=seconds)
+        if reply is _BAD_REPLY or "ok" not in reply:
+            self.kill()
+            return SandboxResult(False, error="The sandbox sent an unreadable reply; the worker was replaced",
+                                 seconds=seconds)
+        return SandboxResult(reply["ok"], reply.get("output", ""), reply.get("error", ""), seconds)
+
+    def kill(self):
+        if self.container is not None:
+            # Killing the docker client doesn't stop its container
+            subprocess.run(["docker", "rm", "-f", self.container],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        if self.alive:
+            self.proc.kill()
+        self.proc.wait()
+
+
+class SandboxPool:
+    def __init__(self, size=2, timeout=10.0, memory_mb=512, max_runs=50, preimport=(),
+                 backend="docker", image=DEFAULT_IMAGE):
+        self.size = size
+        self.backend = backend
+        self.image = image
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.max_runs = max_runs
+        self.preimport = tuple(preimport)
+        self._idle = queue.Queue()
+        self._closed = False
+        for _ in range(size):
+            self._replace()
+
+    def _replace(self):
+        """
+        Starts a worker in the background and adds it to the idle queue when it is warm.
+        """
+        def start():
+            try:
+                worker = SandboxWorker(self.preimport, self.memory_mb, self.backend, self.image)
+            except Exception as e:
+                self._idle.put(e)
+                return
+            if self._closed:
+                worker.kill()
+            else:
+                self._idle.put(worker)
+        threading.Thread(target=start, name="sandbox-start", daemon=True).start()
+
+    def run(self, code, timeout=None):
+        """
+        Runs code in an idle worker (waiting for one if all are busy) and returns a SandboxResult.
+        """
+        worker = self._idle.get()
+        if isinstance(worker, Exception):
+            self._replace()
+            raise RuntimeError(f"Could not start a sandbox worker: {worker}")
+        try:
+            return worker.run(code, timeout or self.timeout)
+        finally:
+            if worker.alive and worker.runs < self.max_runs:
+                self._idle.put(worker)
+            else:
+                worker.kill()
+                self._replace()
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            if isinstance(worker, SandboxWorker):
+                worker.kill()
+
+
+_default_pool = None
+_default_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Returns the shared SandboxPool configured from the environment, started on first use.
+    """
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = SandboxPool(
+                size=int(os.getenv("SANDBOX_POOL_SIZE", "2")),
+                timeout=float(os.getenv("SANDBOX_TIMEOUT_SECONDS", "10")),
+                memory_mb=int(os.getenv("SANDBOX_MEMORY_MB", "512")),
+                max_runs=int(os.getenv("SANDBOX_MAX_RUNS", "50")),
+                preimport=[m for m in os.getenv("SANDBOX_PREIMPORT", DEFAULT_PREIMPORT).split(",") if m],
+                backend=backend(),
+                image=os.getenv("SANDBOX_DOCKER_IMAGE") or DEFAULT_IMAGE,
+            )
+        return _default_pool
+
+
+def run_python_code(code: str) -> str:
+    """
+    Runs Python 3 code in a sandbox and returns what it printed.
+    The code must print() the results you want to see; nothing else is returned.
+    Every run starts with a clean namespace, so define all functions in the same code.
+    """
+    result = get_pool().run(code)
+    if result.ok:
+        return result.output or "(The code ran without printing anything.)"
+    return f"{result.output}\nError:\n{result.error}".strip()
@@ -0,0 +1,156 @@
+"""
+Sandbox Worker Process (started by workshop/sandbox_pool.py; not imported)
+
+Runs as `python -I sandbox_worker.py <memory_mb> <module> ...`. After importing the
+given modules once (the "warm" part), it reads one JSON request per line on stdin and
+writes one JSON reply per line to the pool.
+
+The worker itself never runs the submitted code. For every request it forks a child
+that starts from the warm, untouched interpreter, runs the code in a fresh temporary
+working directory under memory and CPU limits, sends its result back over a private
+pipe and exits. Whatever the code changes (modules, monkeypatches, os.environ) dies
+with the child, so nothing carries over to the next run. The worker enforces the
+wall-clock timeout by killing the child. This needs os.fork (Linux/macOS, or Docker).
+
+The code's own stdout/stderr are captured; the process's real stdout is kept for the
+protocol and everything else written to file descriptors 1 and 2 is discarded.
+"""
+
+import contextlib
+import importlib
+import io
+import json
+import os
+import select
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import traceback
+
+try:
+    import resource
+except ImportError:   # Windows: no resource limits
+    resource = None
+
+MAX_OUTPUT_CHARS = 20_000
+
+
+def limit_memory(memory_mb):
+    if resource is not None and memory_mb > 0:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def limit_cpu(seconds):
+    # RLIMIT_CPU counts the whole process lifetime, so allow `seconds` more from now
+    if resource is not None and seconds:
+        used = resource.getrusage(resource.RUSAGE_SELF)
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        soft = int(used.ru_utime + used.ru_stime + seconds) + 1
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def run(code):
+    out = io.StringIO()
+    namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+    try:
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+            exec(compile(code, "<sandbox>", "exec"), namespace)
+        reply = {"ok": True}
+    except BaseException:   # SystemExit and KeyboardInterrupt are the code's errors too
+        reply = {"ok": False, "error": traceback.format_exc(limit=-5)}
+    output = out.getvalue()
+    if len(output) > MAX_OUTPUT_CHARS:
+        output = output[:MAX_OUTPUT_CHARS] + f"\n... (output truncated at {MAX_OUTPUT_CHARS} characters)"
+    reply["output"] = output
+    return reply
+
+
+def _child(request, workdir, memory_mb, result_fd, private_fds):
+    """
+    Runs in the forked child: never returns.
+    """
+    status = 1
+    try:
+        for fd in private_fds:   # the code must not reach the worker's protocol or stdin
+            os.close(fd)
+        os.chdir(workdir)
+        limit_memory(memory_mb)
+        limit_cpu(request.get("cpu_seconds"))
+        data = json.dumps(run(request["code"])).encode("utf-8")
+        with os.fdopen(result_fd, "wb") as result:
+            result.write(data)
+        status = 0
+    finally:
+        os._exit(status)
+
+
+def _read_result(fd, pid, timeout):
+    """
+    Collects the child's reply; kills it after timeout seconds. Returns (reply or None, timed out).
+    """
+    chunks, deadline = [], time.monotonic() + timeout
+    while True:
+        left = deadline - time.monotonic()
+        if left <= 0 or not select.select([fd], [], [], left)[0]:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            return None, True
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    os.waitpid(pid, 0)
+    try:
+        return json.loads(b"".join(chunks)), False
+    except ValueError:
+        return None, False
+
+
+def run_in_child(request, memory_mb, private_fds):
+    timeout = float(request.get("timeout") or request.get("cpu_seconds") or 10)
+    workdir = tempfile.mkdtemp(prefix="sandbox-")
+    read_fd, write_fd = os.pipe()
+    try:
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            _child(request, workdir, memory_mb, write_fd, private_fds)
+        os.close(write_fd)
+        reply, timed_out = _read_result(read_fd, pid, timeout)
+    finally:
+        os.close(read_fd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    if timed_out:
+        return {"ok": False, "output": "", "error": f"Timed out after {timeout:g}s"}
+    if reply is None:
+        return {"ok": False, "output": "", "error": "The sandboxed run died (memory or CPU limit exceeded?)"}
+    return reply
+
+
+def main():
+    protocol = os.fdopen(os.dup(1), "w", encoding="utf-8", buffering=1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+    if not hasattr(os, "fork"):
+        sys.exit("The sandbox worker needs os.fork (Linux or macOS; use SANDBOX_BACKEND=docker elsewhere)")
+
+    memory_mb, modules = int(sys.argv[1]), sys.argv[2:]
+    for name in modules:
+        with contextlib.suppress(Exception):
+            importlib.import_module(name)
+    protocol.write(json.dumps({"ready": True}) + "\n")
+
+    private_fds = (protocol.fileno(), sys.stdin.fileno())
+    for line in sys.stdin:
+        request = json.loads(line)
+        protocol.write(json.dumps(run_in_child(request, memory_mb, private_fds)) + "\n")
+
+
+if __name__ == "__main__":
+    main()
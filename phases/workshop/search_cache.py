@@ -0,0 +1,160 @@
+"""
+Search-Result Cache for SerperDevTool (used by phases 0-2)
+
+Goal:
+- Agents asking the same question share one Serper call: across agents, across tasks,
+  and across runs.
+
+How it works:
+- CachedSerperDevTool is a drop-in SerperDevTool. Its API request is keyed on the
+  normalized query (case-folded, whitespace collapsed) plus the search settings.
+- Results are kept in memory and in a SQLite file (SEARCH_CACHE_PATH, default
+  outputs/search_cache.sqlite3). News results expire quickly (SEARCH_CACHE_NEWS_TTL_SECONDS,
+  default 15 minutes); web results last longer (SEARCH_CACHE_TTL_SECONDS, default 6 hours).
+- Concurrent agents asking the same query wait for one in-flight HTTP call instead
+  of each making their own.
+- SERPER_FIXTURE=path/to/fixture.json answers from recorded results with no network
+  (add SERPER_RECORD=1 to record real results into that file first).
+- SERPER_API_BASE points the tool at another server, e.g. a local stand-in in benchmarks.
+"""
+
+import json
+import os
+import re
+import threading
+from concurrent.futures import Future
+
+from crewai_tools import SerperDevTool
+
+from workshop.llm_cache import MemoryCache, ResponseCache, SQLiteCache
+
+
+def normalize_query(query):
+    """
+    'CrewAI   Basics ' and 'crewai basics' are the same search.
+    """
+    return re.sub(r"\s+", " ", query).strip().casefold()
+
+
+def search_key(query, search_type="search", n_results=10, country="", location="", locale=""):
+    return json.dumps([normalize_query(query), search_type.lower(), n_results, country or "",
+                       location or "", locale or ""])
+
+
+class SingleFlight:
+    """
+    Runs fn once per key at a time; concurrent callers with the same key share its result.
+    """
+
+    def __init__(self):
+        self._calls = {}   # key -> Future
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            future.set_result(fn())
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result()
+
+
+class SearchFixture:
+    """
+    Recorded Serper responses in a JSON file: {search_key: raw API response}.
+    """
+
+    def __init__(self, path, record=False):
+        self.path = path
+        self.record = record
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.results = json.load(f)
+        except FileNotFoundError:
+            self.results = {}
+
+    def get(self, key):
+        return self.results.get(key)
+
+    def add(self, key, results):
+        with self._lock:
+            self.results[key] = results
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.results, f, indent=2, sort_keys=True)
+
+
+_caches = {}
+_fixture = None
+_inflight = SingleFlight()
+_lock = threading.Lock()
+
+
+def get_search_cache(search_type):
+    """
+    Returns the cache for one search type ("news" gets the short TTL).
+    """
+    search_type = search_type.lower()
+    with _lock:
+        if search_type not in _caches:
+            if search_type == "news":
+                ttl = float(os.getenv("SEARCH_CACHE_NEWS_TTL_SECONDS", str(15 * 60)))
+            else:
+                ttl = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", str(6 * 3600)))
+            path = os.getenv("SEARCH_CACHE_PATH", "outputs/search_cache.sqlite3")
+            disk = SQLiteCache(path, max_entries=2000, ttl=ttl, table=f"serper_{search_type}")
+            _caches[search_type] = ResponseCache(MemoryCache(ttl=ttl), disk)
+        return _caches[search_type]
+
+
+def get_fixture():
+    global _fixture
+    path = os.getenv("SERPER_FIXTURE")
+    if not path:
+        return None
+    with _lock:
+        if _fixture is None or _fixture.path != path:
+            _fixture = SearchFixture(path, record=os.getenv("SERPER_RECORD", "").lower() in ("1", "true", "yes"))
+        return _fixture
+
+
+class CachedSerperDevTool(SerperDevTool):
+    """
+    SerperDevTool with a shared, persistent, de-duplicating result cache.
+    """
+
+    def __init__(self, **kwargs):
+        if os.getenv("SERPER_API_BASE"):
+            kwargs.setdefault("base_url", os.getenv("SERPER_API_BASE").rstrip("/"))
+        super().__init__(**kwargs)
+
+    def _make_api_request(self, search_query, search_type):
+        key = search_key(search_query, search_type, self.n_results, self.country, self.location, self.locale)
+        cache = get_search_cache(search_type)
+        cached = cache.get(key)
+        if cached is not None:
+            return json.loads(cached)
+
+        def fetch():
+            fixture = get_fixture()
+            if fixture is not None and not fixture.record:
+                results = fixture.get(key)
+                if results is None:
+                    raise ValueError(f"No recorded Serper result for '{search_query}' in {fixture.path}")
+            else:
+                results = SerperDevTool._make_api_request(self, search_query, search_type)
+                if fixture is not None:
+                    fixture.add(key, results)
+            cache.set(key, json.dumps(results))
+            return results
+
+        return _inflight.do(key, fetch)
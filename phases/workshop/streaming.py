@@ -0,0 +1,188 @@
+"""
+Crew Token Streaming for Flows (used by phases 2 and 3)
+
+Goal:
+- Let a flow step read a crew's output while it is being written, so the next step can
+  start as soon as the part it needs is complete. Phase 3 starts the execution crew the
+  moment the JSON plan closes, not when the planner has finished its trailing text.
+- Report time-to-first-token and the latency saved for every streamed step.
+
+How it works:
+- stream_crew(crew, step) turns on crewai's streaming (Crew.stream) and runs the crew in
+  the background. The CrewStream it returns yields text tokens, as a normal or an async
+  iterator, optionally for one agent only.
+- The crew keeps running after the reader stops; wait() returns its CrewOutput.
+- Each CrewStream records when it started, its first token, when the reader had what it
+  needed (mark_ready()) and when the crew finished. stream_log.report() prints a table.
+- kickoff_crew() is a drop-in for crew.kickoff() that streams (and is timed) when
+  FLOW_STREAMING=1, and is a plain kickoff() otherwise.
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+
+_END = object()
+
+
+def streaming_enabled():
+    return os.getenv("FLOW_STREAMING", "").lower() in ("1", "true", "yes")
+
+
+class CrewStream:
+    """
+    A running crew whose text tokens can be read as they arrive.
+    """
+
+    def __init__(self, crew, step):
+        self.step = step
+        self.started = time.perf_counter()
+        self.first_token_at = None
+        self.ready_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self._queue = queue.Queue()
+        self._done = threading.Event()
+        crew.stream = True
+        # Returns at once; the crew itself starts when the output is first iterated
+        self._output = crew.kickoff()
+        threading.Thread(target=self._pump, name=f"stream-{step}", daemon=True).start()
+
+    def _pump(self):
+        try:
+            for chunk in self._output:
+                if getattr(chunk.chunk_type, "value", chunk.chunk_type) != "text" or not chunk.content:
+                    continue
+                if self.first_token_at is None:
+                    self.first_token_at = time.perf_counter()
+                self._queue.put(chunk)
+            self.result = self._output.result
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished_at = time.perf_counter()
+            self._queue.put(_END)
+            self._done.set()
+
+    # --- READING ---
+    def tokens(self, agent_role=None):
+        """
+        Yields text tokens (of one agent if agent_role is given) until the crew ends.
+        Filters on the agent because crewai doesn't fill in the task of a chunk reliably.
+        """
+        while True:
+            chunk = self._queue.get()
+            if chunk is _END:
+                self._queue.put(_END)   # later readers stop too
+                return
+            if agent_role is None or chunk.agent_role == agent_role:
+                yield chunk.content
+
+    def __iter__(self):
+        return self.tokens()
+
+    async def atokens(self, agent_role=None):
+        """
+        Async version of tokens(), for async flow steps.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            chunk = await loop.run_in_executor(None, self._queue.get)
+            if chunk is _END:
+                self._queue.put(_END)
+                return
+            if agent_role is None or chunk.agent_role == agent_role:
+                yield chunk.content
+
+    def __aiter__(self):
+        return self.atokens()
+
+    def mark_ready(self):
+        """
+        Records that the reader has what it needs and the next step can start.
+        """
+        if self.ready_at is None:
+            self.ready_at = time.perf_counter()
+
+    def wait(self, timeout=None):
+        """
+        Waits for the crew to finish and returns its CrewOutput (or raises its error).
+        """
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Crew for step '{self.step}' still running after {timeout}s")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    # --- TIMING ---
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def timing(self):
+        """
+        Returns {"ttft", "ready", "total", "saved"} in seconds from the start of the step
+        (None where not known yet). saved is how much sooner the next step could start.
+        """
+        def since_start(t):
+            return None if t is None else t - self.started
+        ready = since_start(self.ready_at or self.finished_at)
+        total = since_start(self.finished_at)
+        saved = None if total is None or ready is None else max(total - ready, 0.0)
+        return {"ttft": since_start(self.first_token_at), "ready": ready, "total": total, "saved": saved}
+
+
+class StreamLog:
+    """
+    Keeps the streamed steps of this process for the timing report.
+    """
+
+    def __init__(self):
+        self.streams = []
+        self._lock = threading.Lock()
+
+    def add(self, stream):
+        with self._lock:
+            self.streams.append(stream)
+
+    def report(self):
+        with self._lock:
+            streams = list(self.streams)
+        if not streams:
+            return "Streaming: no streamed steps."
+
+        def fmt(seconds):
+            return "-" if seconds is None else f"{seconds:.2f}s"
+        width = max(len("Step"), *(len(s.step) for s in streams))
+        lines = [f"{'Step':<{width}}  {'TTFT':>8}  {'ready':>8}  {'total':>8}  {'saved':>8}"]
+        for s in streams:
+            t = s.timing()
+            lines.append(f"{s.step:<{width}}  {fmt(t['ttft']):>8}  {fmt(t['ready']):>8}  "
+                         f"{fmt(t['total']):>8}  {fmt(t['saved']):>8}")
+        saved = sum(s.timing()["saved"] or 0.0 for s in streams)
+        lines.append(f"Latency saved by starting steps early: {saved:.2f}s")
+        return "\n".join(lines)
+
+
+stream_log = StreamLog()
+
+
+def stream_crew(crew, step):
+    """
+    Starts crew with streaming on and returns its CrewStream (also kept in stream_log).
+    """
+    stream = CrewStream(crew, step)
+    stream_log.add(stream)
+    return stream
+
+
+def kickoff_crew(crew, step):
+    """
+    crew.kickoff(), streamed and timed when FLOW_STREAMING=1.
+    """
+    if not streaming_enabled():
+        return crew.kickoff()
+    return stream_crew(crew, step).wait()
@@ -0,0 +1,258 @@
+"""
+Structured LLM Output (used by phase 3)
+
+Goal:
+- Get a JSON object out of an agent's answer even when it is wrapped in prose or code
+  fences, or slightly malformed, without paying for another LLM run.
+
+How it works:
+- JsonObjectScanner reads text incrementally (a whole answer, or tokens as they
+  stream in) and returns each balanced {...} as soon as its closing brace arrives.
+  Braces inside strings don't count, so leading prose and trailing text are skipped.
+- repair_json() fixes the usual LLM defects locally: trailing commas, // and /* */
+  comments, single-quoted or curly-quoted strings, unquoted keys, unquoted one-word
+  values (e.g. a URL or identifier, not a phrase), and Python's True/False/None. If the
+  answer stops mid-object, the scanner's finish() closes the open brackets, but an
+  answer cut off inside a string is rejected: its last value would be silently
+  truncated. A // only starts a comment where a new token
+  could (after whitespace, ",", "{" or "["), so unquoted URLs survive. The examples in
+  repair_json() run with `python -m doctest phases/workshop/structured_output.py`.
+- parse_model() returns the first object that validates against a pydantic model, and
+  StreamingModelParser does the same while tokens are still arriving.
+"""
+
+import ast
+import json
+import re
+
+from pydantic import ValidationError
+
+_SPECIAL = re.compile(r"[{}\[\]\"'\\]")
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class StructuredOutputError(ValueError):
+    """
+    Raised when no JSON object in the text parses and validates.
+    """
+
+
+class JsonObjectScanner:
+    """
+    Finds balanced top-level {...} objects in text fed to it piece by piece.
+    """
+
+    def __init__(self):
+        self._parts = []    # pieces of the object being read
+        self._stack = []    # open brackets
+        self._quote = None  # quote character if inside a string
+        self._escape = False
+        self.cut_in_string = False   # set by finish() if the text ended inside a string
+
+    def feed(self, text):
+        """
+        Adds text and returns the objects (as strings) completed by it.
+        """
+        done = []
+        pos = 0
+        if not self._stack:
+            pos = text.find("{")
+            if pos == -1:
+                return done
+        start = pos
+        escaped = 0 if self._escape else -1   # index of the character a backslash escapes
+        self._escape = False
+        for m in _SPECIAL.finditer(text, pos):
+            ch, i = m.group(), m.start()
+            if not self._stack:
+                if ch != "{":
+                    continue
+                start = i
+            if i == escaped:
+                continue
+            if self._quote:
+                if ch == "\\":
+                    escaped = i + 1
+                    self._escape = escaped == len(text)
+                elif ch == self._quote:
+                    self._quote = None
+            elif ch in "\"'":
+                self._quote = ch
+            elif ch in "{[":
+                self._stack.append(ch)
+            elif ch in "}]" and self._stack:
+                self._stack.pop()
+                if not self._stack:
+                    self._parts.append(text[start:i + 1])
+                    done.append("".join(self._parts))
+                    self._parts = []
+        if self._stack:
+            self._parts.append(text[start:])
+        return done
+
+    def finish(self):
+        """
+        Call at the end of the text. Returns the unfinished object with its open
+        brackets closed, or None if nothing was left open or the text ended inside a
+        string (then cut_in_string is set): that value is incomplete, not repairable.
+        """
+        if not self._stack:
+            return None
+        text = "".join(self._parts)
+        if self._quote:
+            self._parts, self._stack, self._quote, self._escape = [], [], None, False
+            self.cut_in_string = True
+            return None
+        text = text.rstrip().rstrip(",")
+        text += "".join(_CLOSERS[b] for b in reversed(self._stack))
+        self._parts, self._stack, self._quote, self._escape = [], [], None, False
+        return text
+
+
+def iter_json_objects(text):
+    """
+    Yields every balanced {...} in text, then a closed-off version of a trailing
+    unfinished one (unless it ends inside a string).
+    """
+    scanner = JsonObjectScanner()
+    yield from scanner.feed(text)
+    tail = scanner.finish()
+    if tail is not None:
+        yield tail
+
+
+# --- REPAIR ---
+_TOKEN = re.compile(
+    r'"(?:[^"\\]|\\.)*"'              # JSON string
+    r"|'(?:[^'\\]|\\.)*'"             # single-quoted string
+    r"|[“”](.*?)[“”]"                 # curly-quoted string
+    r"|(?:^|(?<=[\s,{\[]))//[^\n]*"   # // comment (only where a new token can start)
+    r"|/\*.*?\*/"                     # /* comment */
+    r"|-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?"
+    r"|[A-Za-z_$][\w$.-]*(?::?//[^\s,}\]]*)?"   # bare word, including URLs like https://x.com/y
+    r"|\s+|.",
+    re.S,
+)
+_WORDS = {"true": "true", "false": "false", "null": "null", "True": "true", "False": "false", "None": "null"}
+
+
+def repair_json(text):
+    """
+    Rewrites almost-JSON into JSON. The result may still be invalid; json.loads decides.
+
+    >>> repair_json("{name: 'x', ok: True, // note\\n tags: ['a',],}")
+    '{"name": "x", "ok": true, \\n "tags": ["a"]}'
+    >>> repair_json('{a: https://x.com/y, b: 3}')
+    '{"a": "https://x.com/y", "b": 3}'
+    """
+    out = []
+
+    def drop_trailing_comma():
+        while out and out[-1].isspace():
+            out.pop()
+        if out and out[-1] == ",":
+            out.pop()
+
+    for m in _TOKEN.finditer(text):
+        tok = m.group()
+        first = tok[0]
+        if first == '"':
+            out.append(tok)
+        elif first == "'":
+            out.append(json.dumps(ast.literal_eval(tok)) if _literal_ok(tok) else json.dumps(tok[1:-1]))
+        elif first in "“”":
+            out.append(json.dumps(m.group(1)))
+        elif tok.startswith(("//", "/*")):
+            continue
+        elif first.isalpha() or first in "_$":
+            out.append(_WORDS.get(tok) or json.dumps(tok))
+        elif tok in "}]":
+            drop_trailing_comma()
+            out.append(tok)
+        else:
+            out.append(tok)
+    return "".join(out)
+
+
+def _literal_ok(tok):
+    try:
+        return isinstance(ast.literal_eval(tok), str)
+    except (ValueError, SyntaxError):
+        return False
+
+
+def load_json_object(text):
+    """
+    Parses one candidate object, repairing it if needed. Returns (dict, repaired).
+    Raises ValueError if it can't be turned into a JSON object.
+    """
+    try:
+        value, repaired = json.loads(text, strict=False), False
+    except ValueError:
+        value, repaired = json.loads(repair_json(text), strict=False), True
+    if not isinstance(value, dict):
+        raise ValueError("not a JSON object")
+    return value, repaired
+
+
+# --- MODELS ---
+def _validate(candidate, model, errors):
+    try:
+        value, repaired = load_json_object(candidate)
+        return model.model_validate(value), repaired
+    except (ValueError, ValidationError) as e:
+        errors.append(f"{candidate[:80]!r}: {e}")
+        return None, False
+
+
+def parse_model(text, model):
+    """
+    Returns (model instance, repaired) for the first object in text that validates.
+    Raises StructuredOutputError listing why each candidate was rejected.
+    """
+    parser = StreamingModelParser(model)
+    parser.feed(text)
+    return parser.finish(), parser.repaired
+
+
+class StreamingModelParser:
+    """
+    Feed it tokens as they arrive; feed() returns the validated model the moment the
+    first valid object closes, without waiting for the rest of the answer.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.scanner = JsonObjectScanner()
+        self.result = None
+        self.repaired = False
+        self.errors = []
+        self._text = []
+
+    def feed(self, chunk):
+        self._text.append(chunk)
+        if self.result is None:
+            for candidate in self.scanner.feed(chunk):
+                self.result, self.repaired = _validate(candidate, self.model, self.errors)
+                if self.result is not None:
+                    break
+        return self.result
+
+    def finish(self):
+        """
+        Call at the end of the output. Returns the result, trying a truncated trailing
+        object last (which counts as repaired). Raises StructuredOutputError if nothing
+        validated.
+        """
+        if self.result is None:
+            tail = self.scanner.finish()
+            if tail is not None:
+                self.result, _ = _validate(tail, self.model, self.errors)
+                self.repaired = self.result is not None
+            elif self.scanner.cut_in_string:
+                self.errors.append("the output ends inside an unterminated string")
+        if self.result is None:
+            reasons = "; ".join(self.errors) if self.errors else "no JSON object found"
+            raise StructuredOutputError(f"No valid {self.model.__name__} in the output ({reasons}). "
+                                        f"Output was: {''.join(self._text)[:500]!r}")
+        return self.result
@@ -0,0 +1,169 @@
+"""
+Telegram Bot Client (used by phase 5)
+
+Goal:
+- Send Telegram messages over one pooled keep-alive connection instead of a new TLS
+  handshake per message, and never hang forever on a slow API.
+
+How it works:
+- One requests.Session with a connection pool; every call has a timeout
+  (TELEGRAM_TIMEOUT_SECONDS, default 10).
+- A per-chat rate limiter spaces messages out (Telegram allows about one message per
+  second per chat) and a 429 reply is retried once after its retry_after.
+- Bursts are coalesced in the outbox (workshop/outbox.py): merge_payloads() is the
+  telegram channel's merge function, so messages queued for the same chat while an
+  earlier one is being sent go out as one message, up to Telegram's 4096-character
+  limit.
+- TELEGRAM_API_BASE points the client at another server, e.g. a local stand-in
+  HTTP server in tests.
+- deliver_payload() is the outbox handler for queued messages.
+"""
+
+import os
+import threading
+import time
+
+from workshop.lazy import lazy_import
+from workshop.outbox import PermanentFailure
+
+requests = lazy_import("requests")
+requests_adapters = lazy_import("requests.adapters")
+
+MAX_MESSAGE_CHARS = 4096
+
+
+class ChatRateLimiter:
+    """
+    Spaces out sends per chat: at most one message every min_interval seconds.
+    """
+
+    def __init__(self, min_interval=1.0):
+        self.min_interval = min_interval
+        self._next_allowed = {}   # chat_id -> monotonic time of the next allowed send
+        self._lock = threading.Lock()
+
+    def wait(self, chat_id):
+        with self._lock:
+            now = time.monotonic()
+            send_at = max(now, self._next_allowed.get(chat_id, 0.0))
+            self._next_allowed[chat_id] = send_at + self.min_interval
+        if send_at > now:
+            time.sleep(send_at - now)
+
+    def back_off(self, chat_id, seconds):
+        with self._lock:
+            self._next_allowed[chat_id] = max(self._next_allowed.get(chat_id, 0.0), time.monotonic() + seconds)
+
+
+def coalesce(texts, limit=MAX_MESSAGE_CHARS):
+    """
+    Joins short texts with newlines into as few messages as possible, each at most
+    limit characters. Texts longer than limit are split.
+    """
+    messages, current = [], ""
+    for text in texts:
+        while len(text) > limit:
+            if current:
+                messages.append(current)
+                current = ""
+            messages.append(text[:limit])
+            text = text[limit:]
+        if current and len(current) + 1 + len(text) > limit:
+            messages.append(current)
+            current = ""
+        current = f"{current}\n{text}" if current else text
+    if current:
+        messages.append(current)
+    return messages
+
+
+class TelegramClient:
+    """
+    Pooled, rate-limited Telegram Bot API client.
+    """
+
+    def __init__(self, token=None, chat_id=None, base_url=None, timeout=None,
+                 min_interval=None, session=None):
+        self.token = token or os.getenv("TELEGRAM_BOT_TOKEN")
+        self.chat_id = chat_id or os.getenv("TELEGRAM_CHAT_ID")
+        self.base_url = (base_url or os.getenv("TELEGRAM_API_BASE") or "https://api.telegram.org").rstrip("/")
+        self.timeout = timeout or float(os.getenv("TELEGRAM_TIMEOUT_SECONDS", "10"))
+        if min_interval is None:
+            min_interval = float(os.getenv("TELEGRAM_MIN_INTERVAL_SECONDS", "1"))
+        self.limiter = ChatRateLimiter(min_interval)
+        self.session = session or self._make_session()
+
+    @staticmethod
+    def _make_session():
+        session = requests.Session()
+        adapter = requests_adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    @property
+    def configured(self):
+        return bool(self.token and self.chat_id)
+
+    # --- SENDING ---
+    def send_message(self, text, chat_id=None):
+        """
+        Sends one message now (after the chat's rate limit) and returns the HTTP response.
+        Raises requests.RequestException on network errors or timeouts.
+        """
+        chat_id = chat_id or self.chat_id
+        url = f"{self.base_url}/bot{self.token}/sendMessage"
+        for attempt in range(2):
+            self.limiter.wait(chat_id)
+            resp = self.session.post(url, data={"chat_id": chat_id, "text": text}, timeout=self.timeout)
+            if resp.status_code != 429 or attempt:
+                return resp
+            # Too Many Requests: Telegram says how long to wait
+            try:
+                retry_after = float(resp.json().get("parameters", {}).get("retry_after", 1))
+            except ValueError:
+                retry_after = 1.0
+            self.limiter.back_off(chat_id, retry_after)
+        return resp
+
+    def close(self):
+        self.session.close()
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Returns the shared TelegramClient, created on first use (after .env is loaded).
+    """
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = TelegramClient()
+        return _default_client
+
+
+def merge_payloads(first, second):
+    """
+    Outbox merge function: one payload for two messages to the same chat, or None if
+    the chats differ or the joined text would need more than one message.
+    """
+    if first.get("chat_id") != second.get("chat_id"):
+        return None
+    merged = coalesce([first["text"], second["text"]])
+    return {**first, "text": merged[0]} if len(merged) == 1 else None
+
+
+def deliver_payload(payload):
+    """
+    Outbox handler: sends {"text": ..., "chat_id": ...}. Client errors other than 429
+    are permanent; everything else (network, 5xx, 429) raises so the outbox retries.
+    """
+    resp = get_client().send_message(payload["text"], chat_id=payload.get("chat_id"))
+    if resp.status_code == 200:
+        return
+    if 400 <= resp.status_code < 500 and resp.status_code != 429:
+        raise PermanentFailure(f"HTTP {resp.status_code}: {resp.text}")
+    raise RuntimeError(f"HTTP {resp.status_code}: {resp.text}")
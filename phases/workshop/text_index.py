@@ -0,0 +1,171 @@
+"""
+Inverted Text Index (used by the phase 6 PDF/JSON/CSV tools)
+
+Goal:
+- Build token and n-gram (trigram) inverted indexes once per file, then answer
+  each query in time proportional to the number of candidate rows, not the file size.
+
+How it works:
+- Every record (a PDF line, a JSON row, a CSV row) gets a row id; posting lists map
+  each token / trigram to the row ids that contain it.
+- Substring search intersects the query's trigram postings (smallest list first) and
+  then checks each candidate with the original `query in text` test, so results are
+  exactly what the old linear scan returned.
+- Queries shorter than a trigram fall back to that exact scan.
+- Indexes are rebuilt automatically when the file's size or mtime changes.
+- PDF records are the lines of each page, prefixed with "[p. N, line M]" so answers can
+  cite them; PDF_PAGE_RANGE limits which pages are read.
+"""
+
+import csv
+import os
+import re
+import threading
+from array import array
+
+from workshop.json_stream import iter_json_rows
+from workshop.pdf_cache import file_fingerprint, page_range, pdf_cache
+
+NGRAM = 3
+FIELD_SEP = "\x00"   # joins a row's values, so a match can never span two fields
+TOKEN_RE = re.compile(r"\w+")
+
+
+def ngrams(text, n=NGRAM):
+    """
+    Returns the set of n-character substrings of text.
+    """
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def tokenize(text):
+    """
+    Returns the lowercase word tokens of text.
+    """
+    return TOKEN_RE.findall(text.lower())
+
+
+def _intersect(postings):
+    """
+    Intersects posting lists, starting with the shortest one.
+    """
+    postings = sorted(postings, key=len)
+    if not postings:
+        return []
+    result = set(postings[0])
+    for posting in postings[1:]:
+        if not result:
+            break
+        result.intersection_update(posting)
+    return sorted(result)
+
+
+class TextIndex:
+    """
+    Token + trigram inverted index over a list of records.
+
+    texts[i] is the lowercase searchable text of records[i].
+    """
+
+    def __init__(self, texts, records):
+        self.texts = texts
+        self.records = records
+        self.grams = {}    # trigram -> array of row ids
+        self.tokens = {}   # token -> array of row ids
+        for row_id, text in enumerate(texts):
+            for gram in ngrams(text):
+                self.grams.setdefault(gram, array("I")).append(row_id)
+            for token in set(TOKEN_RE.findall(text)):
+                self.tokens.setdefault(token, array("I")).append(row_id)
+
+    def __len__(self):
+        return len(self.records)
+
+    def search_ids(self, query, mode="substring"):
+        """
+        Returns the sorted row ids matching query (case-insensitive).
+
+        mode="substring": same results as `query.lower() in text` on every row.
+        mode="token": rows containing every word of the query as a whole word.
+        mode="exact": the plain linear substring scan, kept as a fallback.
+        """
+        q = query.lower()
+        if mode == "token":
+            words = tokenize(q)
+            if not words:
+                return []
+            return _intersect([self.tokens.get(word, ()) for word in set(words)])
+        if mode == "exact" or len(q) < NGRAM:
+            return [i for i, text in enumerate(self.texts) if q in text]
+        candidates = _intersect([self.grams.get(gram, ()) for gram in ngrams(q)])
+        return [i for i in candidates if q in self.texts[i]]
+
+    def search(self, query, mode="substring"):
+        """
+        Returns the matching records, in file order.
+        """
+        return [self.records[i] for i in self.search_ids(query, mode)]
+
+
+# --- PER-FILE INDEX REGISTRY ---
+_indexes = {}   # path -> (key, TextIndex)
+_lock = threading.Lock()
+
+
+def index_for(path, build, key=None):
+    """
+    Returns the TextIndex for path, building it with build(path) on first use
+    or when the file changed. build returns (texts, records).
+    """
+    key = key or file_fingerprint(path)
+    with _lock:
+        cached = _indexes.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    texts, records = build(path)
+    index = TextIndex(texts, records)
+    with _lock:
+        _indexes[path] = (key, index)
+    return index
+
+
+def row_text(row):
+    """
+    Searchable text of a JSON/CSV row: each value lowercased, joined by FIELD_SEP.
+    """
+    return FIELD_SEP.join(str(v).lower() for v in row.values())
+
+
+# --- LOADERS FOR THE PHASE 6 FORMATS ---
+def load_pdf_lines(path, pages="env"):
+    # Built page by page as pages arrive; each record cites where its line is.
+    # pages: 0-based page numbers, None for all, or "env" for PDF_PAGE_RANGE
+    texts, records = [], []
+    for page, text in pdf_cache.iter_pages(path, page_range() if pages == "env" else pages):
+        for line_no, line in enumerate(text.splitlines(), 1):
+            texts.append(line.lower())
+            records.append(f"[p. {page}, line {line_no}] {line.strip()}")
+    return texts, records
+
+
+def load_json_rows(path):
+    rows = list(iter_json_rows(path))
+    return [row_text(row) for row in rows], rows
+
+
+def load_csv_rows(path):
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    return [row_text(row) for row in rows], rows
+
+
+def pdf_index(path):
+    return index_for(path, load_pdf_lines, key=pdf_cache.cache_key(path) + (os.getenv("PDF_PAGE_RANGE", ""),))
+
+
+def json_index(path):
+    return index_for(path, load_json_rows)
+
+
+def csv_index(path):
+    return index_for(path, load_csv_rows)
@@ -0,0 +1,424 @@
+"""
+Pipeline Tracing (used by every phase)
+
+Goal:
+- See where the seconds and tokens go: how long each flow step, crew, task, agent, LLM
+  call and tool call takes, how many tokens each LLM call used, and what came from a
+  cache or needed a retry.
+
+How it works:
+- install() subscribes to crewai's event bus. Every started/finished event pair becomes a
+  span with its duration; crewai's parent event ids give the nesting (flow step → crew →
+  task → agent → LLM/tool call). LLM answers served by workshop/cached_llm.py are recorded
+  as zero-length LLM spans marked as cache hits.
+- flush() exports the finished spans: appended to WORKSHOP_TRACE_PATH as JSON lines
+  (default outputs/traces.jsonl) and, if WORKSHOP_TRACE_OTLP_ENDPOINT is set (e.g.
+  http://127.0.0.1:4318), sent as OTLP/HTTP JSON to its /v1/traces, which a local
+  OpenTelemetry Collector or Jaeger accepts.
+- summary() is a table per span kind and name: count, total/mean/max seconds, tokens,
+  cache hits and retries/errors. The phases print it (and flush) at the end of a run.
+
+Enable it with WORKSHOP_TRACE=1 in .env. Without it, nothing is subscribed and crewai
+isn't imported here.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+import urllib.request
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+from workshop.lazy import lazy_import
+
+event_bus = lazy_import("crewai.events")
+event_types = lazy_import("crewai.events.types")
+event_context = lazy_import("crewai.events.event_context")
+
+KIND_ORDER = ["flow", "step", "crew", "task", "agent", "llm", "tool"]
+
+
+def enabled():
+    return os.getenv("WORKSHOP_TRACE", "").lower() in ("1", "true", "yes")
+
+
+@dataclass
+class Span:
+    event_id: str
+    kind: str = ""
+    name: str = ""
+    parent_event_id: Optional[str] = None
+    start: Optional[float] = None   # epoch seconds
+    end: Optional[float] = None
+    status: str = "ok"
+    attributes: dict = field(default_factory=dict)
+
+    @property
+    def duration(self):
+        return max(self.end - self.start, 0.0)
+
+    @property
+    def span_id(self):
+        return uuid.UUID(self.event_id).hex[:16] if _is_uuid(self.event_id) else self.event_id[:16]
+
+
+def _is_uuid(value):
+    try:
+        uuid.UUID(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def _short(text, limit=48):
+    text = " ".join(str(text or "").split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class Tracer:
+    """
+    Collects spans from crewai events. Event handlers run on crewai's thread pool, so a
+    finished event may be handled before its started event; a span is complete once both
+    halves have arrived.
+    """
+
+    def __init__(self, jsonl_path=None, otlp_endpoint=None, service_name="crewai-workshop"):
+        self.jsonl_path = jsonl_path
+        self.otlp_endpoint = otlp_endpoint
+        self.service_name = service_name
+        self._spans = {}      # start event id -> Span (open and finished)
+        self._skipped = {}    # event id of an ignored scope -> its parent event id
+        self._finished = []   # finished, not yet flushed
+        self._flushed = []    # finished and flushed since the last summary
+        self._lock = threading.Lock()
+
+    # --- RECORDING ---
+    def start(self, event, kind, name, **attributes):
+        with self._lock:
+            span = self._spans.setdefault(event.event_id, Span(event.event_id))
+            span.kind, span.name = kind, name
+            span.parent_event_id = event.parent_event_id
+            span.start = event.timestamp.timestamp()
+            span.attributes.update(attributes)
+            self._complete(span)
+
+    def end(self, event, status="ok", **attributes):
+        start_id = event.started_event_id
+        if start_id is None:
+            return
+        with self._lock:
+            if start_id in self._skipped:
+                return
+            span = self._spans.setdefault(start_id, Span(start_id))
+            span.end = event.timestamp.timestamp()
+            span.status = status
+            span.attributes.update({k: v for k, v in attributes.items() if v is not None})
+            self._complete(span)
+
+    def skip(self, event):
+        """
+        Leaves a scope out of the trace; its children attach to its parent.
+        """
+        with self._lock:
+            self._skipped[event.event_id] = event.parent_event_id
+
+    def instant(self, kind, name, **attributes):
+        """
+        Records a zero-length span under the current crewai scope (e.g. a cache hit).
+        """
+        now = time.time()
+        span = Span(str(uuid.uuid4()), kind, name, event_context.get_current_parent_id(), now, now,
+                    attributes=attributes)
+        with self._lock:
+            self._spans[span.event_id] = span
+            self._finished.append(span)
+
+    def _complete(self, span):
+        if span.start is not None and span.end is not None and span.kind:
+            self._finished.append(span)
+
+    # --- EXPORT ---
+    def _parent(self, span):
+        parent = span.parent_event_id
+        while parent in self._skipped:
+            parent = self._skipped[parent]
+        return self._spans.get(parent)
+
+    def _trace_id(self, span):
+        seen = set()
+        while True:
+            parent = self._parent(span)
+            if parent is None or parent.event_id in seen:
+                return uuid.UUID(span.event_id).hex if _is_uuid(span.event_id) else uuid.uuid4().hex
+            seen.add(span.event_id)
+            span = parent
+
+    def _record(self, span):
+        parent = self._parent(span)
+        return {
+            "trace_id": self._trace_id(span),
+            "span_id": span.span_id,
+            "parent_span_id": parent.span_id if parent else None,
+            "kind": span.kind,
+            "name": span.name,
+            "start": span.start,
+            "end": span.end,
+            "duration_s": round(span.duration, 6),
+            "status": span.status,
+            "attributes": span.attributes,
+        }
+
+    def flush(self):
+        """
+        Exports the spans finished since the last flush. Returns how many there were.
+        """
+        with self._lock:
+            spans, self._finished = self._finished, []
+            records = [self._record(span) for span in spans]
+            self._flushed.extend(spans)
+        if not records:
+            return 0
+        if self.jsonl_path:
+            if os.path.dirname(self.jsonl_path):
+                os.makedirs(os.path.dirname(self.jsonl_path), exist_ok=True)
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(record, default=str) + "\n" for record in records)
+        if self.otlp_endpoint:
+            try:
+                send_otlp(self.otlp_endpoint, records, self.service_name)
+            except OSError as e:
+                print(f"[tracing] could not send spans to {self.otlp_endpoint}: {e}")
+        return len(records)
+
+    # --- SUMMARY ---
+    def summary(self, reset=True):
+        """
+        Returns the per-run table for the spans flushed since the last summary.
+        """
+        with self._lock:
+            spans = self._flushed + self._finished
+            if reset:
+                self._flushed = []
+        if not spans:
+            return "Trace: no spans recorded."
+
+        rows = {}
+        for span in spans:
+            row = rows.setdefault((span.kind, span.name), {"count": 0, "total": 0.0, "max": 0.0, "tokens": 0,
+                                                           "cache_hits": 0, "retries": 0, "errors": 0})
+            row["count"] += 1
+            row["total"] += span.duration
+            row["max"] = max(row["max"], span.duration)
+            row["tokens"] += span.attributes.get("total_tokens", 0) if span.kind == "llm" else 0
+            row["cache_hits"] += bool(span.attributes.get("cache_hit"))
+            row["retries"] += span.attributes.get("retries", 0)
+            row["errors"] += span.status != "ok"
+
+        def order(item):
+            (kind, _), row = item
+            return (KIND_ORDER.index(kind) if kind in KIND_ORDER else len(KIND_ORDER), -row["total"])
+
+        width = max(len("Span"), *(len(f"{kind} {name}") for kind, name in rows))
+        lines = [f"{'Span':<{width}}  {'count':>5}  {'total':>8}  {'mean':>8}  {'max':>8}  "
+                 f"{'tokens':>7}  {'cached':>6}  {'retry/err':>9}"]
+        for (kind, name), row in sorted(rows.items(), key=order):
+            lines.append(f"{kind + ' ' + name:<{width}}  {row['count']:>5}  {row['total']:>7.2f}s  "
+                         f"{row['total'] / row['count']:>7.2f}s  {row['max']:>7.2f}s  {row['tokens']:>7}  "
+                         f"{row['cache_hits']:>6}  {row['retries']:>4}/{row['errors']:<4}")
+        llm = [s for s in spans if s.kind == "llm"]
+        lines.append(f"LLM calls: {len(llm)} ({sum(bool(s.attributes.get('cache_hit')) for s in llm)} from cache), "
+                     f"{sum(s.attributes.get('total_tokens', 0) for s in llm)} tokens")
+        return "\n".join(lines)
+
+
+def send_otlp(endpoint, records, service_name):
+    """
+    POSTs span records to an OTLP/HTTP collector as JSON (endpoint + /v1/traces).
+    """
+    def attribute(key, value):
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    spans = []
+    for r in records:
+        span = {
+            "traceId": r["trace_id"],
+            "spanId": r["span_id"],
+            "name": f"{r['kind']} {r['name']}",
+            "kind": 1,   # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(int(r["start"] * 1e9)),
+            "endTimeUnixNano": str(int(r["end"] * 1e9)),
+            "attributes": [attribute("workshop.kind", r["kind"])]
+                          + [attribute(f"workshop.{k}", v) for k, v in r["attributes"].items()],
+            "status": {"code": 1 if r["status"] == "ok" else 2},
+        }
+        if r["parent_span_id"]:
+            span["parentSpanId"] = r["parent_span_id"]
+        spans.append(span)
+    body = {"resourceSpans": [{
+        "resource": {"attributes": [attribute("service.name", service_name)]},
+        "scopeSpans": [{"scope": {"name": "workshop.tracing"}, "spans": spans}],
+    }]}
+    request = urllib.request.Request(endpoint.rstrip("/") + "/v1/traces", data=json.dumps(body).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+    with urllib.request.urlopen(request, timeout=5):
+        pass
+
+
+# --- CREWAI EVENTS ---
+tracer = None
+_install_lock = threading.Lock()
+
+
+def _usage(event):
+    usage = event.usage or {}
+    return {k: usage[k] for k in ("prompt_tokens", "completion_tokens", "total_tokens")
+            if isinstance(usage.get(k), int)}
+
+
+def _subscribe(t):
+    types = event_types
+    on = event_bus.crewai_event_bus.on
+
+    def source_is_executor(source):
+        # crewai runs each agent through an internal flow; its spans would only add noise
+        return type(source).__name__ == "AgentExecutor"
+
+    @on(types.flow_events.FlowStartedEvent)
+    def _(source, event):
+        if source_is_executor(source):
+            t.skip(event)
+        else:
+            t.start(event, "flow", event.flow_name)
+
+    @on(types.flow_events.FlowFinishedEvent)
+    def _(source, event):
+        t.end(event)
+
+    @on(types.flow_events.FlowFailedEvent)
+    def _(source, event):
+        t.end(event, "error", error=str(getattr(event, "error", "")))
+
+    @on(types.flow_events.MethodExecutionStartedEvent)
+    def _(source, event):
+        if source_is_executor(source):
+            t.skip(event)
+        else:
+            t.start(event, "step", event.method_name, flow=event.flow_name)
+
+    @on(types.flow_events.MethodExecutionFinishedEvent)
+    def _(source, event):
+        t.end(event)
+
+    @on(types.flow_events.MethodExecutionFailedEvent)
+    def _(source, event):
+        t.end(event, "error", error=str(event.error))
+
+    @on(types.crew_events.CrewKickoffStartedEvent)
+    def _(source, event):
+        t.start(event, "crew", event.crew_name or "crew")
+
+    @on(types.crew_events.CrewKickoffCompletedEvent)
+    def _(source, event):
+        t.end(event, crew_total_tokens=event.total_tokens)
+
+    @on(types.crew_events.CrewKickoffFailedEvent)
+    def _(source, event):
+        t.end(event, "error", error=event.error)
+
+    @on(types.task_events.TaskStartedEvent)
+    def _(source, event):
+        t.start(event, "task", _short(event.task_name), agent=event.agent_role)
+
+    @on(types.task_events.TaskCompletedEvent)
+    def _(source, event):
+        t.end(event)
+
+    @on(types.task_events.TaskFailedEvent)
+    def _(source, event):
+        t.end(event, "error", error=event.error)
+
+    @on(types.agent_events.AgentExecutionStartedEvent)
+    def _(source, event):
+        t.start(event, "agent", event.agent_role or event.agent.role)
+
+    @on(types.agent_events.AgentExecutionCompletedEvent)
+    def _(source, event):
+        t.end(event)
+
+    @on(types.agent_events.AgentExecutionErrorEvent)
+    def _(source, event):
+        t.end(event, "error", error=event.error)
+
+    @on(types.llm_events.LLMCallStartedEvent)
+    def _(source, event):
+        t.start(event, "llm", event.model or "llm", agent=event.agent_role, cache_hit=False)
+
+    @on(types.llm_events.LLMCallCompletedEvent)
+    def _(source, event):
+        t.end(event, **_usage(event))
+
+    @on(types.llm_events.LLMCallFailedEvent)
+    def _(source, event):
+        t.end(event, "error", error=event.error)
+
+    @on(types.tool_usage_events.ToolUsageStartedEvent)
+    def _(source, event):
+        t.start(event, "tool", event.tool_name, agent=event.agent_role)
+
+    @on(types.tool_usage_events.ToolUsageFinishedEvent)
+    def _(source, event):
+        t.end(event, cache_hit=event.from_cache, retries=max(event.run_attempts - 1, 0))
+
+    @on(types.tool_usage_events.ToolUsageErrorEvent)
+    def _(source, event):
+        t.end(event, "error", error=str(event.error), retries=max(event.run_attempts - 1, 0))
+
+
+def install():
+    """
+    Subscribes the process-wide tracer to crewai's events (once) and returns it.
+    """
+    global tracer
+    with _install_lock:
+        if tracer is None:
+            t = Tracer(
+                jsonl_path=os.getenv("WORKSHOP_TRACE_PATH") or os.path.join("outputs", "traces.jsonl"),
+                otlp_endpoint=os.getenv("WORKSHOP_TRACE_OTLP_ENDPOINT") or None,
+            )
+            _subscribe(t)
+            atexit.register(t.flush)
+            tracer = t
+        return tracer
+
+
+def install_if_enabled():
+    return install() if enabled() else None
+
+
+def record_cache_hit(model):
+    """
+    Called by CachedLLM when it answers from the cache (no crewai LLM events then).
+    """
+    if tracer is not None:
+        tracer.instant("llm", model or "llm", cache_hit=True)
+
+
+def report():
+    """
+    Flushes pending spans (waiting for crewai's queued event handlers first) and returns
+    the summary table.
+    """
+    if tracer is None:
+        return "Trace: tracing is off (WORKSHOP_TRACE=1 to turn it on)."
+    event_bus.crewai_event_bus.flush()
+    tracer.flush()
+    return tracer.summary()